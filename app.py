@@ -3,23 +3,123 @@ Koidulauliku E-laulik - Main Flask Application
 A web application for Koidulaulik's spirit to explore modern Estonian culture
 """
 
-from flask import Flask, render_template, request, jsonify
+import click
+from flask import (
+    Blueprint, Flask, abort, current_app, g, has_request_context, render_template, request, jsonify,
+    send_from_directory, stream_with_context
+)
+from flask.json.provider import DefaultJSONProvider
 from datetime import datetime
-from itertools import chain
+from itertools import chain, zip_longest
+import hmac
 import os
-from scrapers.err_scraper import ERRNewsScraper
-from scrapers.wikipedia_scraper import WikipediaScraper
-from scrapers.kultuurikava_scraper import KultuurikavaScraper
-from scrapers.piletilevi_scraper import PiletileviScraper
+import random
+import threading
+import time
+from changes import ChangeFeed
+from profiling import RequestProfiler
+from scrapers.cache import SharedCache, backend_from_url
+from scrapers.items import BaseItem, CultureTopic, EventItem, NewsItem, SearchHit, is_fallback
+from scrapers.registry import ScraperRegistry, options_from_env
+from related import RelatedIndex
+from search_index import SearchIndexReader, build_index
+from suggest import SuggestIndex
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'koidulaulik-secret-key-2026'
+bp = Blueprint('main', __name__, cli_group=None)
 
-# Initialize scrapers
-err_scraper = ERRNewsScraper()
-wiki_scraper = WikipediaScraper()
-kultuurikava_scraper = KultuurikavaScraper()
-piletilevi_scraper = PiletileviScraper()
+class ItemJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes scraped items without copying them first"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (BaseItem, SearchHit)):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+def create_app(config=None):
+    """
+    Application factory
+    Scrapers are constructed lazily on first use, so creating the app
+    does not import requests or BeautifulSoup
+    """
+    app = Flask(__name__)
+    app.json = ItemJSONProvider(app)
+    app.config['SECRET_KEY'] = 'koidulaulik-secret-key-2026'
+    # Typeahead index age limit: the first /api/suggest of a worker builds the index and waits
+    # for it, later rebuilds run in a background thread while the stale index is served
+    app.config['SUGGEST_INDEX_TTL'] = 600
+    # Related items are recomputed for all items at most this often
+    app.config['RELATED_INDEX_TTL'] = 600
+    # Merge full text, images and venues from linked detail pages into items
+    app.config['ENRICH_DETAILS'] = True
+    # Index file written by `flask index-search`, /api/search scans live data without it
+    app.config['SEARCH_INDEX_PATH'] = os.environ.get('SEARCH_INDEX_PATH')
+    # An older index is ignored until `flask index-search` runs again (0 = serve any age)
+    app.config['SEARCH_INDEX_MAX_AGE'] = int(os.environ.get('SEARCH_INDEX_MAX_AGE', 3600))
+    # Scraped data cache shared by all workers: sqlite:///path, redis://host:port/db or none
+    app.config['SCRAPER_CACHE_URL'] = os.environ.get('SCRAPER_CACHE_URL', '')
+    # Seconds scraped data stays fresh, and how long it may be served stale while refreshing
+    app.config['SCRAPER_CACHE_TTL'] = 300
+    app.config['SCRAPER_CACHE_STALE_TTL'] = 3600
+    # /api/stream: page sections are re-scraped this often while clients are connected,
+    # connections are closed after STREAM_MAX_AGE seconds and resumed by the browser (0 = off)
+    app.config['STREAM_REFRESH_INTERVAL'] = 60
+    app.config['STREAM_HEARTBEAT'] = 15
+    app.config['STREAM_MAX_AGE'] = int(os.environ.get('STREAM_MAX_AGE', 300))
+    # Open streams per process; each holds a thread under gthread workers, see gunicorn.conf.py
+    app.config['STREAM_MAX_CLIENTS'] = int(os.environ.get('STREAM_MAX_CLIENTS', 100))
+    # Request profiling (see profiling.py), off unless KOIDULAULIK_PROFILE is set. Profiles a
+    # PROFILE_SAMPLE_RATE share of requests, and requests sending the admin token as X-Profile
+    app.config['PROFILE'] = os.environ.get('KOIDULAULIK_PROFILE', '').lower() in ('1', 'true', 'yes')
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('KOIDULAULIK_PROFILE_RATE', 0))
+    # sample (wall-clock stacks, collapsed format) or cprofile (pstats)
+    app.config['PROFILE_MODE'] = os.environ.get('KOIDULAULIK_PROFILE_MODE', 'sample')
+    app.config['PROFILE_DIR'] = os.environ.get('KOIDULAULIK_PROFILE_DIR')
+    # Token for /admin/* and X-Profile; the admin endpoints answer 404 without one
+    app.config['ADMIN_TOKEN'] = os.environ.get('KOIDULAULIK_ADMIN_TOKEN')
+    # Constructor keyword arguments per scraper name, see scrapers/registry.py
+    app.config['SCRAPER_OPTIONS'] = options_from_env()
+    if config:
+        app.config.update(config)
+
+    app.extensions['scrapers'] = ScraperRegistry(app.config['SCRAPER_OPTIONS'], cache=_shared_cache(app.config))
+    app.extensions['search_index'] = SearchIndexReader(
+        app.config['SEARCH_INDEX_PATH'], max_age=app.config['SEARCH_INDEX_MAX_AGE']
+    )
+    app.extensions['suggest'] = {'index': None, 'built_at': 0.0, 'lock': threading.Lock()}
+    app.extensions['related'] = {'index': None, 'built_at': 0.0, 'lock': threading.Lock()}
+    app.extensions['changes'] = ChangeFeed()
+    app.extensions['profiler'] = RequestProfiler(
+        app.config['PROFILE_DIR'], app.config['PROFILE_MODE'], app.config['PROFILE_SAMPLE_RATE']
+    ) if app.config['PROFILE'] else None
+    app.register_blueprint(bp)
+    return app
+
+def _shared_cache(config):
+    try:
+        backend = backend_from_url(config['SCRAPER_CACHE_URL'])
+    except Exception as e:
+        print(f"Scraper cache disabled: {e}")
+        return None
+    if backend is None:
+        return None
+    return SharedCache(backend, ttl=config['SCRAPER_CACHE_TTL'], stale_ttl=config['SCRAPER_CACHE_STALE_TTL'])
+
+def _scraper(name):
+    return current_app.extensions['scrapers'].get(name)
+
+def _enrich(items, block=False, fetch=True):
+    """
+    Add cached detail page data to items, fetching missing pages in the background
+    Sample data is returned unchanged, so enrich each source before combining them
+    """
+    if not current_app.config['ENRICH_DETAILS']:
+        return items
+    try:
+        return _scraper('enricher').enrich(items, block=block, fetch=fetch)
+    except Exception as e:
+        print(f"Error enriching items: {e}")
+        return items
 
 def _safe_text(value):
     if value is None:
@@ -29,7 +129,7 @@ def _safe_text(value):
     return str(value)
 
 def _query_matches(item, query):
-    if not isinstance(item, dict):
+    if not isinstance(item, (dict, BaseItem)):
         return False
     title = _safe_text(item.get('title'))
     description = _safe_text(item.get('description'))
@@ -41,151 +141,567 @@ def _query_matches(item, query):
     )
 
 def _normalize_search_item(item, category):
-    return {
-        'title': _safe_text(item.get('title')),
-        'description': _safe_text(item.get('description') or item.get('content')),
-        'content': _safe_text(item.get('content')),
-        'link': _safe_text(item.get('link')),
-        'category': category
-    }
-
-@app.route('/')
-def index():
-    """Main page with overview of all categories"""
-    return render_template('index.html')
+    return SearchHit(item, category)
 
-@app.route('/uudised')
-def uudised():
-    """News page - aggregates news from multiple sources"""
+def _news_context():
+    """Template context of the news page"""
     try:
-        err_news = err_scraper.get_news(limit=10)
-        return render_template('uudised.html', news=err_news)
+        news = _scraper('err').get_news(limit=10)
+        err_news = _enrich(news)
+        _publish_changes('uudised', err_news, is_fallback(news))
+        return {'news': err_news, 'related': _related(err_news)}
     except Exception as e:
         print(f"Error fetching news: {e}")
-        return render_template('uudised.html', news=[], error=str(e))
+        return {'news': [], 'error': str(e)}
 
-@app.route('/syndmused')
-def syndmused():
-    """Events page - cultural events in Estonia"""
+def _events_context():
+    """Template context of the events page"""
     try:
         # Aggregate events from multiple sources
-        kultuurikava_events = kultuurikava_scraper.get_events(limit=5)
-        piletilevi_events = piletilevi_scraper.get_cultural_events(limit=5)
+        kultuurikava_events = _scraper('kultuurikava').get_events(limit=5)
+        piletilevi_events = _scraper('piletilevi').get_cultural_events(limit=5)
         
-        # Combine all events
-        all_events = kultuurikava_events + piletilevi_events
+        # Combine all events, enriched per source so sample data is left alone
+        all_events = _enrich(kultuurikava_events) + _enrich(piletilevi_events)
+        _publish_changes(
+            'syndmused', all_events, is_fallback(kultuurikava_events) or is_fallback(piletilevi_events)
+        )
         
-        return render_template('syndmused.html', events=all_events)
+        return {'events': all_events, 'related': _related(all_events)}
     except Exception as e:
         print(f"Error fetching events: {e}")
-        return render_template('syndmused.html', events=[], error=str(e))
+        return {'events': [], 'error': str(e)}
 
-@app.route('/kultuur')
-def kultuur():
-    """Culture page - information about Estonian culture from Wikipedia"""
+def _publish_changes(section, items, fallback=False):
+    """Push new, changed and removed items of a page section to /api/stream clients"""
+    try:
+        current_app.extensions['changes'].publish(section, items, fallback)
+    except Exception as e:
+        print(f"Change feed error: {e}")
+
+def _culture_context():
+    """Template context of the culture page"""
     try:
-        culture_info = wiki_scraper.get_culture_info()
-        return render_template('kultuur.html', culture_info=culture_info)
+        culture_info = _scraper('wiki').get_culture_info()
+        return {'culture_info': culture_info}
     except Exception as e:
         print(f"Error fetching culture info: {e}")
-        return render_template('kultuur.html', culture_info=[], error=str(e))
+        return {'culture_info': [], 'error': str(e)}
 
-@app.route('/api/search')
-def search():
-    """API endpoint for searching across all content"""
-    query = request.args.get('q', '').lower()
-    category = request.args.get('category', 'all')
-    
+def _gallery_context():
+    """Template context of the gallery page"""
+    try:
+        kultuurikava_events = _scraper('kultuurikava').get_events(limit=12)
+        piletilevi_events = _scraper('piletilevi').get_cultural_events(limit=12)
+        gallery_items = [
+            item for item in chain(kultuurikava_events, piletilevi_events)
+            if item.get('image')
+        ]
+
+        if len(gallery_items) < 3:
+            gallery_items = _get_gallery_fallback()
+
+        return {'gallery_items': gallery_items}
+    except Exception as e:
+        print(f"Error fetching gallery images: {e}")
+        return {'gallery_items': _get_gallery_fallback(), 'error': str(e)}
+
+# HTML pages: path -> (template, context loader), also rendered by the freeze command
+PAGES = {
+    '/': ('index.html', None),
+    '/uudised': ('uudised.html', _news_context),
+    '/syndmused': ('syndmused.html', _events_context),
+    '/kultuur': ('kultuur.html', _culture_context),
+    '/galerii': ('galerii.html', _gallery_context),
+    '/info': ('info.html', None),
+}
+
+def _render_page(path):
+    template, load_context = PAGES[path]
+    return render_template(template, **(load_context() if load_context else {}))
+
+@bp.route('/')
+def index():
+    """Main page with overview of all categories"""
+    return _render_page('/')
+
+@bp.route('/uudised')
+def uudised():
+    """News page - aggregates news from multiple sources"""
+    return _render_page('/uudised')
+
+@bp.route('/syndmused')
+def syndmused():
+    """Events page - cultural events in Estonia"""
+    return _render_page('/syndmused')
+
+@bp.route('/kultuur')
+def kultuur():
+    """Culture page - information about Estonian culture from Wikipedia"""
+    return _render_page('/kultuur')
+
+@bp.app_context_processor
+def _stream_context():
+    # Not part of the page contexts, so frozen pages are not re-rendered for it
+    return {'stream_id': current_app.extensions['changes'].last_id}
+
+def _refresh_stream_sections():
+    _news_context()
+    _events_context()
+
+def _sse(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id else []
+    lines += [f'event: {event}', f'data: {current_app.json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+@bp.route('/api/stream')
+def stream():
+    """
+    Server-Sent Events with new, changed and removed news and events ("item"
+    events, change is "new", "changed" or "removed"; removals carry only the link)
+    Resumes after Last-Event-ID (header, or ?lastEventId= for the first
+    connection); a "resync" event means changes were missed and the client
+    should reload the section from /api/news or /api/events
+    """
+    app = current_app._get_current_object()
+    if app.config['STREAM_MAX_AGE'] <= 0:
+        # 204 tells EventSource not to reconnect
+        return '', 204
+    feed = app.extensions['changes']
+    position = feed.position(request.headers.get('Last-Event-ID') or request.args.get('lastEventId'))
+    heartbeat = app.config['STREAM_HEARTBEAT']
+    deadline = time.monotonic() + app.config['STREAM_MAX_AGE']
+
+    def refresh():
+        with app.app_context():
+            _refresh_stream_sections()
+
+    if not feed.subscribe(refresh, app.config['STREAM_REFRESH_INTERVAL'], app.config['STREAM_MAX_CLIENTS']):
+        # Streams would take the threads pages need; the page works without live updates
+        return '', 204
+
+    def events(position):
+        yield f'retry: {heartbeat * 1000}\n\n'
+        if position is None:
+            position = feed.last
+            yield _sse('resync', {}, feed.event_id(position))
+        while time.monotonic() < deadline:
+            changes = feed.wait(position, timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+            if changes is None:
+                position = feed.last
+                yield _sse('resync', {}, feed.event_id(position))
+                continue
+            if not changes:
+                yield ': keepalive\n\n'
+            for position, change in changes:
+                yield _sse('item', change, feed.event_id(position))
+
+    response = app.response_class(stream_with_context(events(position)), mimetype='text/event-stream')
+    # Runs when the server closes the response, also if the generator never started
+    response.call_on_close(feed.unsubscribe)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Reverse proxies must pass events through instead of buffering the response
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Search result category per ?category= value
+SEARCH_CATEGORIES = {'uudised': 'Uudised', 'syndmused': 'Sündmused', 'kultuur': 'Kultuur'}
+
+def _search_hits(query, category='all', wait_for_details=False):
+    """Search hits in news, events and culture topics, in that order"""
     results = []
     
     try:
         if category in ['all', 'uudised']:
-            news = err_scraper.get_news(limit=20)
+            news = _enrich(_scraper('err').get_news(limit=20), block=wait_for_details)
             
             for item in news:
                 if _query_matches(item, query):
                     results.append(_normalize_search_item(item, 'Uudised'))
         
         if category in ['all', 'syndmused']:
-            kultuurikava_events = kultuurikava_scraper.get_events(limit=20)
-            piletilevi_events = piletilevi_scraper.get_cultural_events(limit=20)
-            events = kultuurikava_events + piletilevi_events
+            kultuurikava_events = _scraper('kultuurikava').get_events(limit=20)
+            piletilevi_events = _scraper('piletilevi').get_cultural_events(limit=20)
+            events = (
+                _enrich(kultuurikava_events, block=wait_for_details)
+                + _enrich(piletilevi_events, block=wait_for_details)
+            )
             for item in events:
                 if _query_matches(item, query):
                     results.append(_normalize_search_item(item, 'Sündmused'))
         
         if category in ['all', 'kultuur']:
-            culture_info = wiki_scraper.get_culture_info()
+            culture_info = _scraper('wiki').get_culture_info()
             for item in culture_info:
                 if _query_matches(item, query):
                     results.append(_normalize_search_item(item, 'Kultuur'))
     except Exception as e:
         print(f"Search error: {e}")
     
-    return jsonify(results[:20])
+    return results
 
-@app.route('/galerii')
-def galerii():
-    """Photo gallery page - recent images from cultural events"""
+@bp.route('/api/search')
+def search():
+    """API endpoint for searching across all content"""
+    query = request.args.get('q', '').lower()
+    category = request.args.get('category', 'all')
+
+    # Served from the shared on-disk index when one has been built
+    categories = None if category == 'all' else {SEARCH_CATEGORIES.get(category)}
     try:
-        kultuurikava_events = kultuurikava_scraper.get_events(limit=12)
-        piletilevi_events = piletilevi_scraper.get_cultural_events(limit=12)
-        gallery_items = [
-            item for item in chain(kultuurikava_events, piletilevi_events)
-            if item.get('image')
-        ]
+        results = current_app.extensions['search_index'].search(query, categories, limit=20)
+    except Exception as e:
+        print(f"Search index error: {e}")
+        results = None
+    if results is not None:
+        return jsonify(results)
 
-        if len(gallery_items) < 3:
-            gallery_items = _get_gallery_fallback()
+    return jsonify(_search_hits(query, category)[:20])
+
+def _all_items():
+    """(news, events, culture) used to build the suggest and related item indexes"""
+    news = _scraper('err').get_news(limit=20)
+    events = (
+        _scraper('kultuurikava').get_events(limit=20)
+        + _scraper('piletilevi').get_cultural_events(limit=20)
+    )
+    culture = _scraper('wiki').get_culture_info()
+    return news, events, culture
+
+def _build_suggest_index():
+    news, events, culture = _all_items()
+    return SuggestIndex.build(news=news, events=events, culture=culture)
+
+def _build_related_index():
+    news, events, culture = _all_items()
+    # Full texts only where already fetched, the build must not queue detail pages
+    return RelatedIndex.build(_enrich(news, fetch=False) + _enrich(events, fetch=False) + culture)
+
+def _get_shared_index(name, build, ttl, background=False):
+    """
+    Return the index in app.extensions[name], rebuilding it when older than ttl seconds
+    With background=True the rebuild runs in a thread and None is returned until
+    the first index is ready, so no request waits for it
+    """
+    state = current_app.extensions[name]
+    index = state['index']
+    if index is not None and time.monotonic() - state['built_at'] < ttl:
+        return index
+
+    # Only one request rebuilds, the others keep serving the stale index
+    if not state['lock'].acquire(blocking=index is None and not background):
+        return index
+
+    def rebuild():
+        try:
+            if state['index'] is index:
+                state['index'] = build()
+                state['built_at'] = time.monotonic()
+            return state['index']
+        finally:
+            state['lock'].release()
+
+    if not background:
+        return rebuild()
 
-        return render_template('galerii.html', gallery_items=gallery_items)
+    app = current_app._get_current_object()
+
+    def rebuild_in_background():
+        with app.app_context():
+            try:
+                rebuild()
+            except Exception as e:
+                print(f"Error building {name} index: {e}")
+
+    threading.Thread(target=rebuild_in_background, name=f'{name}-index', daemon=True).start()
+    return index
+
+def _get_suggest_index():
+    """
+    Return the typeahead index, rebuilding it when older than SUGGEST_INDEX_TTL
+    Only the first call of a worker builds it synchronously, there is nothing to serve before that
+    """
+    built = current_app.extensions['suggest']['index'] is not None
+    return _get_shared_index(
+        'suggest', _build_suggest_index, current_app.config['SUGGEST_INDEX_TTL'], background=built
+    )
+
+def _related(items):
+    """{link: related items} for the given items, shown as "Seotud" on their cards"""
+    try:
+        # Requests must not wait for the build; CLI renders (flask freeze) need the result
+        index = _get_shared_index(
+            'related', _build_related_index, current_app.config['RELATED_INDEX_TTL'],
+            background=has_request_context()
+        )
+        return index.related_map(items) if index is not None else {}
     except Exception as e:
-        print(f"Error fetching gallery images: {e}")
-        return render_template('galerii.html', gallery_items=_get_gallery_fallback(), error=str(e))
+        print(f"Related items error: {e}")
+        return {}
+
+@bp.route('/api/suggest')
+def suggest():
+    """API endpoint for typeahead completions of titles, venues and topics"""
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+
+    suggestions = []
+    try:
+        suggestions = _get_suggest_index().suggest(query, limit=limit)
+    except Exception as e:
+        print(f"Suggest error: {e}")
+
+    response = jsonify(suggestions)
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
+
+def _content_news(limit):
+    return _enrich(_scraper('err').get_news(limit=limit))
+
+def _content_events(limit):
+    # Alternate between the sources so a small limit still shows both
+    kultuurikava_events = _enrich(_scraper('kultuurikava').get_events(limit=limit))
+    piletilevi_events = _enrich(_scraper('piletilevi').get_cultural_events(limit=limit))
+    events = [
+        item for pair in zip_longest(kultuurikava_events, piletilevi_events)
+        for item in pair if item is not None
+    ]
+    return events[:limit]
 
-@app.route('/info')
+def _content_culture(limit):
+    return _scraper('wiki').get_culture_info()[:limit]
+
+# Content API sections: name -> (item class, loader taking a limit, fields left out unless asked for)
+# The full article text of news and events is large and only returned with fields=,
+# a culture topic's content is the topic itself
+CONTENT_SECTIONS = {
+    'news': (NewsItem, _content_news, ('content',)),
+    'events': (EventItem, _content_events, ('content',)),
+    'culture': (CultureTopic, _content_culture, ()),
+}
+CONTENT_MAX_LIMIT = 50
+
+class ContentRequestError(ValueError):
+    pass
+
+def _content_params():
+    """(limit, requested field names or None) from the query string"""
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), CONTENT_MAX_LIMIT)
+    except ValueError:
+        limit = 10
+    fields = request.args.get('fields')
+    if fields is None:
+        return limit, None
+    return limit, [name.strip() for name in fields.split(',') if name.strip()]
+
+def _content_section(name, limit, fields):
+    """Items of one section as dicts with only the requested fields"""
+    item_class, load, excluded = CONTENT_SECTIONS[name]
+    if fields is None:
+        fields = [field for field in item_class.fields if field not in excluded]
+    else:
+        unknown = [field for field in fields if field not in item_class.fields]
+        if unknown:
+            raise ContentRequestError(f"Unknown fields for {name}: {', '.join(unknown)}")
+
+    try:
+        items = load(limit)
+    except Exception as e:
+        print(f"Error fetching {name}: {e}")
+        items = []
+    return [{field: item.get(field) for field in fields} for item in items]
+
+def _content_response(data):
+    """JSON response with a strong ETag, answered with 304 when the client has it"""
+    response = jsonify(data)
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response.make_conditional(request)
+
+@bp.route('/api/<any(news, events, culture):section>')
+def content(section):
+    """API endpoint for news, events or culture items, see CONTENT_SECTIONS"""
+    limit, fields = _content_params()
+    try:
+        return _content_response(_content_section(section, limit, fields))
+    except ContentRequestError as e:
+        return jsonify({'error': str(e)}), 400
+
+@bp.route('/api/bundle')
+def bundle():
+    """
+    Several content sections in one response: ?sections=news,events&limit=5
+    fields= applies to every section and may name fields of any of them
+    """
+    names = [name.strip() for name in request.args.get('sections', ','.join(CONTENT_SECTIONS)).split(',')]
+    unknown = [name for name in names if name not in CONTENT_SECTIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+
+    limit, fields = _content_params()
+    if fields is not None:
+        known = {field for name in names for field in CONTENT_SECTIONS[name][0].fields}
+        unknown = [field for field in fields if field not in known]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    data = {}
+    for name in dict.fromkeys(names):
+        section_fields = fields
+        if fields is not None:
+            section_fields = [field for field in fields if field in CONTENT_SECTIONS[name][0].fields]
+        data[name] = _content_section(name, limit, section_fields)
+    return _content_response(data)
+
+@bp.route('/galerii')
+def galerii():
+    """Photo gallery page - recent images from cultural events"""
+    return _render_page('/galerii')
+
+@bp.route('/info')
 def info():
     """Information page about the application"""
-    return render_template('info.html')
+    return _render_page('/info')
+
+def _is_admin(token):
+    expected = current_app.config['ADMIN_TOKEN']
+    return bool(expected and token) and hmac.compare_digest(token.encode(), expected.encode())
+
+def _require_admin():
+    if not current_app.config['ADMIN_TOKEN']:
+        abort(404)
+    authorization = request.headers.get('Authorization', '')
+    token = request.headers.get('X-Admin-Token') or (
+        authorization[len('Bearer '):] if authorization.startswith('Bearer ') else None
+    )
+    if not _is_admin(token):
+        abort(403)
+
+# Long-lived or administrative responses are never profiled
+UNPROFILED_PREFIXES = ('/api/stream', '/admin/', '/static/')
+
+@bp.before_app_request
+def _start_profile():
+    profiler = current_app.extensions['profiler']
+    if profiler is None or request.path.startswith(UNPROFILED_PREFIXES):
+        return
+    if _is_admin(request.headers.get('X-Profile')) or random.random() < profiler.sample_rate:
+        try:
+            g.profile = profiler.start()
+        except ValueError as e:
+            # cProfile refuses to run while another profiler is active in the thread
+            print(f"Not profiling {request.path}: {e}")
+
+@bp.after_app_request
+def _profile_status(response):
+    if 'profile' in g:
+        g.profile_status = response.status_code
+    return response
+
+@bp.teardown_app_request
+def _finish_profile(exc):
+    state = g.pop('profile', None)
+    if state is None:
+        return
+    route = request.url_rule.rule if request.url_rule else request.path
+    try:
+        current_app.extensions['profiler'].stop(
+            state, route, request.method, request.full_path.rstrip('?'), g.get('profile_status', 500)
+        )
+    except OSError as e:
+        print(f"Error writing profile for {route}: {e}")
+
+@bp.route('/admin/profiles')
+def admin_profiles():
+    """Slowest kept request profiles of all workers (admin token required)"""
+    _require_admin()
+    profiler = current_app.extensions['profiler']
+    if profiler is None:
+        return jsonify({'enabled': False, 'profiles': []})
+    limit = min(max(request.args.get('limit', 20, type=int), 1), profiler.keep)
+    return jsonify({'enabled': True, 'mode': profiler.mode, 'profiles': profiler.slowest(limit)})
+
+@bp.route('/admin/profiles/<profile_id>')
+def admin_profile(profile_id):
+    """Download a profile file: collapsed stacks or pstats"""
+    _require_admin()
+    profiler = current_app.extensions['profiler']
+    found = profiler.file_of(profile_id) if profiler else None
+    if found is None:
+        abort(404)
+    return send_from_directory(*found, as_attachment=True)
+
+@bp.cli.command('freeze')
+@click.option('--output', '-o', default='build', show_default=True, help='Output directory')
+@click.option('--force', is_flag=True, help='Re-render pages even if their data did not change')
+def freeze_command(output, force):
+    """Export all pages and a search index as static files"""
+    from freeze import freeze_site
+
+    stats = freeze_site(
+        current_app, output, PAGES,
+        search_index=lambda: _search_hits(''),
+        force=force
+    )
+    click.echo(
+        f"Rendered {len(stats['written'])}, unchanged {len(stats['unchanged'])} "
+        f"-> {os.path.abspath(output)}"
+    )
+
+@bp.cli.command('index-search')
+@click.option('--output', '-o', default=None, help='Index file, defaults to SEARCH_INDEX_PATH')
+def index_search_command(output):
+    """Scrape all sources and write the search index used by /api/search"""
+    reader = current_app.extensions['search_index']
+    path = output or reader.path
+    documents = build_index(_search_hits('', wait_for_details=True), path)
+    click.echo(f"Indexed {documents} documents -> {os.path.abspath(path)}")
 
 def _get_gallery_fallback():
     """Fallback gallery items when event images are unavailable"""
     return [
-        {
-            'title': 'Laulupeo õhtuvalgus',
-            'date': datetime.now().strftime('%d.%m.%Y'),
-            'location': 'Tallinn',
-            'source': 'Koidulauliku E-laulik',
-            'link': 'https://www.laulupidu.ee/',
-            'image': 'https://images.unsplash.com/photo-1514320291840-2e0a9bf2a9ae?w=640&q=80'
-        },
-        {
-            'title': 'Tantsuõhtu rahvamajas',
-            'date': datetime.now().strftime('%d.%m.%Y'),
-            'location': 'Tartu',
-            'source': 'Koidulauliku E-laulik',
-            'link': 'https://www.kultuurikava.ee/event/tantsupidu',
-            'image': 'https://images.unsplash.com/photo-1504609813442-a8924e83f76e?w=640&q=80'
-        },
-        {
-            'title': 'Teatriõhtu vanalinnas',
-            'date': datetime.now().strftime('%d.%m.%Y'),
-            'location': 'Pärnu',
-            'source': 'Koidulauliku E-laulik',
-            'link': 'https://www.kultuurikava.ee/event/teatriohtu',
-            'image': 'https://images.unsplash.com/photo-1503095396549-807759245b35?w=640&q=80'
-        },
-        {
-            'title': 'Kontserdipäev rannal',
-            'date': datetime.now().strftime('%d.%m.%Y'),
-            'location': 'Haapsalu',
-            'source': 'Koidulauliku E-laulik',
-            'link': 'https://www.kultuurikava.ee/event/kontserdipaev-rannal',
-            'image': 'https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?w=640&q=80'
-        }
+        EventItem(
+            title='Laulupeo õhtuvalgus',
+            date=datetime.now().strftime('%d.%m.%Y'),
+            location='Tallinn',
+            source='Koidulauliku E-laulik',
+            link='https://www.laulupidu.ee/',
+            image='https://images.unsplash.com/photo-1514320291840-2e0a9bf2a9ae?w=640&q=80'
+        ),
+        EventItem(
+            title='Tantsuõhtu rahvamajas',
+            date=datetime.now().strftime('%d.%m.%Y'),
+            location='Tartu',
+            source='Koidulauliku E-laulik',
+            link='https://www.kultuurikava.ee/event/tantsupidu',
+            image='https://images.unsplash.com/photo-1504609813442-a8924e83f76e?w=640&q=80'
+        ),
+        EventItem(
+            title='Teatriõhtu vanalinnas',
+            date=datetime.now().strftime('%d.%m.%Y'),
+            location='Pärnu',
+            source='Koidulauliku E-laulik',
+            link='https://www.kultuurikava.ee/event/teatriohtu',
+            image='https://images.unsplash.com/photo-1503095396549-807759245b35?w=640&q=80'
+        ),
+        EventItem(
+            title='Kontserdipäev rannal',
+            date=datetime.now().strftime('%d.%m.%Y'),
+            location='Haapsalu',
+            source='Koidulauliku E-laulik',
+            link='https://www.kultuurikava.ee/event/kontserdipaev-rannal',
+            image='https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?w=640&q=80'
+        )
     ]
 
 if __name__ == '__main__':
+    # Development server, see gunicorn.conf.py for production
     port = int(os.environ.get('PORT', 5000))
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
-    app.run(host='0.0.0.0', port=port, debug=debug_mode)
+    create_app().run(host='0.0.0.0', port=port, debug=debug_mode)
@@ -0,0 +1,3 @@
+"""
+Benchmarks and load tests for Koidulauliku E-laulik
+"""
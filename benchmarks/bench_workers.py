@@ -0,0 +1,188 @@
+"""
+Compare gunicorn worker models on the stubbed-upstream load test
+Starts gunicorn with gunicorn.conf.py once per worker class, points it
+at the local stub upstream and replays the same request mix against it,
+optionally while --streams /api/stream connections (open browser tabs)
+are held open
+
+Usage:
+    python -m benchmarks.bench_workers --requests 400 --concurrency 32
+    python -m benchmarks.bench_workers --classes gthread,gevent --workers 2 --threads 16
+    python -m benchmarks.bench_workers --streams 16
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.loadtest import (
+    DEFAULT_MIX, DEFAULT_QUERIES, STUB_RATE_LIMITS, parse_mix, run_load, summarize
+)
+from benchmarks.stub_upstream import StubConfig, StubUpstream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/info')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"gunicorn did not answer on port {port} within {timeout} s")
+
+
+def start_gunicorn(worker_class, stub, workers, threads, shared_cache=False):
+    """Start gunicorn for worker_class against the stub, returns (process, url)"""
+    port = _free_port()
+    state_dir = tempfile.mkdtemp(prefix='bench-workers-')
+    env = dict(os.environ)
+    env.update(stub.environ())
+    env.update({
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_THREADS': str(threads),
+        'GUNICORN_WORKER_CONNECTIONS': str(max(threads, 100)),
+        'PORT': str(port),
+        'SCRAPER_RATE_LIMITS': json.dumps(STUB_RATE_LIMITS),
+        'SCRAPER_RATE_LIMIT_DIR': os.path.join(state_dir, 'ratelimit'),
+        'DETAIL_CACHE_PATH': os.path.join(state_dir, 'details.sqlite3'),
+        # Stub extracts and feed entries must not end up in the production cache files
+        'WIKIPEDIA_CACHE_PATH': os.path.join(state_dir, 'wikipedia_extracts.json'),
+        'ERR_FEED_STATE_PATH': os.path.join(state_dir, 'err-feed.json'),
+        # Without the shared cache every page waits on the upstream, which is what differs between workers
+        'SCRAPER_CACHE_URL': f"sqlite:///{os.path.join(state_dir, 'scraped.sqlite3')}" if shared_cache else 'none',
+    })
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_until_up(port, process)
+    except Exception:
+        process.kill()
+        process.wait()
+        raise
+    return process, f'http://127.0.0.1:{port}'
+
+
+def stop_gunicorn(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def open_streams(url, count):
+    """
+    Open count /api/stream connections and keep them open
+    Returns (connections, accepted); refused streams answer 204 right away
+    """
+    host, port = url.rsplit('/', 1)[-1].split(':')
+    connections = []
+    accepted = 0
+    for _ in range(count):
+        connection = http.client.HTTPConnection(host, int(port), timeout=30)
+        connection.request('GET', '/api/stream')
+        response = connection.getresponse()
+        if response.status == 200:
+            accepted += 1
+        else:
+            response.read()
+        connections.append(connection)
+    return connections, accepted
+
+
+def available(worker_class):
+    if worker_class == 'gevent':
+        return importlib.util.find_spec('gevent') is not None
+    return importlib.util.find_spec('gunicorn') is not None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker classes on the stub load test')
+    parser.add_argument('--classes', default=','.join(WORKER_CLASSES), help='worker classes to compare')
+    parser.add_argument('--workers', type=int, default=2, help='worker processes for every class')
+    parser.add_argument('--threads', type=int, default=16, help='threads (gthread) or connections (gevent) per worker')
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--queries', default=DEFAULT_QUERIES)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--duration', type=float, help='run each class for N seconds instead')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--items', type=int, default=30)
+    parser.add_argument('--shared-cache', action='store_true', help='keep the SQLite scraped data cache on')
+    parser.add_argument('--streams', type=int, default=0, help='/api/stream connections held open during the run')
+    parser.add_argument('--json', action='store_true', help='print the summaries as JSON')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    mix = parse_mix(args.mix)
+    queries = [query.strip() for query in args.queries.split(',') if query.strip()]
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.failure_rate, args.items)
+
+    results = {}
+    with StubUpstream(config) as stub:
+        for worker_class in [name.strip() for name in args.classes.split(',') if name.strip()]:
+            if not available(worker_class):
+                print(f"Skipping {worker_class}: not installed", file=sys.stderr)
+                continue
+            process, url = start_gunicorn(worker_class, stub, args.workers, args.threads, args.shared_cache)
+            streams = []
+            try:
+                streams, accepted = open_streams(url, args.streams)
+                result = run_load(url, mix, queries, args.requests, args.duration,
+                                  args.concurrency, args.warmup)
+            finally:
+                for connection in streams:
+                    connection.close()
+                stop_gunicorn(process)
+            results[worker_class] = dict(summarize(result)['TOTAL'], streams=accepted)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{args.workers} workers, {args.threads} threads/connections each, concurrency {args.concurrency}, "
+          f"upstream latency {args.latency_ms:.0f} ms, shared cache {'on' if args.shared_cache else 'off'}, "
+          f"{args.streams} streams opened")
+    print(f"{'worker':<10}{'streams':>8}{'req':>7}{'err':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}")
+    for worker_class, row in results.items():
+        print(
+            f"{worker_class:<10}{row['streams']:>8}{row['requests']:>7}{row['errors']:>6}{row['rps']:>9.1f}"
+            f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
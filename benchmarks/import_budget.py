@@ -0,0 +1,95 @@
+"""
+Import-time budget check
+Measures how long a fresh interpreter needs to import app.py and call
+create_app(), and fails when it exceeds the budget or when a heavy
+scraping dependency is imported eagerly
+
+Usage: python -m benchmarks.import_budget [--budget-ms 150] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Imported only when a scraper is first used
+HEAVY_MODULES = ['requests', 'bs4', 'lxml', 'scrapy']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'ms': elapsed * 1000,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(runs):
+    """Run the probe in fresh interpreters, return (timings, eagerly loaded modules)"""
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['ms'])
+        loaded.update(result['loaded'])
+    return timings, sorted(loaded)
+
+
+def slowest_imports(count=10):
+    """Top cumulative import times from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check cold import time of the Flask app')
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('IMPORT_BUDGET_MS', 150)))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='show the N slowest imports')
+    args = parser.parse_args()
+
+    timings, loaded = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"create_app() cold start: median {median:.1f} ms, "
+          f"min {min(timings):.1f} ms, max {max(timings):.1f} ms ({args.runs} runs)")
+
+    if args.top:
+        print("Slowest imports (cumulative):")
+        for microseconds, name in slowest_imports(args.top):
+            print(f"  {microseconds / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median {median:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print(f"OK: within budget of {args.budget_ms:.0f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Load generator for the Flask app
+Replays a weighted mix of page and search requests and reports
+throughput and p50/p95/p99 latency per route. By default the app runs
+in-process with its scrapers pointed at the local stub upstream
+
+Usage:
+    python -m benchmarks.loadtest --requests 500 --concurrency 8
+    python -m benchmarks.loadtest --mix "/uudised=3,/api/search=5" --failure-rate 0.1
+    python -m benchmarks.loadtest --target http://127.0.0.1:8000 --duration 30
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import quote, urlparse
+
+from benchmarks.stub_upstream import StubConfig, StubUpstream
+
+# Outbound limits for the stub host, high enough to measure the app rather than the limiter
+STUB_RATE_LIMITS = {'*': {'rate': 1000, 'burst': 1000, 'concurrency': 64}}
+
+DEFAULT_MIX = '/=2,/uudised=3,/syndmused=3,/kultuur=1,/galerii=1,/api/search=4'
+DEFAULT_QUERIES = 'muusika,teater,kunst,laulupidu,tallinn,kontsert,näitus,ooper'
+
+
+def parse_mix(text):
+    """Parse 'route=weight,...' into a list of (route, weight)"""
+    mix = []
+    for part in text.split(','):
+        route, _, weight = part.strip().partition('=')
+        mix.append((route, float(weight or 1)))
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class _Client:
+    """Keep-alive HTTP connection owned by a single worker thread"""
+
+    def __init__(self, base_url, timeout):
+        url = urlparse(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.connection = None
+
+    def get(self, path):
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request('GET', path)
+                response = self.connection.getresponse()
+                response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return response.status
+            except (http.client.HTTPException, ConnectionError):
+                # Server closed an idle keep-alive connection, retry once
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_load(base_url, mix, queries, requests=500, duration=None, concurrency=8,
+             warmup=0, timeout=60, seed=1):
+    """
+    Send requests until `requests` are done or `duration` seconds pass
+    Returns {'elapsed': seconds, 'routes': {route: {'latencies': [...], 'errors': n}}}
+    """
+    routes = [route for route, _ in mix]
+    weights = [weight for _, weight in mix]
+    results = defaultdict(lambda: {'latencies': [], 'errors': 0})
+    lock = threading.Lock()
+    counter = {'sent': 0}
+    deadline = None
+
+    def next_request(rng):
+        with lock:
+            if duration is None and counter['sent'] >= requests:
+                return None
+            counter['sent'] += 1
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        route = rng.choices(routes, weights)[0]
+        path = route
+        if route == '/api/search':
+            path = f"{route}?q={quote(rng.choice(queries))}"
+        return route, path
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        client = _Client(base_url, timeout)
+        try:
+            while True:
+                request = next_request(rng)
+                if request is None:
+                    return
+                route, path = request
+                start = time.perf_counter()
+                try:
+                    status = client.get(path)
+                    failed = status >= 500
+                except (OSError, http.client.HTTPException):
+                    failed = True
+                elapsed = time.perf_counter() - start
+                with lock:
+                    results[route]['latencies'].append(elapsed)
+                    if failed:
+                        results[route]['errors'] += 1
+        finally:
+            client.close()
+
+    # Warm caches so cold-start scraping does not dominate the percentiles
+    warm = _Client(base_url, timeout)
+    for route in routes:
+        for _ in range(warmup):
+            try:
+                warm.get(route if route != '/api/search' else f"{route}?q={quote(queries[0])}")
+            except (OSError, http.client.HTTPException):
+                pass
+    warm.close()
+
+    start = time.perf_counter()
+    if duration is not None:
+        deadline = start + duration
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'elapsed': time.perf_counter() - start, 'routes': dict(results)}
+
+
+def summarize(result):
+    """Per-route and total throughput/latency figures in milliseconds"""
+    elapsed = result['elapsed'] or 1e-9
+    rows = {}
+    everything = []
+    errors = 0
+    for route, data in sorted(result['routes'].items()):
+        latencies = sorted(data['latencies'])
+        everything.extend(latencies)
+        errors += data['errors']
+        rows[route] = _row(latencies, data['errors'], elapsed)
+    everything.sort()
+    rows['TOTAL'] = _row(everything, errors, elapsed)
+    return rows
+
+
+def _row(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'max': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def format_report(rows):
+    lines = [f"{'route':<16}{'req':>7}{'err':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for route, row in rows.items():
+        lines.append(
+            f"{route:<16}{row['requests']:>7}{row['errors']:>6}{row['rps']:>9.1f}"
+            f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def serve_app_in_thread(scraper_options):
+    """Start the app on a threaded Werkzeug server, returns (server, url)"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import create_app
+    from scrapers.ratelimit import HostRateLimiter, set_limiter
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    state_dir = tempfile.mkdtemp(prefix='loadtest-')
+    set_limiter(HostRateLimiter(
+        state_dir=os.path.join(state_dir, 'ratelimit'),
+        host_limits={},
+        default_limits=STUB_RATE_LIMITS['*']
+    ))
+    # Stub extracts and feed entries must not end up in the production cache files
+    scraper_options = dict(scraper_options)
+    scraper_options['wiki'] = {
+        **scraper_options.get('wiki', {}), 'cache_path': os.path.join(state_dir, 'wikipedia_extracts.json')
+    }
+    scraper_options['err'] = {
+        **scraper_options.get('err', {}), 'feed_state_path': os.path.join(state_dir, 'err-feed.json')
+    }
+    scraper_options['enricher'] = {
+        **scraper_options.get('enricher', {}), 'cache_path': os.path.join(state_dir, 'details.sqlite3')
+    }
+    app = create_app({
+        'SCRAPER_OPTIONS': scraper_options,
+        # An explicit SCRAPER_CACHE_URL (e.g. the Redis stub) is kept
+        'SCRAPER_CACHE_URL': (
+            os.environ.get('SCRAPER_CACHE_URL') or f"sqlite:///{os.path.join(state_dir, 'scraped.sqlite3')}"
+        ),
+    })
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Load test the app against stubbed upstreams')
+    parser.add_argument('--target', help='URL of an already running app (default: start one in-process)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='weighted routes, e.g. "/=2,/api/search=4"')
+    parser.add_argument('--queries', default=DEFAULT_QUERIES, help='comma separated search queries')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--duration', type=float, help='run for N seconds instead of a request count')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=1, help='requests per route before measuring')
+    parser.add_argument('--latency-ms', type=float, default=80, help='stub upstream latency')
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='stub upstream failure rate 0..1')
+    parser.add_argument('--items', type=int, default=30, help='items per stub upstream page')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    mix = parse_mix(args.mix)
+    queries = [query.strip() for query in args.queries.split(',') if query.strip()]
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.failure_rate, args.items)
+
+    with StubUpstream(config) as stub:
+        server = None
+        base_url = args.target
+        if base_url is None:
+            server, base_url = serve_app_in_thread(stub.scraper_options())
+        else:
+            print("Point the target app at the stub upstream with:", file=sys.stderr)
+            for variable, url in stub.environ().items():
+                print(f"  {variable}={url}", file=sys.stderr)
+            print(f"  SCRAPER_RATE_LIMITS='{json.dumps(STUB_RATE_LIMITS)}'", file=sys.stderr)
+
+        try:
+            result = run_load(base_url, mix, queries, args.requests, args.duration,
+                              args.concurrency, args.warmup)
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    rows = summarize(result)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{rows['TOTAL']['requests']} requests in {result['elapsed']:.1f} s, "
+              f"concurrency {args.concurrency}, upstream latency {args.latency_ms:.0f} ms, "
+              f"failure rate {args.failure_rate:.0%}")
+        print(format_report(rows))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
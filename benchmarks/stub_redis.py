@@ -0,0 +1,132 @@
+"""
+In-process stand-in for a Redis server
+Understands the handful of commands RedisCache uses (GET, SET with PX/EX/NX,
+DEL, PING, SELECT, AUTH), so the Redis cache backend can be exercised
+without installing Redis
+
+Usage: python -m benchmarks.stub_redis [--port 6380]
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _Store:
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+
+class StubRedisHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                command = self._read_command()
+            except (OSError, ValueError):
+                return
+            if command is None:
+                return
+            self.wfile.write(self._execute(command))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _execute(self, args):
+        store = self.server.store
+        name = args[0].upper()
+        with store.lock:
+            if name in (b'PING', b'SELECT', b'AUTH'):
+                return b'+PONG\r\n' if name == b'PING' else b'+OK\r\n'
+            if name == b'GET':
+                value = store.get(args[1])
+                return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+            if name == b'SET':
+                key, value, options = args[1], args[2], [arg.upper() for arg in args[3:]]
+                expires_at = None
+                if b'PX' in options:
+                    expires_at = time.monotonic() + int(args[3 + options.index(b'PX') + 1]) / 1000
+                elif b'EX' in options:
+                    expires_at = time.monotonic() + int(args[3 + options.index(b'EX') + 1])
+                if b'NX' in options and store.get(key) is not None:
+                    return b'$-1\r\n'
+                store.values[key] = (value, expires_at)
+                return b'+OK\r\n'
+            if name == b'DEL':
+                removed = sum(store.values.pop(key, None) is not None for key in args[1:])
+                return b':%d\r\n' % removed
+            if name == b'FLUSHDB':
+                store.values.clear()
+                return b'+OK\r\n'
+        return b'-ERR unknown command\r\n'
+
+
+class StubRedis:
+    """Runs the stand-in server in a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.server = socketserver.ThreadingTCPServer((host, port), StubRedisHandler)
+        self.server.daemon_threads = True
+        self.server.store = _Store()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a minimal Redis stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+
+    stub = StubRedis(args.host, args.port)
+    print(f"Redis stand-in listening, export SCRAPER_CACHE_URL={stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
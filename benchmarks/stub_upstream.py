@@ -0,0 +1,322 @@
+"""
+Local stub of the scraped upstream sites
+Serves ERR (HTML page plus RSS and Atom feeds), Kultuurikava, Piletilevi
+and Wikipedia API look-alikes with configurable latency and failure rate,
+so load tests never touch the real sites
+
+Usage: python -m benchmarks.stub_upstream [--port 8001] [--latency-ms 80]
+"""
+
+import argparse
+import html
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from scrapers.registry import BASE_URL_ENV
+
+WORDS = [
+    'kontsert', 'teater', 'näitus', 'laulupidu', 'ooper', 'ballett', 'festival',
+    'muuseum', 'kirjandus', 'koor', 'rahvatants', 'kunst', 'film', 'luule',
+    'Tallinn', 'Tartu', 'Pärnu', 'Narva', 'Viljandi', 'Haapsalu'
+]
+VENUES = [
+    'Estonia teater, Tallinn', 'Vanemuine, Tartu', 'Pärnu Kontserdimaja',
+    'Kumu, Tallinn', 'Eesti Rahva Muuseum, Tartu', 'Narva Muuseum'
+]
+
+
+class StubConfig:
+    """Behaviour of the stub server, shared by all handler threads"""
+
+    def __init__(self, latency_ms=80, jitter_ms=20, failure_rate=0.0, items=30, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.items = items
+        self.seed = seed
+        self.wiki_titles = {}
+        # Rendered feeds by (format, items, origin), a real feed is a static file too
+        self.feeds = {}
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def render_err(config):
+    rng = random.Random(config.seed)
+    articles = []
+    for number in range(config.items):
+        articles.append(
+            f'<article class="list-article">'
+            f'<a href="/{1609000000 + number}/uudis-{number}"><h2>{html.escape(_sentence(rng, 5))}</h2></a>'
+            f'<img src="/images/{number}.jpg">'
+            f'<p class="lead">{html.escape(_sentence(rng, 40))}</p>'
+            f'<time class="date">2026-10-{1 + number % 28:02d}</time>'
+            f'</article>'
+        )
+    return f'<html><body><main>{"".join(articles)}</main></body></html>'
+
+
+def _feed_entries(config, origin):
+    """ERR feed entries newest first; raising config.items publishes new ones on top"""
+    published = datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc)
+    for number in reversed(range(config.items)):
+        rng = random.Random(f'{config.seed}:feed:{number}')
+        yield {
+            'link': f'{origin}/err/{1609000000 + number}/uudis-{number}',
+            'title': _sentence(rng, 5),
+            'summary': _sentence(rng, 40),
+            'published': published + timedelta(hours=number),
+            'image': f'{origin}/images/{number}.jpg',
+        }
+
+
+def feed_etag(config):
+    return f'"feed-{config.seed}-{config.items}"'
+
+
+def render_err_rss(config, origin):
+    items = ''.join(
+        f'<item><title>{html.escape(entry["title"])}</title>'
+        f'<link>{entry["link"]}</link><guid isPermaLink="true">{entry["link"]}</guid>'
+        f'<description>{html.escape("<p>" + entry["summary"] + "</p>")}</description>'
+        f'<pubDate>{format_datetime(entry["published"])}</pubDate>'
+        f'<enclosure url="{entry["image"]}" type="image/jpeg" length="0"/></item>'
+        for entry in _feed_entries(config, origin)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f'<title>ERR Kultuur</title><link>{origin}/err</link>{items}</channel></rss>'
+    )
+
+
+def render_err_atom(config, origin):
+    entries = ''.join(
+        f'<entry><title>{html.escape(entry["title"])}</title>'
+        f'<link href="{entry["link"]}"/><id>{entry["link"]}</id>'
+        f'<summary>{html.escape(entry["summary"])}</summary>'
+        f'<published>{entry["published"].isoformat()}</published>'
+        f'<link rel="enclosure" type="image/jpeg" href="{entry["image"]}"/></entry>'
+        for entry in _feed_entries(config, origin)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+        f'<title>ERR Kultuur</title><id>{origin}/err</id>{entries}</feed>'
+    )
+
+
+def render_events(config, item_class):
+    rng = random.Random(config.seed + len(item_class))
+    events = []
+    for number in range(config.items):
+        events.append(
+            f'<div class="{item_class}">'
+            f'<h3>{html.escape(_sentence(rng, 4))} {number}</h3>'
+            f'<a href="/event/{item_class}-{number}">Vaata</a>'
+            f'<img data-src="/images/event-{number}.jpg">'
+            f'<p class="description">{html.escape(_sentence(rng, 50))}</p>'
+            f'<span class="date">{1 + number % 28:02d}.11.2026</span>'
+            f'<span class="venue">{html.escape(rng.choice(VENUES))}</span>'
+            f'</div>'
+        )
+    return f'<html><body><section>{"".join(events)}</section></body></html>'
+
+
+def render_detail(config, path):
+    """Article or event detail page with JSON-LD, like the real sites"""
+    rng = random.Random(f'{config.seed}:{path}')
+    paragraphs = ''.join(f'<p>{html.escape(_sentence(rng, 30))}</p>' for _ in range(6))
+    if '/event/' in path:
+        data = {
+            '@context': 'https://schema.org', '@type': 'MusicEvent',
+            'name': _sentence(rng, 4), 'startDate': '2026-11-14T19:00:00+02:00',
+            'location': {'@type': 'Place', 'name': rng.choice(VENUES)},
+            'image': f'{path}/cover.jpg',
+        }
+    else:
+        data = {
+            '@context': 'https://schema.org', '@type': 'NewsArticle',
+            'headline': _sentence(rng, 5), 'datePublished': '2026-10-18T09:30:00+03:00',
+            'image': {'@type': 'ImageObject', 'url': f'{path}/cover.jpg'},
+        }
+    return (
+        f'<html><head><script type="application/ld+json">{json.dumps(data)}</script></head>'
+        f'<body><article>{paragraphs}</article></body></html>'
+    )
+
+
+def _wiki_page(config, title):
+    page_id = 1000 + zlib.crc32(title.encode('utf-8')) % 100000
+    return {
+        'pageid': page_id,
+        'title': title,
+        'lastrevid': 5000000 + page_id,
+        'touched': '2026-10-01T12:00:00Z',
+        'fullurl': f'https://et.wikipedia.org/wiki/{title.replace(" ", "_")}',
+    }
+
+
+def render_wikipedia(config, params):
+    """Minimal action=query answer for prop=info (titles) and prop=extracts (pageids)"""
+    pages = {}
+    if 'titles' in params:
+        for title in params['titles'][0].split('|'):
+            page = _wiki_page(config, title)
+            config.wiki_titles[page['pageid']] = title
+            pages[str(page['pageid'])] = page
+    for page_id in params.get('pageids', [''])[0].split('|'):
+        if page_id.isdigit() and int(page_id) in config.wiki_titles:
+            pages[page_id] = _wiki_page(config, config.wiki_titles[int(page_id)])
+
+    if 'extracts' in params.get('prop', [''])[0]:
+        for page in pages.values():
+            rng = random.Random(f"{config.seed}:{page['title']}")
+            page['extract'] = _sentence(rng, 120)
+    return json.dumps({'query': {'pages': pages}})
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def handle(self):
+        # Streaming scrapers close the connection as soon as they have enough items
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        config = self.server.config
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+
+        if random.random() < config.failure_rate:
+            self._send(503, 'text/plain', 'Service Unavailable')
+            return
+
+        url = urlparse(self.path)
+        if url.path.rstrip('/') in ('/err/rss', '/err/atom'):
+            self._send_feed(config, url.path.rstrip('/').endswith('rss'))
+        elif url.path.startswith('/err/') and len(url.path.strip('/').split('/')) > 2:
+            self._send(200, 'text/html; charset=utf-8', render_detail(config, url.path))
+        elif '/event/' in url.path:
+            self._send(200, 'text/html; charset=utf-8', render_detail(config, url.path))
+        elif url.path.startswith('/err'):
+            self._send(200, 'text/html; charset=utf-8', render_err(config))
+        elif url.path.startswith('/kultuurikava'):
+            self._send(200, 'text/html; charset=utf-8', render_events(config, 'event-card'))
+        elif url.path.startswith('/piletilevi'):
+            self._send(200, 'text/html; charset=utf-8', render_events(config, 'event'))
+        elif url.path.startswith('/wiki/w/api.php'):
+            self._send(200, 'application/json', render_wikipedia(config, parse_qs(url.query)))
+        else:
+            self._send(404, 'text/plain', 'Not Found')
+
+    def _send_feed(self, config, rss):
+        """RSS or Atom feed, answered with 304 while the client's ETag is current"""
+        etag = feed_etag(config)
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, None, '', {'ETag': etag})
+            return
+        origin = f"http://{self.headers.get('Host')}"
+        key = (rss, config.items, origin)
+        if key not in config.feeds:
+            config.feeds[key] = render_err_rss(config, origin) if rss else render_err_atom(config, origin)
+        content_type = 'application/rss+xml' if rss else 'application/atom+xml'
+        self._send(200, f'{content_type}; charset=utf-8', config.feeds[key], {'ETag': etag})
+
+    def _send(self, status, content_type, body, headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubUpstream:
+    """Runs the stub server in a background thread"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.server = ThreadingHTTPServer((host, port), StubHandler)
+        self.server.daemon_threads = True
+        self.server.config = config or StubConfig()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def base_urls(self):
+        """Base URL per scraper name"""
+        return {
+            'err': f'{self.url}/err',
+            'wiki': f'{self.url}/wiki',
+            'kultuurikava': f'{self.url}/kultuurikava',
+            'piletilevi': f'{self.url}/piletilevi',
+        }
+
+    def scraper_options(self):
+        """Value for the app's SCRAPER_OPTIONS config"""
+        return {name: {'base_url': url} for name, url in self.base_urls().items()}
+
+    def environ(self):
+        """Environment variables that point an out-of-process app at the stub"""
+        return {BASE_URL_ENV[name]: url for name, url in self.base_urls().items()}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve stub upstream sites for load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--items', type=int, default=30)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.failure_rate, args.items)
+    stub = StubUpstream(config, args.host, args.port)
+    print(f"Stub upstream listening on {stub.url}")
+    for variable, url in stub.environ().items():
+        print(f"  export {variable}={url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Change feed behind the /api/stream Server-Sent Events endpoint
+Every load of a page section is compared with the previous load of the
+same section, new, changed and removed items are appended to a ring buffer
+with increasing ids. Sample data of a failed scrape is never pushed. Stream
+clients wait on the buffer and resume from the id of the last event they
+saw (Last-Event-ID)
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+
+# Changes kept for resuming clients, older ids get a resync instead
+BUFFER_SIZE = 500
+# Full article text is too large to push, clients only render cards
+EXCLUDED_FIELDS = ('content',)
+
+
+def _digest(item):
+    data = json.dumps(item.to_dict(), sort_keys=True, ensure_ascii=False, default=str)
+    return zlib.crc32(data.encode('utf-8'))
+
+
+class ChangeFeed:
+    """Recent item changes of one process, shared by all its threads"""
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        # Ids of another worker or an earlier run of this one cannot be resumed
+        self.epoch = f'{os.getpid():x}{time.time_ns():x}'
+        self._changes = deque(maxlen=buffer_size)
+        self._last = 0
+        self._digests = {}
+        self._condition = threading.Condition()
+        self._subscribers = 0
+        self._refresher = None
+
+    @property
+    def last(self):
+        """Buffer position of the latest change"""
+        return self._last
+
+    @property
+    def last_id(self):
+        """Event id of the latest change, a client starting from it only gets later ones"""
+        return self.event_id(self._last)
+
+    def position(self, event_id):
+        """Buffer position of an event id, or None when it cannot be resumed from"""
+        if not event_id:
+            return self._last
+        epoch, _, number = event_id.rpartition('-')
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        number = int(number)
+        with self._condition:
+            oldest = self._changes[0][0] - 1 if self._changes else self._last
+            if number < oldest or number > self._last:
+                return None
+        return number
+
+    def publish(self, section, items, fallback=False):
+        """
+        Record the current items of a section and return how many changes were published
+        The first load of a section only sets the baseline, clients rendered it already.
+        A fallback load (sample data of a failed scrape) is only used as that baseline,
+        so the first real load afterwards replaces the sample cards
+        """
+        digests = {}
+        for item in items:
+            if item.get('link'):
+                digests.setdefault(item.get('link'), (_digest(item), item))
+
+        with self._condition:
+            previous = self._digests.get(section)
+            if fallback and previous is not None:
+                return 0
+            self._digests[section] = {link: digest for link, (digest, _) in digests.items()}
+            if previous is None:
+                return 0
+
+            published = 0
+            for link, (digest, item) in digests.items():
+                if previous.get(link) == digest:
+                    continue
+                self._last += 1
+                self._changes.append((self._last, {
+                    'section': section,
+                    'change': 'changed' if link in previous else 'new',
+                    'item': {
+                        field: value for field, value in item.to_dict().items()
+                        if field not in EXCLUDED_FIELDS
+                    },
+                }))
+                published += 1
+            for link in previous.keys() - digests.keys():
+                self._last += 1
+                self._changes.append((self._last, {
+                    'section': section, 'change': 'removed', 'item': {'link': link},
+                }))
+                published += 1
+            if published:
+                self._condition.notify_all()
+            return published
+
+    def wait(self, position, timeout):
+        """
+        [(number, change)] after position, waiting up to timeout seconds for one
+        Returns None when changes after position were already dropped from the buffer
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._last > position, timeout)
+            changes = [(number, change) for number, change in self._changes if number > position]
+            if self._last > position and (not changes or changes[0][0] != position + 1):
+                return None
+            return changes
+
+    def event_id(self, number):
+        return f'{self.epoch}-{number}'
+
+    def subscribe(self, refresh, interval, limit=None):
+        """
+        Register a stream client; while any is connected refresh() is called
+        every interval seconds in a background thread so changes keep coming
+        without page reloads. Returns False when limit clients are connected
+        """
+        with self._condition:
+            if limit is not None and self._subscribers >= limit:
+                return False
+            self._subscribers += 1
+            if self._refresher is None or not self._refresher.is_alive():
+                self._refresher = threading.Thread(
+                    target=self._refresh_loop, args=(refresh, interval), name='change-feed', daemon=True
+                )
+                self._refresher.start()
+            return True
+
+    def unsubscribe(self):
+        with self._condition:
+            self._subscribers -= 1
+
+    def _refresh_loop(self, refresh, interval):
+        while True:
+            time.sleep(interval)
+            with self._condition:
+                if not self._subscribers:
+                    self._refresher = None
+                    return
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Change feed refresh error: {e}")
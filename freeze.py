@@ -0,0 +1,130 @@
+"""
+Static site export
+Renders every HTML page and a JSON search index into a directory that a
+CDN or nginx can serve without Python. Pages whose data and templates did
+not change since the previous export are left untouched
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from flask import render_template
+
+MANIFEST_NAME = '.freeze-manifest.json'
+SEARCH_INDEX_NAME = 'search-index.json'
+
+
+def output_path(output_dir, path):
+    """'/' -> index.html, '/uudised' -> uudised/index.html"""
+    relative = path.strip('/')
+    return os.path.join(output_dir, relative, 'index.html') if relative else os.path.join(output_dir, 'index.html')
+
+
+def write_atomic(path, data):
+    """Write bytes through a temporary file and rename it into place"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.freeze-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _template_source(app, name):
+    source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+    return source
+
+
+def _fingerprint(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8') if isinstance(part, str) else part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _copy_static(app, output_dir, manifest, stats):
+    """Mirror the static folder, copying only files whose content changed"""
+    static_root = app.static_folder
+    for directory, _, files in os.walk(static_root):
+        for name in files:
+            source = os.path.join(directory, name)
+            relative = os.path.relpath(source, static_root)
+            with open(source, 'rb') as static_file:
+                data = static_file.read()
+            key = f"static/{relative.replace(os.sep, '/')}"
+            target = os.path.join(output_dir, 'static', relative)
+            fingerprint = _fingerprint(data)
+            if manifest.get(key) == fingerprint and os.path.exists(target):
+                stats['unchanged'].append(key)
+                continue
+            write_atomic(target, data)
+            manifest[key] = fingerprint
+            stats['written'].append(key)
+
+
+def freeze_site(app, output_dir, pages, search_index=None, force=False):
+    """
+    Export `pages` ({path: (template, context loader)}) into output_dir
+    `search_index` is a callable returning the items of search-index.json
+    Returns {'written': [...], 'unchanged': [...]}
+    """
+    manifest = {} if force else _load_manifest(output_dir)
+    stats = {'written': [], 'unchanged': []}
+    # Every page extends base.html, so it is part of each fingerprint
+    base_source = _template_source(app, 'base.html')
+
+    with app.app_context():
+        for path, (template, load_context) in pages.items():
+            context = load_context() if load_context else {}
+            fingerprint = _fingerprint(
+                base_source,
+                _template_source(app, template),
+                app.json.dumps(context, sort_keys=True)
+            )
+            target = output_path(output_dir, path)
+            if manifest.get(path) == fingerprint and os.path.exists(target):
+                stats['unchanged'].append(path)
+                continue
+
+            with app.test_request_context(path):
+                html = render_template(template, **context)
+            write_atomic(target, html.encode('utf-8'))
+            manifest[path] = fingerprint
+            stats['written'].append(path)
+
+        if search_index is not None:
+            data = app.json.dumps(search_index()).encode('utf-8')
+            fingerprint = _fingerprint(data)
+            target = os.path.join(output_dir, SEARCH_INDEX_NAME)
+            if manifest.get(SEARCH_INDEX_NAME) == fingerprint and os.path.exists(target):
+                stats['unchanged'].append(SEARCH_INDEX_NAME)
+            else:
+                write_atomic(target, data)
+                manifest[SEARCH_INDEX_NAME] = fingerprint
+                stats['written'].append(SEARCH_INDEX_NAME)
+
+    if app.static_folder and os.path.isdir(app.static_folder):
+        _copy_static(app, output_dir, manifest, stats)
+
+    write_atomic(
+        os.path.join(output_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+    )
+    return stats
@@ -0,0 +1,63 @@
+"""
+gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every page waits on upstream sites, so the worker model decides how many
+slow requests can be in flight at once. GUNICORN_WORKER_CLASS selects:
+
+    sync     one request per process; a slow upstream blocks the whole
+             worker. Simple, but needs many processes, and /api/stream is
+             switched off because a stream would pin a worker
+    gthread  (default) GUNICORN_THREADS requests per process in OS threads.
+             An open /api/stream holds a thread, so at most a quarter of
+             them serve streams (STREAM_MAX_CLIENTS); further tabs get no
+             live updates instead of starving the pages
+    gevent   greenlets: the standard library is monkey-patched, so the
+             scrapers' requests calls, the rate limiter's sleeps and the
+             detail page pool all yield to other requests while waiting.
+             Streams are cheap greenlets, the app's default cap applies.
+             Needs the gevent package (not available on Windows)
+
+Other settings: PORT (5000), WEB_CONCURRENCY (worker processes),
+GUNICORN_THREADS (8), GUNICORN_WORKER_CONNECTIONS (gevent, 200),
+STREAM_MAX_CLIENTS (open streams per process)
+"""
+
+import multiprocessing
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before gunicorn or anything else imports ssl, socket and threading
+    # in the master; workers inherit the patched modules when they fork
+    from gevent import monkey
+
+    monkey.patch_all()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+_cpus = multiprocessing.cpu_count()
+# gunicorn turns sync workers into gthread ones when threads > 1
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+if worker_class == 'sync':
+    workers = int(os.environ.get('WEB_CONCURRENCY', _cpus * 2 + 1))
+    # Long-lived streams would tie up a whole process, tell browsers to stop connecting
+    raw_env = ['STREAM_MAX_AGE=0']
+else:
+    workers = int(os.environ.get('WEB_CONCURRENCY', _cpus))
+    if worker_class == 'gthread' and 'STREAM_MAX_CLIENTS' not in os.environ:
+        # Each open stream holds a thread until STREAM_MAX_AGE, keep most threads for pages
+        raw_env = [f'STREAM_MAX_CLIENTS={max(threads // 4, 1)}']
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+
+# The scrapers time out after 10 s per upstream request, a page may make several
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Each worker imports the app itself: module-level locks and the scrapers'
+# HTTP sessions must be created after gevent has patched the worker
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
@@ -0,0 +1,212 @@
+"""
+Opt-in request profiling
+Selected requests are profiled by a wall-clock stack sampler (default: a
+background thread reads the request thread's stack from
+sys._current_frames() every few milliseconds, so time spent waiting on
+upstream sites shows up next to parsing, matching and template rendering)
+or by cProfile. The sampler writes collapsed stacks ("a;b;c 12" lines, the
+input format of flamegraph.pl, speedscope and inferno), cProfile writes
+pstats files. Every profile gets a JSON sidecar with route and duration
+
+Only the request's own thread is profiled, not the detail page pool or
+background index builds. Under gevent workers all greenlets share one OS
+thread, so profile with sync or gthread workers
+"""
+
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'profiles')
+# Seconds between stack samples
+DEFAULT_INTERVAL = 0.005
+# Profiles kept on disk, the oldest are deleted when new ones are written
+DEFAULT_KEEP = 200
+MODES = {'sample': 'collapsed', 'cprofile': 'pstats'}
+
+_PROFILE_ID = re.compile(r'^[\w-]+$')
+
+
+def _path_prefixes():
+    paths = {os.path.dirname(os.path.abspath(__file__))}
+    paths.update(os.path.abspath(path) for path in sys.path if path and os.path.isdir(path))
+    return sorted((path.rstrip(os.sep) + os.sep for path in paths), key=len, reverse=True)
+
+
+_prefixes = _path_prefixes()
+_labels = {}
+
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for prefix in _prefixes:
+            if filename.startswith(prefix):
+                filename = filename[len(prefix):]
+                break
+        # ';' separates frames in the collapsed format
+        label = f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+        _labels[code] = label
+    return label
+
+
+def collapse(frame):
+    """Collapsed-stack line of a frame, outermost call first"""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """One background thread sampling the stacks of every registered thread"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self._targets = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def add(self, thread_id):
+        """Start sampling a thread, returns its {stack: samples} Counter"""
+        counts = Counter()
+        with self._condition:
+            self._targets[thread_id] = counts
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return counts
+
+    def remove(self, thread_id):
+        """Stop sampling a thread; its Counter is not touched afterwards"""
+        with self._condition:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._targets)
+                thread_ids = list(self._targets)
+            frames = sys._current_frames()
+            stacks = {
+                thread_id: collapse(frames[thread_id])
+                for thread_id in thread_ids if thread_id in frames
+            }
+            del frames
+            with self._condition:
+                for thread_id, stack in stacks.items():
+                    if thread_id in self._targets:
+                        self._targets[thread_id][stack] += 1
+            time.sleep(self.interval)
+
+
+class RequestProfiler:
+    """Profiles requests and keeps the newest `keep` profiles in directory"""
+
+    def __init__(self, directory=None, mode='sample', sample_rate=0.0, interval=DEFAULT_INTERVAL, keep=DEFAULT_KEEP):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self._sampler = StackSampler(interval) if mode == 'sample' else None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start(self):
+        """Begin profiling the calling thread, returns the state stop() needs"""
+        if self.mode == 'cprofile':
+            import cProfile
+
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile, time.perf_counter()
+        thread_id = threading.get_ident()
+        self._sampler.add(thread_id)
+        return thread_id, time.perf_counter()
+
+    def stop(self, state, route, method, path, status=None):
+        """Finish a profile and write it with its sidecar, returns the sidecar data"""
+        target, started = state
+        duration_ms = (time.perf_counter() - started) * 1000
+        profile_id = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration_ms)}ms-"
+            f"{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'}-{secrets.token_hex(3)}"
+        )
+        filename = f'{profile_id}.{MODES[self.mode]}'
+
+        if self.mode == 'cprofile':
+            target.disable()
+            target.dump_stats(os.path.join(self.directory, filename))
+            samples = None
+        else:
+            counts = self._sampler.remove(target)
+            samples = sum(counts.values())
+            with open(os.path.join(self.directory, filename), 'w', encoding='utf-8') as profile_file:
+                for stack, count in counts.most_common():
+                    profile_file.write(f'{stack} {count}\n')
+
+        meta = {
+            'id': profile_id,
+            'route': route,
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration_ms, 1),
+            'mode': self.mode,
+            'samples': samples,
+            'file': filename,
+            'created_at': time.time(),
+            'pid': os.getpid(),
+        }
+        with open(os.path.join(self.directory, f'{profile_id}.json'), 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file)
+        self._prune()
+        return meta
+
+    def _sidecars(self):
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return []
+        # Ids start with a timestamp, so names sort oldest first
+        return sorted(names)
+
+    def _prune(self):
+        for name in self._sidecars()[:-self.keep]:
+            profile_id = name[:-len('.json')]
+            for suffix in ('.json', *(f'.{extension}' for extension in MODES.values())):
+                try:
+                    os.unlink(os.path.join(self.directory, profile_id + suffix))
+                except OSError:
+                    pass
+
+    def slowest(self, limit=20):
+        """Sidecars of the kept profiles of all workers, slowest first"""
+        profiles = []
+        for name in self._sidecars():
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as meta_file:
+                    profiles.append(json.load(meta_file))
+            except (OSError, ValueError):
+                continue
+        profiles.sort(key=lambda meta: meta.get('duration_ms', 0), reverse=True)
+        return profiles[:limit]
+
+    def file_of(self, profile_id):
+        """(directory, filename) of a profile, or None for unknown or malformed ids"""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        for extension in MODES.values():
+            filename = f'{profile_id}.{extension}'
+            if os.path.exists(os.path.join(self.directory, filename)):
+                return self.directory, filename
+        return None
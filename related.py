@@ -0,0 +1,140 @@
+"""
+Related items across news, events and culture topics
+Items are turned into hashed TF-IDF vectors in one sparse matrix and the
+top-k cosine neighbours of every item are computed block by block with
+sparse matrix products, so a rebuild stays cheap at tens of thousands of
+items. NumPy and SciPy are imported only when an index is built
+"""
+
+import re
+import zlib
+from functools import lru_cache
+
+from suggest import normalize
+
+# Hashed vocabulary size; collisions are rare at this size and harmless for ranking
+N_FEATURES = 2 ** 18
+# Title words count this many times as much as description words
+TITLE_WEIGHT = 2
+# Neighbours below this cosine similarity are not worth showing
+MIN_SIMILARITY = 0.12
+# Dense similarity block is at most this many cells (float32), about 32 MB
+MAX_BLOCK_CELLS = 2 ** 23
+
+# Frequent Estonian words that say nothing about the topic
+STOP_WORDS = {
+    'ja', 'ning', 'on', 'ei', 'et', 'ka', 'see', 'mis', 'kes', 'kui', 'oli', 'olid', 'ole', 'olnud',
+    'voi', 'aga', 'nii', 'siis', 'kus', 'veel', 'selle', 'seda', 'oma', 'mida', 'kuid',
+    'kas', 'ta', 'tema', 'nad', 'nende', 'uks', 'mitte', 'ule', 'sest', 'juba', 'koos',
+}
+
+
+_WORD = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=65536)
+def _normalize_word(word):
+    return normalize(word)
+
+
+def _words(text):
+    """search_index.tokenize, normalizing each distinct word only once"""
+    return [_normalize_word(word) for word in _WORD.findall(str(text or ''))]
+
+
+def _terms(item):
+    title = _words(item.get('title'))
+    body = _words(' '.join(str(item.get(field) or '') for field in ('description', 'content', 'location')))
+    return [
+        term for term in title * TITLE_WEIGHT + body
+        if len(term) > 2 and term not in STOP_WORDS and not term.isdigit()
+    ]
+
+
+def _feature(term):
+    return zlib.crc32(term.encode('utf-8')) % N_FEATURES
+
+
+class RelatedIndex:
+    """Top-k related items per item link, immutable once built"""
+
+    def __init__(self, items, neighbors):
+        self._items = items
+        self._neighbors = neighbors
+
+    def __len__(self):
+        return len(self._items)
+
+    @classmethod
+    def build(cls, items, k=3):
+        """Build the neighbour table for items (scraped item objects with a link)"""
+        try:
+            import numpy as np
+            from scipy import sparse
+        except ImportError as e:
+            print(f"Related items disabled, NumPy/SciPy not available: {e}")
+            return cls([], {})
+
+        # Sample and repeated items share links, keep the first of each
+        unique = {}
+        for item in items:
+            if item.get('link') and item.get('link') not in unique:
+                unique[item.get('link')] = item
+        items = list(unique.values())
+        if len(items) < 2:
+            return cls(items, {})
+
+        rows, columns = [], []
+        for row, item in enumerate(items):
+            features = [_feature(term) for term in _terms(item)]
+            rows.extend([row] * len(features))
+            columns.extend(features)
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (np.array(rows, dtype=np.int32), np.array(columns, dtype=np.int32))),
+            shape=(len(items), N_FEATURES)
+        )
+        counts.sum_duplicates()
+
+        # Sublinear term frequency times smoothed inverse document frequency
+        counts.data = 1 + np.log(counts.data)
+        document_frequency = np.bincount(counts.indices, minlength=N_FEATURES)
+        idf = np.log((1 + len(items)) / (1 + document_frequency)).astype(np.float32) + 1
+        vectors = counts.multiply(idf[np.newaxis, :]).tocsr()
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        vectors = sparse.diags((1 / norms).astype(np.float32)) @ vectors
+        transposed = vectors.T.tocsc()
+
+        k = min(k, len(items) - 1)
+        block_size = max(1, min(len(items), MAX_BLOCK_CELLS // len(items)))
+        neighbors = {}
+        for start in range(0, len(items), block_size):
+            stop = min(start + block_size, len(items))
+            similarity = (vectors[start:stop] @ transposed).toarray()
+            similarity[np.arange(stop - start), np.arange(start, stop)] = -1
+            top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(similarity, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for offset in range(stop - start):
+                related = [
+                    int(column) for column, score in zip(top[offset], top_scores[offset])
+                    if score >= MIN_SIMILARITY
+                ]
+                if related:
+                    neighbors[items[start + offset].get('link')] = related
+        return cls(items, neighbors)
+
+    def related(self, item, limit=3):
+        """Items related to item (matched by link), most similar first"""
+        return [self._items[number] for number in self._neighbors.get(item.get('link'), ())[:limit]]
+
+    def related_map(self, items, limit=3):
+        """{link: related items} for the items that have any, for templates"""
+        result = {}
+        for item in items:
+            related = self.related(item, limit)
+            if related:
+                result[item.get('link')] = related
+        return result
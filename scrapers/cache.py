@@ -0,0 +1,373 @@
+"""
+Scraped data cache shared by all worker processes
+Scraper results are stored once per host (SQLite file) or per deployment
+(Redis) instead of once per worker. Values are compact zlib-compressed
+JSON, keys carry a format/schema version, and a refresh lock makes sure
+only one worker re-scrapes a source while the others serve the stale copy
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from urllib.parse import unquote, urlparse
+
+from scrapers.items import BaseItem, CultureTopic, EventItem, FallbackItems, NewsItem, is_fallback
+
+# Bump when the stored format changes; item field changes are picked up automatically
+FORMAT_VERSION = 1
+ITEM_TYPES = {cls.__name__: cls for cls in (NewsItem, EventItem, CultureTopic)}
+SCHEMA_VERSION = format(
+    zlib.crc32(repr(sorted((name, cls.fields) for name, cls in ITEM_TYPES.items())).encode('utf-8')),
+    '08x'
+)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'scraped.sqlite3'
+)
+
+# Scraped data is fresh this long, then served stale while one worker refreshes it
+DEFAULT_TTL = 300
+DEFAULT_STALE_TTL = 3600
+# A refresh lock expires on its own if its worker dies mid-scrape
+LOCK_TIMEOUT = 60
+# Sample data of a failed scrape is kept only this long, and never replaces a stale real result
+FALLBACK_TTL = 30
+# Expired rows are deleted from the SQLite file at most this often
+PURGE_INTERVAL = 600
+
+
+def encode(value):
+    """Serialize scraper results; items are stored as [type, [field values]]"""
+    if isinstance(value, list) and value and all(isinstance(item, BaseItem) for item in value):
+        payload = {'items': [[type(item).__name__, list(item._values(item))] for item in value]}
+        if is_fallback(value):
+            payload['fallback'] = True
+    else:
+        payload = {'json': value}
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def decode(data):
+    payload = json.loads(zlib.decompress(data).decode('utf-8'))
+    if 'items' in payload:
+        items = [
+            ITEM_TYPES[type_name](**dict(zip(ITEM_TYPES[type_name].fields, values)))
+            for type_name, values in payload['items']
+        ]
+        return FallbackItems(items) if payload.get('fallback') else items
+    return payload['json']
+
+
+class CacheBackend(ABC):
+    """Byte-string key/value store with expiry"""
+
+    @abstractmethod
+    def get(self, key):
+        pass
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        pass
+
+    @abstractmethod
+    def add(self, key, value, ttl):
+        """Set key only if it is absent; returns True when it was set"""
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+
+class SQLiteCache(CacheBackend):
+    """Cache in a local SQLite file, shared by the workers of one host"""
+
+    def __init__(self, path=None, purge_interval=PURGE_INTERVAL):
+        self.path = path or os.environ.get('SCRAPER_CACHE_PATH') or DEFAULT_CACHE_PATH
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key):
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, time.time() + ttl)
+            )
+        if time.monotonic() - self._purged_at > self.purge_interval:
+            self.purge_expired()
+
+    def add(self, key, value, ttl):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ? AND expires_at <= ?', (key, now))
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, now + ttl)
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, key):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def purge_expired(self):
+        """Delete expired rows; get() ignores them, this keeps the file from growing"""
+        self._purged_at = time.monotonic()
+        with self._connect() as connection:
+            connection.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache in Redis (or anything speaking its protocol), shared by all hosts
+    Talks RESP over a plain socket, so no client library is needed
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, timeout=2.0):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._socket = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url):
+        """redis://[:password@]host[:port][/db]"""
+        parsed = urlparse(url)
+        db = parsed.path.strip('/')
+        return cls(
+            host=parsed.hostname or '127.0.0.1',
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None
+        )
+
+    def _connect(self):
+        self._socket = socket.create_connection(self.address, timeout=self.timeout)
+        self._reader = self._socket.makefile('rb')
+        if self.password:
+            self._call('AUTH', self.password)
+        if self.db:
+            self._call('SELECT', self.db)
+
+    def _close(self):
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+        self._socket = self._reader = None
+
+    def _call(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._socket.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('connection closed by server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f'unexpected reply {line!r}')
+
+    def command(self, *args):
+        """Run one command, reconnecting once if the connection was lost"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._socket is None:
+                        self._connect()
+                    return self._call(*args)
+                except (OSError, ConnectionError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def get(self, key):
+        return self.command('GET', key)
+
+    def set(self, key, value, ttl):
+        self.command('SET', key, value, 'PX', int(ttl * 1000))
+
+    def add(self, key, value, ttl):
+        return self.command('SET', key, value, 'PX', int(ttl * 1000), 'NX') == 'OK'
+
+    def delete(self, key):
+        self.command('DEL', key)
+
+
+def backend_from_url(url=None):
+    """
+    Backend for SCRAPER_CACHE_URL: sqlite:///path/to/file.sqlite3,
+    redis://host:port/db, or 'none' to disable caching
+    """
+    url = url if url is not None else os.environ.get('SCRAPER_CACHE_URL', '')
+    if url.lower() == 'none':
+        return None
+    if url.startswith('redis://'):
+        return RedisCache.from_url(url)
+    if url.startswith('sqlite://'):
+        return SQLiteCache(urlparse(url).path or None)
+    if url:
+        raise ValueError(f"Unsupported SCRAPER_CACHE_URL: {url}")
+    return SQLiteCache()
+
+
+class SharedCache:
+    """
+    Stale-while-refresh cache on top of a backend
+    Entries are kept for ttl + stale_ttl seconds; once older than ttl the
+    first worker to take the refresh lock reloads them, everyone else keeps
+    getting the stale value meanwhile
+    """
+
+    def __init__(self, backend, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL,
+                 lock_timeout=LOCK_TIMEOUT, poll_interval=0.1):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+
+    def key(self, *parts):
+        return ':'.join(['koidulaulik', f'v{FORMAT_VERSION}', SCHEMA_VERSION, *map(str, parts)])
+
+    def _read(self, key):
+        try:
+            data = self.backend.get(key)
+            if data is None:
+                return None
+            # 8-byte big-endian "fresh until" timestamp, then the encoded value
+            return int.from_bytes(data[:8], 'big'), decode(data[8:])
+        except Exception as e:
+            print(f"Error reading cache key {key}: {e}")
+            return None
+
+    def _write(self, key, value):
+        # Sample data is retried soon and not served stale for long
+        ttl, stale_ttl = (min(self.ttl, FALLBACK_TTL), 0) if is_fallback(value) else (self.ttl, self.stale_ttl)
+        try:
+            fresh_until = int(time.time() + ttl).to_bytes(8, 'big')
+            self.backend.set(key, fresh_until + encode(value), ttl + stale_ttl)
+        except Exception as e:
+            print(f"Error writing cache key {key}: {e}")
+
+    def _try_lock(self, key):
+        try:
+            return self.backend.add(f'{key}:lock', b'1', self.lock_timeout)
+        except Exception as e:
+            print(f"Error locking cache key {key}: {e}")
+            return True
+
+    def _unlock(self, key):
+        try:
+            self.backend.delete(f'{key}:lock')
+        except Exception as e:
+            print(f"Error unlocking cache key {key}: {e}")
+
+    def get_or_load(self, key, loader):
+        entry = self._read(key)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+
+        deadline = time.monotonic() + self.lock_timeout
+        while not self._try_lock(key):
+            if entry is not None:
+                return entry[1]
+            # Another worker is loading a missing value, wait for its result
+            if time.monotonic() > deadline:
+                return loader()
+            time.sleep(self.poll_interval)
+            entry = self._read(key)
+            if entry is not None:
+                return entry[1]
+
+        try:
+            # The previous lock holder may have refreshed it just now
+            latest = self._read(key)
+            if latest is not None and latest[0] > time.time():
+                return latest[1]
+            value = loader()
+            if is_fallback(value) and entry is not None and not is_fallback(entry[1]):
+                # The source failed, a stale scrape beats sample data
+                return entry[1]
+            self._write(key, value)
+            return value
+        except Exception:
+            if entry is not None:
+                return entry[1]
+            raise
+        finally:
+            self._unlock(key)
+
+
+class CachedScraper:
+    """Proxy that answers a scraper's get_* calls from the shared cache"""
+
+    def __init__(self, name, scraper, cache):
+        self._name = name
+        self._scraper = scraper
+        self._cache = cache
+
+    def __getattr__(self, attribute):
+        value = getattr(self._scraper, attribute)
+        if not (attribute.startswith('get_') and callable(value)):
+            return value
+
+        def cached_call(*args, **kwargs):
+            arguments = json.dumps([args, kwargs], sort_keys=True, separators=(',', ':'))
+            key = self._cache.key(self._name, attribute, arguments)
+            return self._cache.get_or_load(key, lambda: value(*args, **kwargs))
+
+        return cached_call
@@ -0,0 +1,306 @@
+"""
+Detail page enrichment
+Fetches the article/event pages that listing items link to, with bounded
+concurrency, and extracts the full body text, canonical image, structured
+date and venue (JSON-LD first, then meta tags and markup). Results are
+cached by URL on disk, so every detail page is downloaded only once
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from scrapers.items import is_fallback
+from scrapers.ratelimit import limited_get
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'details.sqlite3'
+)
+
+ARTICLE_TYPES = {'Article', 'NewsArticle', 'BlogPosting', 'ReportageNewsArticle', 'WebPage'}
+EVENT_TYPES = {'Event', 'MusicEvent', 'TheaterEvent', 'ExhibitionEvent', 'Festival',
+               'DanceEvent', 'ScreeningEvent', 'ComedyEvent', 'LiteraryEvent'}
+
+# Placeholder venue used by the event scrapers
+UNKNOWN_LOCATION = 'Asukoht täpsustamisel'
+MAX_CONTENT_LENGTH = 20000
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _types(node):
+    return {str(value) for value in _as_list(node.get('@type'))}
+
+
+def _json_ld_nodes(soup):
+    """All JSON-LD objects of the page, flattening lists and @graph"""
+    nodes = []
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        pending = _as_list(data)
+        while pending:
+            node = pending.pop(0)
+            if not isinstance(node, dict):
+                continue
+            nodes.append(node)
+            pending.extend(_as_list(node.get('@graph')))
+    return nodes
+
+
+def _image_url(value):
+    for image in _as_list(value):
+        if isinstance(image, str) and image:
+            return image
+        if isinstance(image, dict) and image.get('url'):
+            return image['url']
+    return None
+
+
+def _location_name(value):
+    for location in _as_list(value):
+        if isinstance(location, str) and location:
+            return location
+        if isinstance(location, dict):
+            name = location.get('name')
+            address = location.get('address')
+            if isinstance(address, dict):
+                address = address.get('addressLocality') or address.get('streetAddress')
+            parts = [part for part in (name, address) if isinstance(part, str) and part]
+            if parts:
+                return ', '.join(dict.fromkeys(parts))
+    return None
+
+
+def _meta(soup, *names):
+    for name in names:
+        tag = soup.find('meta', attrs={'property': name}) or soup.find('meta', attrs={'name': name})
+        if tag and tag.get('content'):
+            return tag['content'].strip()
+    return None
+
+
+def _body_text(soup):
+    """Paragraph text of the main article element, or of the whole page"""
+    container = soup.find('article') or soup.find('main') or soup.body or soup
+    paragraphs = [p.get_text(' ', strip=True) for p in container.find_all('p')]
+    return '\n\n'.join(text for text in paragraphs if len(text) > 30)
+
+
+def extract_details(html, url=None):
+    """
+    Extract {content, image, date, location} from a detail page
+    Missing values are None
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    details = {'content': None, 'image': None, 'date': None, 'location': None}
+
+    for node in _json_ld_nodes(soup):
+        types = _types(node)
+        if types & EVENT_TYPES:
+            details['content'] = details['content'] or node.get('description')
+            details['date'] = details['date'] or node.get('startDate')
+            details['location'] = details['location'] or _location_name(node.get('location'))
+            details['image'] = details['image'] or _image_url(node.get('image'))
+        elif types & ARTICLE_TYPES:
+            details['content'] = details['content'] or node.get('articleBody')
+            details['date'] = details['date'] or node.get('datePublished') or node.get('dateCreated')
+            details['image'] = details['image'] or _image_url(node.get('image'))
+
+    if not details['content']:
+        details['content'] = _body_text(soup) or _meta(soup, 'og:description', 'description')
+    if not details['image']:
+        details['image'] = _meta(soup, 'og:image', 'twitter:image')
+    if not details['date']:
+        details['date'] = _meta(soup, 'article:published_time', 'event:start_time')
+        if not details['date']:
+            time_elem = soup.find('time', datetime=True)
+            details['date'] = time_elem['datetime'] if time_elem else None
+
+    if details['content']:
+        details['content'] = details['content'].strip()[:MAX_CONTENT_LENGTH]
+    if details['image'] and url:
+        details['image'] = urljoin(url, details['image'])
+    return details
+
+
+class DetailCache:
+    """SQLite table url -> extracted details, shared by all worker processes"""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('DETAIL_CACHE_PATH') or DEFAULT_CACHE_PATH
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS details ('
+                'url TEXT PRIMARY KEY, fetched_at REAL NOT NULL, ok INTEGER NOT NULL, data TEXT)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_many(self, urls):
+        """{url: (fetched_at, ok, details)} for the cached urls"""
+        found = {}
+        urls = list(urls)
+        with self._connect() as connection:
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT url, fetched_at, ok, data FROM details WHERE url IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for url, fetched_at, ok, data in rows:
+                    found[url] = (fetched_at, bool(ok), json.loads(data) if data else None)
+        return found
+
+    def put(self, url, ok, details=None):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO details (url, fetched_at, ok, data) VALUES (?, ?, ?, ?)',
+                (url, time.time(), int(ok), json.dumps(details, ensure_ascii=False) if details else None)
+            )
+
+
+class DetailEnricher:
+    """
+    Adds detail page data to news and event items
+    Successful fetches are kept forever. Definitive failures (4xx other than
+    429, unparseable pages) are cached and retried after retry_failed_after
+    seconds; transient ones (rate limit waits, timeouts, connection errors,
+    429 and 5xx) are not cached and only back off for retry_transient_after
+    seconds in this process
+    """
+
+    def __init__(self, cache_path=None, max_workers=4, timeout=10, retry_failed_after=86400,
+                 retry_transient_after=300):
+        self.cache = DetailCache(cache_path)
+        self.timeout = timeout
+        self.retry_failed_after = retry_failed_after
+        self.retry_transient_after = retry_transient_after
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='enrich')
+        self._pending = {}
+        # url -> time of the last transient failure
+        self._transient = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, url):
+        try:
+            response = limited_get(url, headers=self.headers, timeout=self.timeout)
+            response.raise_for_status()
+            details = extract_details(response.text, response.url or url)
+            self.cache.put(url, True, details)
+            return details
+        except Exception as e:
+            print(f"Error fetching detail page {url}: {e}")
+            if _is_transient(e):
+                with self._lock:
+                    self._transient[url] = time.time()
+            else:
+                self.cache.put(url, False)
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+    def _schedule(self, urls):
+        futures = []
+        with self._lock:
+            for url in urls:
+                future = self._pending.get(url)
+                if future is None:
+                    future = self._executor.submit(self._fetch, url)
+                    self._pending[url] = future
+                futures.append(future)
+        return futures
+
+    def _backing_off(self, now):
+        """Urls whose last transient failure is younger than retry_transient_after"""
+        with self._lock:
+            for url, failed_at in list(self._transient.items()):
+                if now - failed_at > self.retry_transient_after:
+                    del self._transient[url]
+            return set(self._transient)
+
+    def enrich(self, items, block=False, fetch=True):
+        """
+        Merge cached details into items, queueing uncached detail pages
+        With block=True wait until all queued pages have been fetched,
+        with fetch=False only merge what is already cached
+        Sample data (FallbackItems) is not enriched, its links are made up
+        Returns the same items
+        """
+        if is_fallback(items):
+            return items
+        urls = {
+            item.get('link') for item in items
+            if item.get('link', '').startswith('http')
+        }
+        if not urls:
+            return items
+
+        cached = self.cache.get_many(urls)
+        now = time.time()
+        backing_off = self._backing_off(now)
+        missing = [
+            url for url in urls
+            if url not in backing_off and (
+                url not in cached
+                or (not cached[url][1] and now - cached[url][0] > self.retry_failed_after)
+            )
+        ]
+        if missing and fetch:
+            futures = self._schedule(missing)
+            if block:
+                wait(futures)
+                cached.update(self.cache.get_many(missing))
+
+        for item in items:
+            entry = cached.get(item.get('link'))
+            if entry and entry[1] and entry[2]:
+                apply_details(item, entry[2])
+        return items
+
+
+def _is_transient(error):
+    """Whether a failed fetch is worth retrying soon"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    # Timeouts, connection errors and RateLimitExceeded; parse errors are definitive
+    return isinstance(error, requests.RequestException)
+
+
+def apply_details(item, details):
+    """Copy extracted details onto an item without overwriting listing data"""
+    if details.get('content') and 'content' in item:
+        item['content'] = details['content']
+    if details.get('image') and 'image' in item and not item.get('image'):
+        item['image'] = details['image']
+    if details.get('date') and 'date_iso' in item:
+        item['date_iso'] = details['date']
+    if details.get('location') and 'location' in item and item.get('location') in (None, '', UNKNOWN_LOCATION):
+        item['location'] = details['location']
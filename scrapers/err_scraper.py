@@ -3,16 +3,36 @@ ERR (Eesti Rahvusringhääling) News Scraper
 Collects news articles from ERR.ee about Estonian culture and society
 """
 
-import requests
-from bs4 import BeautifulSoup
+from contextlib import closing
 from datetime import datetime
+import threading
 import time
+from scrapers.feeds import FeedState, read_feed
+from scrapers.ratelimit import limited_get
+from scrapers.items import FallbackItems, NewsItem
+from scrapers.selector_plan import SelectorPlan
+from scrapers.streaming import find_elements, stream_elements
+
+# Article containers, most specific first - ERR uses various structures
+ARTICLE_SELECTORS = [
+    (('article',), ('list-article',)),
+    (('div',), ('news-item',)),
+]
 
 class ERRNewsScraper:
     """Scraper for ERR.ee news portal"""
     
-    def __init__(self):
-        self.base_url = "https://kultuur.err.ee"
+    def __init__(self, base_url=None, streaming=True, use_feed=True, feed_url=None, feed_state_path=None):
+        self.base_url = base_url or "https://kultuur.err.ee"
+        # RSS feed of the section; the HTML page is only scraped when the feed fails
+        self.use_feed = use_feed
+        self.feed_url = feed_url or f"{self.base_url.rstrip('/')}/rss"
+        self.feed_state = FeedState(self.feed_url, feed_state_path)
+        self._feed_lock = threading.Lock()
+        # Parse the page while it downloads and stop once enough articles are found
+        self.streaming = streaming
+        # Remembers which article and field selectors work on the current layout
+        self.plan = SelectorPlan('ERR', ARTICLE_SELECTORS)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
@@ -22,55 +42,68 @@ class ERRNewsScraper:
         Fetch latest news articles from ERR
         Returns a list of news items with title, description, link, date, source
         """
+        if self.use_feed:
+            try:
+                news_items = self._get_feed_news(limit)
+                if news_items:
+                    return news_items
+                print("ERR feed has no entries, scraping the HTML page")
+            except Exception as e:
+                print(f"ERR feed unavailable, scraping the HTML page: {e}")
+        return self._get_html_news(limit)
+
+    def _get_feed_news(self, limit):
+        """
+        Newest feed entries as news items
+        Only entries newer than the ones already in the feed state are
+        parsed, and an unchanged feed is not downloaded at all
+        """
+        with self._feed_lock:
+            self.feed_state.load()
+            result = read_feed(
+                self.feed_url,
+                known=self.feed_state.guids(),
+                etag=self.feed_state.etag,
+                modified=self.feed_state.modified,
+                headers=self.headers,
+                timeout=10
+            )
+            if result['changed']:
+                self.feed_state.update(result)
+            entries = self.feed_state.entries[:limit]
+        return [self._feed_item(entry) for entry in entries]
+
+    def _feed_item(self, entry):
+        published = entry.get('published')
+        description = entry.get('summary') or ''
+        return NewsItem(
+            title=entry.get('title') or "Pealkiri puudub",
+            description=description[:200] + '...' if len(description) > 200 else description,
+            link=entry.get('link') or "#",
+            date=published[:10] if published else datetime.now().strftime('%Y-%m-%d'),
+            source='ERR',
+            image=entry.get('image'),
+            date_iso=published
+        )
+
+    def _get_html_news(self, limit):
+        """News items scraped from the kultuur page, sample data when that fails too"""
         news_items = []
         
         try:
-            # Try to fetch from ERR kultuur section
-            url = self.base_url
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find article elements - ERR uses various structures
-            articles = soup.find_all('article', class_='list-article', limit=limit)
-            
-            if not articles:
-                # Try alternative structure
-                articles = soup.find_all('div', class_='news-item', limit=limit)
-            
-            for article in articles[:limit]:
-                try:
-                    # Extract title
-                    title_elem = article.find(['h1', 'h2', 'h3', 'a'])
-                    title = title_elem.get_text(strip=True) if title_elem else "Pealkiri puudub"
-                    
-                    # Extract link
-                    link_elem = article.find('a', href=True)
-                    link = link_elem['href'] if link_elem else "#"
-                    if link and not link.startswith('http'):
-                        link = self.base_url + link
-                    
-                    # Extract description
-                    desc_elem = article.find(['p', 'div'], class_=['lead', 'description', 'excerpt'])
-                    description = desc_elem.get_text(strip=True) if desc_elem else ""
-                    
-                    # Extract date
-                    date_elem = article.find(['time', 'span'], class_=['date', 'time', 'published'])
-                    date_str = date_elem.get_text(strip=True) if date_elem else datetime.now().strftime('%Y-%m-%d')
-                    
-                    news_items.append({
-                        'title': title,
-                        'description': description[:200] + '...' if len(description) > 200 else description,
-                        'link': link,
-                        'date': date_str,
-                        'source': 'ERR',
-                        'image': self._extract_image(article)
-                    })
-                    
-                except Exception as e:
-                    print(f"Error parsing ERR article: {e}")
-                    continue
+            # Stop reading the page as soon as enough articles are parsed
+            run = self.plan.start()
+            with closing(self._iter_articles(run.selectors)) as articles:
+                for number, article in articles:
+                    try:
+                        news_items.append(self._parse_article(article, run))
+                    except Exception as e:
+                        print(f"Error parsing ERR article: {e}")
+                        continue
+                    run.hit(number)
+                    if len(news_items) >= limit:
+                        break
+            self.plan.finish(run, limit)
             
             # If no articles found, add sample data
             if not news_items:
@@ -83,6 +116,47 @@ class ERRNewsScraper:
         
         return news_items[:limit]
     
+    def _iter_articles(self, selectors):
+        """(selector number, article element) pairs of the kultuur page, streamed unless streaming=False"""
+        # Try to fetch from ERR kultuur section
+        url = self.base_url
+        if self.streaming:
+            yield from stream_elements(url, selectors, headers=self.headers, timeout=10)
+            return
+        
+        response = limited_get(url, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        yield from find_elements(response.content, selectors)
+    
+    def _parse_article(self, article, run):
+        """Build a NewsItem from one article element"""
+        # Extract title
+        title_elem = run.find(article, 'title', ['h1', 'h2', 'h3', 'a'])
+        title = title_elem.get_text(strip=True) if title_elem else "Pealkiri puudub"
+        
+        # Extract link
+        link_elem = article.find('a', href=True)
+        link = link_elem['href'] if link_elem else "#"
+        if link and not link.startswith('http'):
+            link = self.base_url + link
+        
+        # Extract description
+        desc_elem = run.find(article, 'description', ['p', 'div'], ['lead', 'description', 'excerpt'])
+        description = desc_elem.get_text(strip=True) if desc_elem else ""
+        
+        # Extract date
+        date_elem = run.find(article, 'date', ['time', 'span'], ['date', 'time', 'published'])
+        date_str = date_elem.get_text(strip=True) if date_elem else datetime.now().strftime('%Y-%m-%d')
+        
+        return NewsItem(
+            title=title,
+            description=description[:200] + '...' if len(description) > 200 else description,
+            link=link,
+            date=date_str,
+            source='ERR',
+            image=self._extract_image(article)
+        )
+    
     def _extract_image(self, article):
         """Extract image URL from article"""
         img = article.find('img')
@@ -95,29 +169,29 @@ class ERRNewsScraper:
     
     def _get_sample_news(self):
         """Return sample news data when scraping fails"""
-        return [
-            {
-                'title': 'Eesti kultuurielu uudised',
-                'description': 'Värskeid uudiseid Eesti kultuurist ja ühiskonnast.',
-                'link': 'https://kultuur.err.ee/1609641086/eesti-kultuurielu-uudised',
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'source': 'ERR Kultuur',
-                'image': 'https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=640&q=80'
-            },
-            {
-                'title': 'Uus näitus Eesti kunstimuuseumis',
-                'description': 'Eesti Kunstimuuseum avab uue näituse, mis keskendub kaasaegsele kunstile.',
-                'link': 'https://kultuur.err.ee/1609641087/uus-naitus-eesti-kunstimuuseumis',
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'source': 'ERR Kultuur',
-                'image': 'https://images.unsplash.com/photo-1578662996442-48f60103fc96?w=640&q=80'
-            },
-            {
-                'title': 'Kontsert Tallinnas tähistab rahvuslikku päeva',
-                'description': 'Suur kontsert toimub Tallinnas, et tähistada olulist rahvuslikku sündmust.',
-                'link': 'https://kultuur.err.ee/1609641088/kontsert-tallinnas-tahistab-rahvuslikku-paeva',
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'source': 'ERR Kultuur',
-                'image': 'https://images.unsplash.com/photo-1540039155733-5bb30b53aa14?w=640&q=80'
-            }
-        ]
+        return FallbackItems([
+            NewsItem(
+                title='Eesti kultuurielu uudised',
+                description='Värskeid uudiseid Eesti kultuurist ja ühiskonnast.',
+                link='https://kultuur.err.ee/1609641086/eesti-kultuurielu-uudised',
+                date=datetime.now().strftime('%Y-%m-%d'),
+                source='ERR Kultuur',
+                image='https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=640&q=80'
+            ),
+            NewsItem(
+                title='Uus näitus Eesti kunstimuuseumis',
+                description='Eesti Kunstimuuseum avab uue näituse, mis keskendub kaasaegsele kunstile.',
+                link='https://kultuur.err.ee/1609641087/uus-naitus-eesti-kunstimuuseumis',
+                date=datetime.now().strftime('%Y-%m-%d'),
+                source='ERR Kultuur',
+                image='https://images.unsplash.com/photo-1578662996442-48f60103fc96?w=640&q=80'
+            ),
+            NewsItem(
+                title='Kontsert Tallinnas tähistab rahvuslikku päeva',
+                description='Suur kontsert toimub Tallinnas, et tähistada olulist rahvuslikku sündmust.',
+                link='https://kultuur.err.ee/1609641088/kontsert-tallinnas-tahistab-rahvuslikku-paeva',
+                date=datetime.now().strftime('%Y-%m-%d'),
+                source='ERR Kultuur',
+                image='https://images.unsplash.com/photo-1540039155733-5bb30b53aa14?w=640&q=80'
+            )
+        ])
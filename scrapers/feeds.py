@@ -0,0 +1,225 @@
+"""
+RSS 2.0 and Atom feed reading
+Feeds are parsed with lxml's XMLPullParser while they download. Entries
+are listed newest first, so a reader that already knows some of them
+stops at the first known GUID and closes the connection, and a
+conditional GET (ETag / Last-Modified) skips an unchanged feed entirely
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from scrapers.ratelimit import limited_stream
+
+DEFAULT_STATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'err-feed.json'
+)
+
+CHUNK_SIZE = 16 * 1024
+# Entries remembered per feed; also the most a single read processes
+MAX_ENTRIES = 50
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+MEDIA = '{http://search.yahoo.com/mrss/}'
+RSS1 = '{http://purl.org/rss/1.0/}'
+ENTRY_TAGS = ('item', RSS1 + 'item', ATOM + 'entry')
+
+
+def _child_text(element, *tags):
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and child.text and child.text.strip():
+            return child.text.strip()
+    return None
+
+
+def _plain_text(markup):
+    """Feed summaries are often HTML, keep only their text"""
+    if not markup or '<' not in markup:
+        return markup or ''
+    from lxml import html
+
+    try:
+        return ' '.join(html.fragment_fromstring(markup, create_parent='div').text_content().split())
+    except Exception:
+        return markup
+
+
+def _date(value):
+    """ISO 8601 string of an RFC 822 (RSS) or ISO 8601 (Atom) date, or None"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).isoformat()
+    except ValueError:
+        return None
+
+
+def _image(element):
+    for enclosure in element.iter('enclosure', ATOM + 'link'):
+        if enclosure.tag == ATOM + 'link' and enclosure.get('rel') != 'enclosure':
+            continue
+        if (enclosure.get('type') or '').startswith('image/'):
+            return enclosure.get('url') or enclosure.get('href')
+    for media in element.iter(MEDIA + 'content', MEDIA + 'thumbnail'):
+        if media.get('url') and media.get('medium', 'image') == 'image':
+            return media.get('url')
+    return None
+
+
+def _atom_link(element):
+    for link in element.findall(ATOM + 'link'):
+        if link.get('rel', 'alternate') == 'alternate' and link.get('href'):
+            return link.get('href')
+    return None
+
+
+def parse_entry(element):
+    """{guid, title, link, summary, published, image} of an RSS item or Atom entry"""
+    if element.tag == ATOM + 'entry':
+        link = _atom_link(element)
+        guid = _child_text(element, ATOM + 'id') or link
+        title = _child_text(element, ATOM + 'title')
+        summary = _child_text(element, ATOM + 'summary', ATOM + 'content')
+        published = _child_text(element, ATOM + 'published', ATOM + 'updated')
+    else:
+        namespace = RSS1 if element.tag.startswith(RSS1) else ''
+        link = _child_text(element, namespace + 'link')
+        guid = _child_text(element, 'guid') or element.get('{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about') or link
+        title = _child_text(element, namespace + 'title')
+        summary = _child_text(element, namespace + 'description')
+        published = _child_text(element, 'pubDate', '{http://purl.org/dc/elements/1.1/}date')
+    return {
+        'guid': guid,
+        'title': _plain_text(title),
+        'link': link,
+        'summary': _plain_text(summary),
+        'published': _date(published),
+        'image': _image(element),
+    }
+
+
+def read_feed(url, known=(), etag=None, modified=None, max_entries=MAX_ENTRIES,
+              chunk_size=CHUNK_SIZE, **kwargs):
+    """
+    Read the entries of a feed that come before the first GUID in `known`
+    Returns {'changed', 'entries', 'etag', 'modified'}; changed is False and
+    entries empty when the server answered 304 Not Modified
+    """
+    from lxml import etree
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
+    known = set(known)
+
+    entries = []
+    with limited_stream(url, headers=headers, **kwargs) as response:
+        if response.status_code == 304:
+            return {'changed': False, 'entries': [], 'etag': etag, 'modified': modified}
+        response.raise_for_status()
+        result = {
+            'changed': True,
+            'entries': entries,
+            'etag': response.headers.get('ETag'),
+            'modified': response.headers.get('Last-Modified'),
+        }
+        # Entities are not expanded and nothing is fetched, a feed is untrusted input
+        parser = etree.XMLPullParser(events=('end',), tag=ENTRY_TAGS, resolve_entities=False, no_network=True)
+        for chunk in response.iter_content(chunk_size):
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                entry = parse_entry(element)
+                element.clear(keep_tail=True)
+                if not entry['guid']:
+                    continue
+                if entry['guid'] in known or len(entries) >= max_entries:
+                    return result
+                entries.append(entry)
+        parser.close()
+        for _, element in parser.read_events():
+            entry = parse_entry(element)
+            if entry['guid'] and entry['guid'] not in known and len(entries) < max_entries:
+                entries.append(entry)
+    return result
+
+
+class FeedState:
+    """
+    JSON file with a feed's validators and its newest entries, shared by
+    all worker processes; written atomically like the Wikipedia cache
+    State saved for another feed URL (e.g. a stub upstream) is ignored
+    """
+
+    def __init__(self, url, path=None, max_entries=MAX_ENTRIES):
+        self.url = url
+        self.path = path or os.environ.get('ERR_FEED_STATE_PATH') or DEFAULT_STATE_PATH
+        self.max_entries = max_entries
+        self.etag = None
+        self.modified = None
+        self.entries = []
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Re-read the file when another process has replaced it"""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, encoding='utf-8') as state_file:
+                    data = json.load(state_file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable feed state {self.path}: {e}")
+                return
+            self._mtime = mtime
+            if data.get('url') != self.url:
+                return
+            self.etag = data.get('etag')
+            self.modified = data.get('modified')
+            self.entries = data.get('entries', [])
+
+    def guids(self):
+        return [entry['guid'] for entry in self.entries]
+
+    def update(self, result):
+        """Put the new entries of a read_feed() result first and save"""
+        with self._lock:
+            self.etag = result['etag']
+            self.modified = result['modified']
+            new_guids = {entry['guid'] for entry in result['entries']}
+            self.entries = (
+                result['entries'] + [entry for entry in self.entries if entry['guid'] not in new_guids]
+            )[:self.max_entries]
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.feed-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                json.dump(
+                    {'url': self.url, 'etag': self.etag, 'modified': self.modified, 'entries': self.entries},
+                    tmp_file, ensure_ascii=False
+                )
+            os.replace(tmp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
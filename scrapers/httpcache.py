@@ -0,0 +1,195 @@
+"""
+Scrapy HTTP cache storage in a single SQLite file
+Responses are indexed by request fingerprint, bodies are compressed
+(zstd when the zstandard package is installed, zlib otherwise), entries
+expire per domain, and the least recently used ones are evicted once the
+cache grows past HTTPCACHE_MAX_SIZE bytes
+
+Settings:
+    HTTPCACHE_STORAGE = 'scrapers.httpcache.SQLiteCacheStorage'
+    HTTPCACHE_EXPIRATION_SECS         default expiry, 0 = never
+    HTTPCACHE_DOMAIN_EXPIRATION_SECS  {domain: seconds}, also applies to subdomains
+    HTTPCACHE_MAX_SIZE                bytes of compressed data to keep, 0 = unbounded
+    HTTPCACHE_COMPRESSION             'zstd', 'zlib' or 'none'
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlparse
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+# Eviction trims to this share of HTTPCACHE_MAX_SIZE, so it does not run on every store
+EVICTION_TARGET = 0.9
+# Access times are written in batches rather than on every cache hit
+TOUCH_BATCH = 100
+
+
+def _compressors(codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress, zstandard.ZstdDecompressor().decompress
+    if codec == 'zlib':
+        return (lambda data: zlib.compress(data, 6)), zlib.decompress
+    return (lambda data: data), (lambda data: data)
+
+
+class SQLiteCacheStorage:
+    """HTTPCACHE_STORAGE backend keeping every response as one compressed row"""
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.domain_expiration = {
+            domain.lower().lstrip('.'): int(seconds)
+            for domain, seconds in settings.getdict('HTTPCACHE_DOMAIN_EXPIRATION_SECS').items()
+        }
+        self.max_size = settings.getint('HTTPCACHE_MAX_SIZE', DEFAULT_MAX_SIZE)
+        codec = settings.get('HTTPCACHE_COMPRESSION', 'zstd')
+        if codec == 'zstd' and zstandard is None:
+            codec = 'zlib'
+        self.codec = codec
+        self._compress = _compressors(codec)[0]
+        self._decompressors = {}
+        self.db = None
+        self._total_size = 0
+        self._touched = {}
+
+    def open_spider(self, spider):
+        path = os.path.join(self.cachedir, 'httpcache.sqlite3')
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'fingerprint TEXT PRIMARY KEY, domain TEXT NOT NULL, url TEXT NOT NULL, '
+            'status INTEGER NOT NULL, headers BLOB NOT NULL, body BLOB NOT NULL, codec TEXT NOT NULL, '
+            'size INTEGER NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)')
+        self.db.commit()
+        self._total_size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        spider.logger.debug(f"Using SQLite HTTP cache at {path} ({self.codec}, {self._total_size} bytes)")
+
+    def close_spider(self, spider):
+        self._flush_touches()
+        self.db.close()
+        self.db = None
+
+    def _fingerprint(self, request):
+        return self._fingerprinter.fingerprint(request).hex()
+
+    def _expiration(self, domain):
+        """Expiry of the most specific configured parent domain, else the default"""
+        parts = domain.split('.')
+        for start in range(len(parts)):
+            seconds = self.domain_expiration.get('.'.join(parts[start:]))
+            if seconds is not None:
+                return seconds
+        return self.expiration_secs
+
+    def _decompress(self, codec, data):
+        if codec not in self._decompressors:
+            if codec == 'zstd' and zstandard is None:
+                raise ValueError('cached response is zstd-compressed but zstandard is not installed')
+            self._decompressors[codec] = _compressors(codec)[1]
+        return self._decompressors[codec](data)
+
+    def retrieve_response(self, spider, request):
+        fingerprint = self._fingerprint(request)
+        row = self.db.execute(
+            'SELECT domain, url, status, headers, body, codec, stored_at FROM responses WHERE fingerprint = ?',
+            (fingerprint,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        domain, url, status, headers, body, codec, stored_at = row
+        expiration = self._expiration(domain)
+        if 0 < expiration < time.time() - stored_at:
+            self._delete(fingerprint)
+            return None
+        try:
+            body = self._decompress(codec, body)
+        except Exception as e:
+            spider.logger.warning(f"Dropping unreadable cached response for {url}: {e}")
+            self._delete(fingerprint)
+            return None
+
+        self._touch(fingerprint)
+        headers = Headers(json.loads(headers), encoding='latin-1')
+        response_class = responsetypes.from_args(headers=headers, url=url, body=body)
+        return response_class(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        fingerprint = self._fingerprint(request)
+        headers = {
+            key.decode('latin-1'): [value.decode('latin-1') for value in values]
+            for key, values in response.headers.items()
+        }
+        encoded_headers = json.dumps(headers, separators=(',', ':')).encode('utf-8')
+        body = self._compress(response.body)
+        size = len(body) + len(encoded_headers) + len(response.url)
+        now = time.time()
+
+        previous = self.db.execute('SELECT size FROM responses WHERE fingerprint = ?', (fingerprint,)).fetchone()
+        self.db.execute(
+            'INSERT OR REPLACE INTO responses '
+            '(fingerprint, domain, url, status, headers, body, codec, size, stored_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (fingerprint, (urlparse(response.url).hostname or '').lower(), response.url, response.status,
+             encoded_headers, body, self.codec, size, now, now)
+        )
+        self.db.commit()
+        self._total_size += size - (previous[0] if previous else 0)
+        if self.max_size and self._total_size > self.max_size:
+            self._evict()
+
+    def _delete(self, fingerprint):
+        row = self.db.execute('SELECT size FROM responses WHERE fingerprint = ?', (fingerprint,)).fetchone()
+        if row:
+            self.db.execute('DELETE FROM responses WHERE fingerprint = ?', (fingerprint,))
+            self.db.commit()
+            self._total_size -= row[0]
+        self._touched.pop(fingerprint, None)
+
+    def _touch(self, fingerprint):
+        self._touched[fingerprint] = time.time()
+        if len(self._touched) >= TOUCH_BATCH:
+            self._flush_touches()
+
+    def _flush_touches(self):
+        if not self._touched:
+            return
+        self.db.executemany(
+            'UPDATE responses SET accessed_at = ? WHERE fingerprint = ?',
+            [(accessed_at, fingerprint) for fingerprint, accessed_at in self._touched.items()]
+        )
+        self.db.commit()
+        self._touched.clear()
+
+    def _evict(self):
+        """Drop least recently used responses until the cache is under its target size"""
+        self._flush_touches()
+        target = self.max_size * EVICTION_TARGET
+        removed = []
+        freed = 0
+        for fingerprint, size in self.db.execute('SELECT fingerprint, size FROM responses ORDER BY accessed_at'):
+            if self._total_size - freed <= target:
+                break
+            removed.append((fingerprint,))
+            freed += size
+        self.db.executemany('DELETE FROM responses WHERE fingerprint = ?', removed)
+        self.db.commit()
+        self._total_size -= freed
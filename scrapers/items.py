@@ -0,0 +1,151 @@
+"""
+Item model shared by all scrapers
+Compact __slots__ classes instead of per-item dicts with repeated keys
+"""
+
+import sys
+from operator import attrgetter
+
+# Fields with few distinct values, stored as interned strings
+INTERNED_FIELDS = ('source', 'category')
+
+
+class BaseItem:
+    """
+    Base class for scraped items
+    Supports both attribute access (templates) and the dict-style
+    get()/[] access used by older code, without copying the data
+    """
+
+    __slots__ = ()
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._values = attrgetter(*cls.fields) if len(cls.fields) > 1 else None
+
+    def __init__(self, **values):
+        for name in self.fields:
+            value = values.pop(name, None)
+            if name in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            object.__setattr__(self, name, value)
+        if values:
+            raise TypeError(f"{type(self).__name__} got unexpected fields: {', '.join(values)}")
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create an item from a dict, ignoring unknown keys"""
+        return cls(**{name: data.get(name) for name in cls.fields})
+
+    def get(self, key, default=None):
+        if key not in self.fields:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def keys(self):
+        return self.fields
+
+    def to_dict(self):
+        """Fast conversion for JSON serialization"""
+        return dict(zip(self.fields, self._values(self)))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values(self) == other._values(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}(title={self.title!r}, source={self.source!r})"
+
+
+class NewsItem(BaseItem):
+    """News article from ERR"""
+
+    fields = ('title', 'description', 'link', 'date', 'source', 'image', 'content', 'date_iso')
+    __slots__ = fields
+
+
+class EventItem(BaseItem):
+    """Cultural event from Kultuurikava or Piletilevi"""
+
+    fields = ('title', 'description', 'link', 'date', 'location', 'source', 'image', 'category',
+              'content', 'date_iso')
+    __slots__ = fields
+
+
+class CultureTopic(BaseItem):
+    """Culture topic summary from Wikipedia"""
+
+    fields = ('title', 'content', 'link', 'source')
+    __slots__ = fields
+
+
+class FallbackItems(list):
+    """
+    Built-in sample items a scraper returns when its source failed
+    Caches and the change feed use the mark to keep them apart from
+    scraped data; slices stay marked
+    """
+
+    fallback = True
+
+    def __getitem__(self, index):
+        result = super().__getitem__(index)
+        return FallbackItems(result) if isinstance(index, slice) else result
+
+
+def is_fallback(items):
+    """True for scraper results that are (partly) sample data"""
+    return getattr(items, 'fallback', False)
+
+
+# Full article text can be long, search results only carry a preview
+SEARCH_CONTENT_PREVIEW = 300
+
+
+class SearchHit:
+    """Search result view over a scraped item, serialized lazily"""
+
+    __slots__ = ('item', 'category')
+
+    def __init__(self, item, category):
+        self.item = item
+        self.category = sys.intern(category)
+
+    def to_dict(self):
+        item = self.item
+        content = _text(item.get('content'))
+        if len(content) > SEARCH_CONTENT_PREVIEW:
+            content = content[:SEARCH_CONTENT_PREVIEW] + '...'
+        return {
+            'title': _text(item.get('title')),
+            'description': _text(item.get('description')) or content,
+            'content': content,
+            'link': _text(item.get('link')),
+            'category': self.category
+        }
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
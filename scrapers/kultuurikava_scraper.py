@@ -3,15 +3,28 @@ Kultuurikava Events Scraper
 Collects cultural events from kultuurikava.ee
 """
 
-import requests
-from bs4 import BeautifulSoup
+from contextlib import closing
 from datetime import datetime, timedelta
+from scrapers.ratelimit import limited_get
+from scrapers.items import EventItem, FallbackItems
+from scrapers.selector_plan import SelectorPlan
+from scrapers.streaming import find_elements, stream_elements
+
+# Event containers, most specific first - kultuurikava uses various structures
+EVENT_SELECTORS = [
+    (('div', 'article'), ('event-card', 'event-item', 'event', 'calendar-event')),
+    (('div',), ('card', 'item')),
+]
 
 class KultuurikavaScraper:
     """Scraper for kultuurikava.ee events portal"""
     
-    def __init__(self):
-        self.base_url = "https://www.kultuurikava.ee"
+    def __init__(self, base_url=None, streaming=True):
+        self.base_url = base_url or "https://www.kultuurikava.ee"
+        # Parse the page while it downloads and stop once enough events are found
+        self.streaming = streaming
+        # Remembers which event and field selectors work on the current layout
+        self.plan = SelectorPlan('Kultuurikava', EVENT_SELECTORS)
         self.events_url = f"{self.base_url}/events/"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -25,75 +38,22 @@ class KultuurikavaScraper:
         events = []
         
         try:
-            # Try to fetch from kultuurikava events
-            response = requests.get(self.events_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find event elements - kultuurikava uses various structures
-            event_items = soup.find_all(['div', 'article'], 
-                                       class_=['event-card', 'event-item', 'event', 'calendar-event'],
-                                       limit=limit*2)
-            
-            if not event_items:
-                # Try alternative structure
-                event_items = soup.find_all('div', class_=['card', 'item'])
-            
-            for item in event_items:
-                if len(events) >= limit:
-                    break
-                    
-                try:
-                    # Extract title
-                    title_elem = item.find(['h1', 'h2', 'h3', 'h4', 'a'])
-                    if not title_elem:
+            # Stop reading the page as soon as enough events are parsed
+            run = self.plan.start()
+            with closing(self._iter_event_elements(run.selectors)) as event_items:
+                for number, item in event_items:
+                    try:
+                        event = self._parse_event(item, run)
+                    except Exception as e:
+                        print(f"Error parsing kultuurikava event: {e}")
                         continue
-                    title = title_elem.get_text(strip=True)
-                    
-                    # Skip if no valid title
-                    if not title or len(title) < 3:
-                        continue
-                    
-                    # Extract link
-                    link_elem = item.find('a', href=True)
-                    link = link_elem['href'] if link_elem else "#"
-                    if link and not link.startswith('http'):
-                        link = self.base_url + link
-                    
-                    # Extract description
-                    desc_elem = item.find(['p', 'div'], class_=['description', 'summary', 'lead', 'excerpt', 'text'])
-                    description = desc_elem.get_text(strip=True) if desc_elem else ""
-                    
-                    # Extract date
-                    date_elem = item.find(['time', 'span', 'div'], class_=['date', 'event-date', 'time', 'datetime'])
-                    date_str = date_elem.get_text(strip=True) if date_elem else ""
-                    if not date_str:
-                        # Try to get from datetime attribute
-                        if date_elem and date_elem.get('datetime'):
-                            date_str = date_elem['datetime']
-                    
-                    # Extract location
-                    location_elem = item.find(['span', 'div', 'p'], class_=['location', 'venue', 'place', 'address'])
-                    location = location_elem.get_text(strip=True) if location_elem else "Asukoht täpsustamisel"
                     
-                    # Extract image
-                    image_url = self._extract_image(item)
-                    
-                    if title and title not in [e['title'] for e in events]:
-                        events.append({
-                            'title': title,
-                            'description': description[:300] + '...' if len(description) > 300 else description,
-                            'link': link,
-                            'date': date_str or datetime.now().strftime('%d.%m.%Y'),
-                            'location': location,
-                            'source': 'Kultuurikava',
-                            'image': image_url
-                        })
-                    
-                except Exception as e:
-                    print(f"Error parsing kultuurikava event: {e}")
-                    continue
+                    if event and event.title not in [e.title for e in events]:
+                        events.append(event)
+                        run.hit(number)
+                        if len(events) >= limit:
+                            break
+            self.plan.finish(run, limit)
             
             # If no events found, add sample data
             if not events:
@@ -106,6 +66,64 @@ class KultuurikavaScraper:
         
         return events[:limit]
     
+    def _iter_event_elements(self, selectors):
+        """(selector number, event element) pairs of the listing page, streamed unless streaming=False"""
+        # Try to fetch from kultuurikava events
+        if self.streaming:
+            yield from stream_elements(self.events_url, selectors, headers=self.headers, timeout=10)
+            return
+        
+        response = limited_get(self.events_url, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        yield from find_elements(response.content, selectors)
+    
+    def _parse_event(self, item, run):
+        """Build an EventItem from one event element, None if it has no usable title"""
+        # Extract title
+        title_elem = run.find(item, 'title', ['h1', 'h2', 'h3', 'h4', 'a'])
+        if not title_elem:
+            return None
+        title = title_elem.get_text(strip=True)
+        
+        # Skip if no valid title
+        if not title or len(title) < 3:
+            return None
+        
+        # Extract link
+        link_elem = item.find('a', href=True)
+        link = link_elem['href'] if link_elem else "#"
+        if link and not link.startswith('http'):
+            link = self.base_url + link
+        
+        # Extract description
+        desc_elem = run.find(item, 'description', ['p', 'div'], ['description', 'summary', 'lead', 'excerpt', 'text'])
+        description = desc_elem.get_text(strip=True) if desc_elem else ""
+        
+        # Extract date
+        date_elem = run.find(item, 'date', ['time', 'span', 'div'], ['date', 'event-date', 'time', 'datetime'])
+        date_str = date_elem.get_text(strip=True) if date_elem else ""
+        if not date_str:
+            # Try to get from datetime attribute
+            if date_elem and date_elem.get('datetime'):
+                date_str = date_elem['datetime']
+        
+        # Extract location
+        location_elem = run.find(item, 'location', ['span', 'div', 'p'], ['location', 'venue', 'place', 'address'])
+        location = location_elem.get_text(strip=True) if location_elem else "Asukoht täpsustamisel"
+        
+        # Extract image
+        image_url = self._extract_image(item)
+        
+        return EventItem(
+            title=title,
+            description=description[:300] + '...' if len(description) > 300 else description,
+            link=link,
+            date=date_str or datetime.now().strftime('%d.%m.%Y'),
+            location=location,
+            source='Kultuurikava',
+            image=image_url
+        )
+    
     def _extract_image(self, item):
         """Extract image URL from event item"""
         img = item.find('img')
@@ -120,50 +138,50 @@ class KultuurikavaScraper:
     def _get_sample_events(self):
         """Return sample events data when scraping fails"""
         today = datetime.now()
-        return [
-            {
-                'title': 'Tallinna Muusikakool: Kevadkontsert',
-                'description': 'Tallinna Muusikakooli õpilased esitavad klassikalisi ja kaasaegseid teoseid. Kontserdil esinevad erinevate instrumentide õppijad.',
-                'link': 'https://www.kultuurikava.ee/event/tallinna-muusikakool-kevadkontsert',
-                'date': (today + timedelta(days=5)).strftime('%d.%m.%Y'),
-                'location': 'Tallinna Muusikakool',
-                'source': 'Kultuurikava',
-                'image': 'https://images.unsplash.com/photo-1514320291840-2e0a9bf2a9ae?w=640&q=80'
-            },
-            {
-                'title': 'Eesti Rahva Muuseumi näitus: Eesti lood',
-                'description': 'Näitus tutvustab Eesti ajalugu läbi esemete ja lugude. Uurige Eesti kultuuri arengut läbi sajandite.',
-                'link': 'https://www.kultuurikava.ee/event/eesti-rahva-muuseumi-naitus-eesti-lood',
-                'date': (today + timedelta(days=10)).strftime('%d.%m.%Y'),
-                'location': 'Eesti Rahva Muuseum, Tartu',
-                'source': 'Kultuurikava',
-                'image': 'https://images.unsplash.com/photo-1566127444979-b3d2b654e3d7?w=640&q=80'
-            },
-            {
-                'title': 'Vanemuise teater: Romeo ja Julia',
-                'description': 'William Shakespeare\'i ajatu armastuslugu Vanemuise teatri laval. Lavastus klassikalises vormis.',
-                'link': 'https://www.kultuurikava.ee/event/vanemuise-teater-romeo-ja-julia',
-                'date': (today + timedelta(days=15)).strftime('%d.%m.%Y'),
-                'location': 'Vanemuine, Tartu',
-                'source': 'Kultuurikava',
-                'image': 'https://images.unsplash.com/photo-1503095396549-807759245b35?w=640&q=80'
-            },
-            {
-                'title': 'Tallinna Botaanikaaed: Orhideede näitus',
-                'description': 'Eksootiliste orhideede näitus botaanikaaias. Üle 100 erinevat orhideede liigi.',
-                'link': 'https://www.kultuurikava.ee/event/tallinna-botaanikaaed-orhideede-naitus',
-                'date': (today + timedelta(days=20)).strftime('%d.%m.%Y'),
-                'location': 'Tallinna Botaanikaaed',
-                'source': 'Kultuurikava',
-                'image': 'https://images.unsplash.com/photo-1462275646964-a0e3571f4f2d?w=640&q=80'
-            },
-            {
-                'title': 'Narva muuseum: Eesti piiri ajalugu',
-                'description': 'Näitus Eesti ja Venemaa piiri ajaloost läbi aegade. Huvitavad faktid ja dokumendid.',
-                'link': 'https://www.kultuurikava.ee/event/narva-muuseum-eesti-piiri-ajalugu',
-                'date': (today + timedelta(days=25)).strftime('%d.%m.%Y'),
-                'location': 'Narva Muuseum',
-                'source': 'Kultuurikava',
-                'image': 'https://images.unsplash.com/photo-1544531586-fde5298cdd40?w=640&q=80'
-            }
-        ]
+        return FallbackItems([
+            EventItem(
+                title='Tallinna Muusikakool: Kevadkontsert',
+                description='Tallinna Muusikakooli õpilased esitavad klassikalisi ja kaasaegseid teoseid. Kontserdil esinevad erinevate instrumentide õppijad.',
+                link='https://www.kultuurikava.ee/event/tallinna-muusikakool-kevadkontsert',
+                date=(today + timedelta(days=5)).strftime('%d.%m.%Y'),
+                location='Tallinna Muusikakool',
+                source='Kultuurikava',
+                image='https://images.unsplash.com/photo-1514320291840-2e0a9bf2a9ae?w=640&q=80'
+            ),
+            EventItem(
+                title='Eesti Rahva Muuseumi näitus: Eesti lood',
+                description='Näitus tutvustab Eesti ajalugu läbi esemete ja lugude. Uurige Eesti kultuuri arengut läbi sajandite.',
+                link='https://www.kultuurikava.ee/event/eesti-rahva-muuseumi-naitus-eesti-lood',
+                date=(today + timedelta(days=10)).strftime('%d.%m.%Y'),
+                location='Eesti Rahva Muuseum, Tartu',
+                source='Kultuurikava',
+                image='https://images.unsplash.com/photo-1566127444979-b3d2b654e3d7?w=640&q=80'
+            ),
+            EventItem(
+                title='Vanemuise teater: Romeo ja Julia',
+                description='William Shakespeare\'i ajatu armastuslugu Vanemuise teatri laval. Lavastus klassikalises vormis.',
+                link='https://www.kultuurikava.ee/event/vanemuise-teater-romeo-ja-julia',
+                date=(today + timedelta(days=15)).strftime('%d.%m.%Y'),
+                location='Vanemuine, Tartu',
+                source='Kultuurikava',
+                image='https://images.unsplash.com/photo-1503095396549-807759245b35?w=640&q=80'
+            ),
+            EventItem(
+                title='Tallinna Botaanikaaed: Orhideede näitus',
+                description='Eksootiliste orhideede näitus botaanikaaias. Üle 100 erinevat orhideede liigi.',
+                link='https://www.kultuurikava.ee/event/tallinna-botaanikaaed-orhideede-naitus',
+                date=(today + timedelta(days=20)).strftime('%d.%m.%Y'),
+                location='Tallinna Botaanikaaed',
+                source='Kultuurikava',
+                image='https://images.unsplash.com/photo-1462275646964-a0e3571f4f2d?w=640&q=80'
+            ),
+            EventItem(
+                title='Narva muuseum: Eesti piiri ajalugu',
+                description='Näitus Eesti ja Venemaa piiri ajaloost läbi aegade. Huvitavad faktid ja dokumendid.',
+                link='https://www.kultuurikava.ee/event/narva-muuseum-eesti-piiri-ajalugu',
+                date=(today + timedelta(days=25)).strftime('%d.%m.%Y'),
+                location='Narva Muuseum',
+                source='Kultuurikava',
+                image='https://images.unsplash.com/photo-1544531586-fde5298cdd40?w=640&q=80'
+            )
+        ])
@@ -3,15 +3,28 @@ Piletilevi Events Scraper
 Collects cultural events with images from piletilevi.ee
 """
 
-import requests
-from bs4 import BeautifulSoup
+from contextlib import closing
 from datetime import datetime, timedelta
+from scrapers.ratelimit import limited_get
+from scrapers.items import EventItem, FallbackItems
+from scrapers.selector_plan import SelectorPlan
+from scrapers.streaming import find_elements, stream_elements
+
+# Event containers, most specific first - piletilevi uses various structures
+EVENT_SELECTORS = [
+    (('div', 'article', 'li'), ('event', 'event-card', 'event-item', 'product-item', 'ticket-item')),
+    (('div', 'article'), ('item', 'card', 'product')),
+]
 
 class PiletileviScraper:
     """Scraper for piletilevi.ee ticket portal - focuses on cultural events with images"""
     
-    def __init__(self):
-        self.base_url = "https://www.piletilevi.ee"
+    def __init__(self, base_url=None, streaming=True):
+        self.base_url = base_url or "https://www.piletilevi.ee"
+        # Parse the page while it downloads and stop once enough events are found
+        self.streaming = streaming
+        # Remembers which event and field selectors work on the current layout
+        self.plan = SelectorPlan('Piletilevi', EVENT_SELECTORS)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
@@ -25,72 +38,22 @@ class PiletileviScraper:
         events = []
         
         try:
-            # Try to fetch from piletilevi main page or events section
-            response = requests.get(self.base_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find event elements - piletilevi uses various structures
-            event_items = soup.find_all(['div', 'article', 'li'], 
-                                       class_=['event', 'event-card', 'event-item', 'product-item', 'ticket-item'],
-                                       limit=limit*2)
-            
-            if not event_items:
-                # Try alternative structure
-                event_items = soup.find_all(['div', 'article'], class_=['item', 'card', 'product'])
-            
-            for item in event_items:
-                if len(events) >= limit:
-                    break
-                    
-                try:
-                    # Extract title
-                    title_elem = item.find(['h1', 'h2', 'h3', 'h4', 'a'])
-                    if not title_elem:
+            # Stop reading the page as soon as enough events are parsed
+            run = self.plan.start()
+            with closing(self._iter_event_elements(run.selectors)) as event_items:
+                for number, item in event_items:
+                    try:
+                        event = self._parse_event(item, run)
+                    except Exception as e:
+                        print(f"Error parsing piletilevi event: {e}")
                         continue
-                    title = title_elem.get_text(strip=True)
-                    
-                    # Skip if no valid title
-                    if not title or len(title) < 3:
-                        continue
-                    
-                    # Extract link
-                    link_elem = item.find('a', href=True)
-                    link = link_elem['href'] if link_elem else "#"
-                    if link and not link.startswith('http'):
-                        link = self.base_url + link
-                    
-                    # Extract description
-                    desc_elem = item.find(['p', 'div'], class_=['description', 'summary', 'excerpt', 'info'])
-                    description = desc_elem.get_text(strip=True) if desc_elem else ""
-                    
-                    # Extract date
-                    date_elem = item.find(['time', 'span', 'div'], class_=['date', 'event-date', 'time', 'datetime'])
-                    date_str = date_elem.get_text(strip=True) if date_elem else ""
-                    
-                    # Extract location/venue
-                    location_elem = item.find(['span', 'div', 'p'], class_=['location', 'venue', 'place', 'address'])
-                    location = location_elem.get_text(strip=True) if location_elem else "Asukoht täpsustamisel"
                     
-                    # Extract image - important for this source
-                    image_url = self._extract_image(item)
-                    
-                    if title and title not in [e['title'] for e in events]:
-                        events.append({
-                            'title': title,
-                            'description': description[:300] + '...' if len(description) > 300 else description or f"Kultuuriüritus: {title}",
-                            'link': link,
-                            'date': date_str or datetime.now().strftime('%d.%m.%Y'),
-                            'location': location,
-                            'source': 'Piletilevi',
-                            'image': image_url,
-                            'category': 'kultuur'  # Mark as cultural event
-                        })
-                    
-                except Exception as e:
-                    print(f"Error parsing piletilevi event: {e}")
-                    continue
+                    if event and event.title not in [e.title for e in events]:
+                        events.append(event)
+                        run.hit(number)
+                        if len(events) >= limit:
+                            break
+            self.plan.finish(run, limit)
             
             # If no events found, add sample data
             if not events:
@@ -103,6 +66,61 @@ class PiletileviScraper:
         
         return events[:limit]
     
+    def _iter_event_elements(self, selectors):
+        """(selector number, event element) pairs of the listing page, streamed unless streaming=False"""
+        # Try to fetch from piletilevi main page or events section
+        if self.streaming:
+            yield from stream_elements(self.base_url, selectors, headers=self.headers, timeout=10)
+            return
+        
+        response = limited_get(self.base_url, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        yield from find_elements(response.content, selectors)
+    
+    def _parse_event(self, item, run):
+        """Build an EventItem from one event element, None if it has no usable title"""
+        # Extract title
+        title_elem = run.find(item, 'title', ['h1', 'h2', 'h3', 'h4', 'a'])
+        if not title_elem:
+            return None
+        title = title_elem.get_text(strip=True)
+        
+        # Skip if no valid title
+        if not title or len(title) < 3:
+            return None
+        
+        # Extract link
+        link_elem = item.find('a', href=True)
+        link = link_elem['href'] if link_elem else "#"
+        if link and not link.startswith('http'):
+            link = self.base_url + link
+        
+        # Extract description
+        desc_elem = run.find(item, 'description', ['p', 'div'], ['description', 'summary', 'excerpt', 'info'])
+        description = desc_elem.get_text(strip=True) if desc_elem else ""
+        
+        # Extract date
+        date_elem = run.find(item, 'date', ['time', 'span', 'div'], ['date', 'event-date', 'time', 'datetime'])
+        date_str = date_elem.get_text(strip=True) if date_elem else ""
+        
+        # Extract location/venue
+        location_elem = run.find(item, 'location', ['span', 'div', 'p'], ['location', 'venue', 'place', 'address'])
+        location = location_elem.get_text(strip=True) if location_elem else "Asukoht täpsustamisel"
+        
+        # Extract image - important for this source
+        image_url = self._extract_image(item)
+        
+        return EventItem(
+            title=title,
+            description=description[:300] + '...' if len(description) > 300 else description or f"Kultuuriüritus: {title}",
+            link=link,
+            date=date_str or datetime.now().strftime('%d.%m.%Y'),
+            location=location,
+            source='Piletilevi',
+            image=image_url,
+            category='kultuur'  # Mark as cultural event
+        )
+    
     def _extract_image(self, item):
         """Extract image URL from event item"""
         # Try multiple image sources
@@ -138,65 +156,65 @@ class PiletileviScraper:
     def _get_sample_events(self):
         """Return sample cultural events data with images when scraping fails"""
         today = datetime.now()
-        return [
-            {
-                'title': 'Rahvusooper Estonia: Tosca',
-                'description': 'Giacomo Puccini kuulus ooper Tosca Rahvusooper Estonia laval. Kaunis lugu armastusest, kadedusest ja ohvrist.',
-                'link': 'https://www.piletilevi.ee/est/piletid/muusika/ooper/rahvusooper-estonia-tosca',
-                'date': (today + timedelta(days=4)).strftime('%d.%m.%Y'),
-                'location': 'Estonia teater, Tallinn',
-                'source': 'Piletilevi',
-                'image': 'https://images.unsplash.com/photo-1580809361436-42a7ec204889?w=640&q=80',
-                'category': 'kultuur'
-            },
-            {
-                'title': 'Eesti Rahvusballeti kevadkontsert',
-                'description': 'Eesti Rahvusballet esitab klassikalise ja kaasaegse tantsu parimikku. Õhtu täis graatsiat ja kunsti.',
-                'link': 'https://www.piletilevi.ee/est/piletid/muusika/ballett/eesti-rahvusballeti-kevadkontsert',
-                'date': (today + timedelta(days=8)).strftime('%d.%m.%Y'),
-                'location': 'Estonia teater, Tallinn',
-                'source': 'Piletilevi',
-                'image': 'https://images.unsplash.com/photo-1518834107812-67b0b7c58434?w=640&q=80',
-                'category': 'kultuur'
-            },
-            {
-                'title': 'Tallinna Kammerorkester: Kevadkontsert',
-                'description': 'Tallinna Kammerorkester esitab Barokiajastu ja romantismi parimaid teoseid. Juhatab maestro Tõnu Kaljuste.',
-                'link': 'https://www.piletilevi.ee/est/piletid/muusika/klassika/tallinna-kammerorkester-kevadkontsert',
-                'date': (today + timedelta(days=12)).strftime('%d.%m.%Y'),
-                'location': 'Mustpeade Maja, Tallinn',
-                'source': 'Piletilevi',
-                'image': 'https://images.unsplash.com/photo-1465847899084-d164df4dedc6?w=640&q=80',
-                'category': 'kultuur'
-            },
-            {
-                'title': 'Eesti Filharmoonia Kammerkoor',
-                'description': 'Maailmakuulus Eesti Filharmoonia Kammerkoor esitab renessansi ja kaasaegset koormuusikat.',
-                'link': 'https://www.piletilevi.ee/est/piletid/muusika/koor/eesti-filharmoonia-kammerkoor',
-                'date': (today + timedelta(days=18)).strftime('%d.%m.%Y'),
-                'location': 'Niguliste Muuseum, Tallinn',
-                'source': 'Piletilevi',
-                'image': 'https://images.unsplash.com/photo-1507838153414-b4b713384a76?w=640&q=80',
-                'category': 'kultuur'
-            },
-            {
-                'title': 'Noorsooteatri etendus: Eesti rahvamuinasjutud',
-                'description': 'Lapsed ja täiskasvanud saavad nautida Eesti rahvamuinasjuttude värvikat ettekandmist.',
-                'link': 'https://www.piletilevi.ee/est/piletid/teater/noorsooteatri-etendus-eesti-rahvamuinasjutud',
-                'date': (today + timedelta(days=22)).strftime('%d.%m.%Y'),
-                'location': 'Noorsooteatri maja, Tallinn',
-                'source': 'Piletilevi',
-                'image': 'https://images.unsplash.com/photo-1507924538820-ede94a04019d?w=640&q=80',
-                'category': 'kultuur'
-            },
-            {
-                'title': 'Pärnu Kontserdimajas: Eesti heliloojate kontsert',
-                'description': 'Õhtu pühendatud tänapäeva eesti heliloojate loomingule. Esitlevad parimad eesti muusikud.',
-                'link': 'https://www.piletilevi.ee/est/piletid/muusika/klassika/parnu-kontserdimajas-eesti-heliloojate-kontsert',
-                'date': (today + timedelta(days=27)).strftime('%d.%m.%Y'),
-                'location': 'Pärnu Kontserdimaja',
-                'source': 'Piletilevi',
-                'image': 'https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?w=640&q=80',
-                'category': 'kultuur'
-            }
-        ]
+        return FallbackItems([
+            EventItem(
+                title='Rahvusooper Estonia: Tosca',
+                description='Giacomo Puccini kuulus ooper Tosca Rahvusooper Estonia laval. Kaunis lugu armastusest, kadedusest ja ohvrist.',
+                link='https://www.piletilevi.ee/est/piletid/muusika/ooper/rahvusooper-estonia-tosca',
+                date=(today + timedelta(days=4)).strftime('%d.%m.%Y'),
+                location='Estonia teater, Tallinn',
+                source='Piletilevi',
+                image='https://images.unsplash.com/photo-1580809361436-42a7ec204889?w=640&q=80',
+                category='kultuur'
+            ),
+            EventItem(
+                title='Eesti Rahvusballeti kevadkontsert',
+                description='Eesti Rahvusballet esitab klassikalise ja kaasaegse tantsu parimikku. Õhtu täis graatsiat ja kunsti.',
+                link='https://www.piletilevi.ee/est/piletid/muusika/ballett/eesti-rahvusballeti-kevadkontsert',
+                date=(today + timedelta(days=8)).strftime('%d.%m.%Y'),
+                location='Estonia teater, Tallinn',
+                source='Piletilevi',
+                image='https://images.unsplash.com/photo-1518834107812-67b0b7c58434?w=640&q=80',
+                category='kultuur'
+            ),
+            EventItem(
+                title='Tallinna Kammerorkester: Kevadkontsert',
+                description='Tallinna Kammerorkester esitab Barokiajastu ja romantismi parimaid teoseid. Juhatab maestro Tõnu Kaljuste.',
+                link='https://www.piletilevi.ee/est/piletid/muusika/klassika/tallinna-kammerorkester-kevadkontsert',
+                date=(today + timedelta(days=12)).strftime('%d.%m.%Y'),
+                location='Mustpeade Maja, Tallinn',
+                source='Piletilevi',
+                image='https://images.unsplash.com/photo-1465847899084-d164df4dedc6?w=640&q=80',
+                category='kultuur'
+            ),
+            EventItem(
+                title='Eesti Filharmoonia Kammerkoor',
+                description='Maailmakuulus Eesti Filharmoonia Kammerkoor esitab renessansi ja kaasaegset koormuusikat.',
+                link='https://www.piletilevi.ee/est/piletid/muusika/koor/eesti-filharmoonia-kammerkoor',
+                date=(today + timedelta(days=18)).strftime('%d.%m.%Y'),
+                location='Niguliste Muuseum, Tallinn',
+                source='Piletilevi',
+                image='https://images.unsplash.com/photo-1507838153414-b4b713384a76?w=640&q=80',
+                category='kultuur'
+            ),
+            EventItem(
+                title='Noorsooteatri etendus: Eesti rahvamuinasjutud',
+                description='Lapsed ja täiskasvanud saavad nautida Eesti rahvamuinasjuttude värvikat ettekandmist.',
+                link='https://www.piletilevi.ee/est/piletid/teater/noorsooteatri-etendus-eesti-rahvamuinasjutud',
+                date=(today + timedelta(days=22)).strftime('%d.%m.%Y'),
+                location='Noorsooteatri maja, Tallinn',
+                source='Piletilevi',
+                image='https://images.unsplash.com/photo-1507924538820-ede94a04019d?w=640&q=80',
+                category='kultuur'
+            ),
+            EventItem(
+                title='Pärnu Kontserdimajas: Eesti heliloojate kontsert',
+                description='Õhtu pühendatud tänapäeva eesti heliloojate loomingule. Esitlevad parimad eesti muusikud.',
+                link='https://www.piletilevi.ee/est/piletid/muusika/klassika/parnu-kontserdimajas-eesti-heliloojate-kontsert',
+                date=(today + timedelta(days=27)).strftime('%d.%m.%Y'),
+                location='Pärnu Kontserdimaja',
+                source='Piletilevi',
+                image='https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?w=640&q=80',
+                category='kultuur'
+            )
+        ])
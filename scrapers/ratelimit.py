@@ -0,0 +1,315 @@
+"""
+Outbound rate limiting for the requests-based scrapers
+Token bucket per host plus a per-host concurrency cap, shared by all
+threads and worker processes through small lock files, with an adaptive
+slow-down when a host answers 429/503 or sends Retry-After
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits are shared between threads only
+    fcntl = None
+
+# Requests per second, burst size and parallel connections per host
+DEFAULT_LIMITS = {'rate': 2.0, 'burst': 4, 'concurrency': 2}
+HOST_LIMITS = {
+    'kultuur.err.ee': {'rate': 1.0, 'burst': 2, 'concurrency': 2},
+    'www.kultuurikava.ee': {'rate': 1.0, 'burst': 2, 'concurrency': 2},
+    'www.piletilevi.ee': {'rate': 1.0, 'burst': 2, 'concurrency': 2},
+    'et.wikipedia.org': {'rate': 5.0, 'burst': 10, 'concurrency': 4},
+}
+
+# Bounds of the adaptive rate factor applied after 429/503 answers
+MIN_RATE_FACTOR = 1 / 16
+RECOVERY_STEP = 1.1
+# Longest wait for a token, or for a host's Retry-After block to end, before giving up
+# with RateLimitExceeded; throttled responses with a Retry-After up to this are retried once
+MAX_RETRY_WAIT = 10
+THROTTLE_STATUSES = (429, 503)
+
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), 'koidulaulik-ratelimit')
+
+
+class RateLimitExceeded(requests.RequestException):
+    """The host would not allow a request within the maximum wait"""
+
+
+def limits_from_env(environ=None):
+    """
+    Host limits from SCRAPER_RATE_LIMITS, a JSON object such as
+    {"*": {"rate": 50, "burst": 50, "concurrency": 16}}, where "*" is the default
+    Returns (host_limits, default_limits)
+    """
+    environ = os.environ if environ is None else environ
+    host_limits = dict(HOST_LIMITS)
+    default_limits = DEFAULT_LIMITS
+    if environ.get('SCRAPER_RATE_LIMITS'):
+        try:
+            overrides = json.loads(environ['SCRAPER_RATE_LIMITS'])
+        except ValueError as e:
+            print(f"Ignoring invalid SCRAPER_RATE_LIMITS: {e}")
+            overrides = {}
+        default_limits = {**DEFAULT_LIMITS, **overrides.pop('*', {})}
+        for host, limits in overrides.items():
+            host_limits[host] = {**default_limits, **limits}
+    return host_limits, default_limits
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait according to a Retry-After header (delta or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at - (now if now is not None else time.time()), 0.0)
+
+
+class _FileLock:
+    """Exclusive lock on a file, shared across threads and processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def hold(self):
+        with self._thread_lock:
+            if fcntl is None:
+                yield None
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            with os.fdopen(fd, 'r+') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield lock_file
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class HostRateLimiter:
+    """
+    Rate limiter with state in state_dir, so every worker process that
+    uses the same directory shares one budget per host
+    """
+
+    def __init__(self, state_dir=None, host_limits=None, default_limits=None, poll_interval=0.05):
+        self.state_dir = state_dir or os.environ.get('SCRAPER_RATE_LIMIT_DIR') or DEFAULT_STATE_DIR
+        self.host_limits = HOST_LIMITS if host_limits is None else host_limits
+        self.default_limits = default_limits or DEFAULT_LIMITS
+        self.poll_interval = poll_interval
+        self._locks = {}
+        self._memory_state = {}
+        self._local_slots = {}
+        self._guard = threading.Lock()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def limits(self, host):
+        return self.host_limits.get(host, self.default_limits)
+
+    def _file(self, host, suffix):
+        return os.path.join(self.state_dir, f"{host.replace(':', '_')}.{suffix}")
+
+    def _lock(self, host):
+        with self._guard:
+            if host not in self._locks:
+                self._locks[host] = _FileLock(self._file(host, 'lock'))
+            return self._locks[host]
+
+    def _read_state(self, lock_file, host):
+        if lock_file is None:
+            return dict(self._memory_state.get(host, {}))
+        lock_file.seek(0)
+        try:
+            return json.loads(lock_file.read() or '{}')
+        except ValueError:
+            return {}
+
+    def _write_state(self, lock_file, host, state):
+        if lock_file is None:
+            self._memory_state[host] = state
+            return
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(json.dumps(state))
+        lock_file.flush()
+
+    def _update(self, host, change):
+        """Apply change(state, now) under the host lock, return its result"""
+        with self._lock(host).hold() as lock_file:
+            state = self._read_state(lock_file, host)
+            result = change(state, time.time())
+            self._write_state(lock_file, host, state)
+            return result
+
+    def acquire_token(self, host, max_wait=MAX_RETRY_WAIT):
+        """
+        Block until the host's token bucket allows one more request
+        Raises RateLimitExceeded instead of waiting longer than max_wait
+        seconds, e.g. while the host is blocked by a long Retry-After
+        """
+        limits = self.limits(host)
+        deadline = time.monotonic() + max_wait
+
+        def take(state, now):
+            factor = state.get('factor', 1.0)
+            rate = limits['rate'] * factor
+            blocked_until = state.get('blocked_until', 0)
+            if now < blocked_until:
+                return blocked_until - now
+            tokens = min(
+                state.get('tokens', limits['burst']) + (now - state.get('updated', now)) * rate,
+                limits['burst']
+            )
+            state['updated'] = now
+            if tokens >= 1:
+                state['tokens'] = tokens - 1
+                return 0
+            state['tokens'] = tokens
+            return (1 - tokens) / rate
+
+        while True:
+            wait = self._update(host, take)
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimitExceeded(f"{host} allows no request within {max_wait:g} s (next in {wait:.1f} s)")
+            time.sleep(min(wait, 1.0))
+
+    @contextmanager
+    def slot(self, host):
+        """Hold one of the host's concurrency slots"""
+        concurrency = self.limits(host)['concurrency']
+        if fcntl is None:
+            with self._guard:
+                if host not in self._local_slots:
+                    self._local_slots[host] = threading.BoundedSemaphore(concurrency)
+            with self._local_slots[host]:
+                yield
+            return
+
+        # One lock file per slot; non-blocking attempts keep cooperative workers responsive
+        while True:
+            for number in range(concurrency):
+                slot_file = open(self._file(host, f'slot{number}'), 'a+')
+                try:
+                    fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    slot_file.close()
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(slot_file, fcntl.LOCK_UN)
+                    slot_file.close()
+                return
+            time.sleep(self.poll_interval)
+
+    def record_response(self, host, status, retry_after=None):
+        """Slow the host down on 429/503, recover gradually on success"""
+        def change(state, now):
+            factor = state.get('factor', 1.0)
+            if status in THROTTLE_STATUSES:
+                state['factor'] = max(factor / 2, MIN_RATE_FACTOR)
+                if retry_after:
+                    state['blocked_until'] = max(state.get('blocked_until', 0), now + retry_after)
+            elif status < 400 and factor < 1.0:
+                state['factor'] = min(factor * RECOVERY_STEP, 1.0)
+
+        self._update(host, change)
+
+    @contextmanager
+    def limited(self, url):
+        """
+        Wait for a token, then for a free slot, before talking to url's host
+        The token comes first so a throttled host does not tie up its slots
+        """
+        host = urlparse(url).netloc
+        self.acquire_token(host)
+        with self.slot(host):
+            yield host
+
+    def get(self, url, **kwargs):
+        """
+        requests.get() within the host's limits
+        A 429/503 with a short Retry-After is retried once after waiting
+        """
+        for attempt in range(2):
+            with self.limited(url) as host:
+                response = requests.get(url, **kwargs)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.record_response(host, response.status_code, retry_after)
+            if (
+                response.status_code in THROTTLE_STATUSES
+                and attempt == 0
+                and retry_after is not None
+                and retry_after <= MAX_RETRY_WAIT
+            ):
+                response.close()
+                continue
+            return response
+        return response
+
+    @contextmanager
+    def stream(self, url, **kwargs):
+        """
+        requests.get(stream=True) whose body is read while holding the host's
+        slot; the response is closed when the block exits
+        """
+        with self.limited(url) as host:
+            response = requests.get(url, stream=True, **kwargs)
+            try:
+                self.record_response(
+                    host, response.status_code, parse_retry_after(response.headers.get('Retry-After'))
+                )
+                yield response
+            finally:
+                response.close()
+
+
+_default_limiter = None
+_default_lock = threading.Lock()
+
+
+def get_limiter():
+    """Process-wide limiter shared by all scrapers"""
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_lock:
+            if _default_limiter is None:
+                host_limits, default_limits = limits_from_env()
+                _default_limiter = HostRateLimiter(host_limits=host_limits, default_limits=default_limits)
+    return _default_limiter
+
+
+def set_limiter(limiter):
+    """Replace the process-wide limiter, e.g. with looser limits for load tests"""
+    global _default_limiter
+    with _default_lock:
+        _default_limiter = limiter
+
+
+def limited_get(url, **kwargs):
+    """Drop-in replacement for requests.get() used by the scrapers"""
+    return get_limiter().get(url, **kwargs)
+
+
+def limited_stream(url, **kwargs):
+    """Streaming counterpart of limited_get(), used as a context manager"""
+    return get_limiter().stream(url, **kwargs)
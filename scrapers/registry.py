@@ -0,0 +1,82 @@
+"""
+Lazy scraper registry
+Scraper modules (and with them requests and BeautifulSoup) are imported
+only when a scraper is first used, which keeps worker startup fast
+"""
+
+import importlib
+import json
+import os
+import threading
+import zlib
+
+# Scraper name -> (module, class)
+SCRAPERS = {
+    'err': ('scrapers.err_scraper', 'ERRNewsScraper'),
+    'wiki': ('scrapers.wikipedia_scraper', 'WikipediaScraper'),
+    'kultuurikava': ('scrapers.kultuurikava_scraper', 'KultuurikavaScraper'),
+    'piletilevi': ('scrapers.piletilevi_scraper', 'PiletileviScraper'),
+    # Not a scraper of its own: fetches the detail pages listing items link to
+    'enricher': ('scrapers.enrichment', 'DetailEnricher'),
+}
+
+# Scrapers whose get_* results are kept in the shared cache
+CACHED_SCRAPERS = ('err', 'wiki', 'kultuurikava', 'piletilevi')
+
+# Environment variables that point a scraper at another host, e.g. a stub upstream
+BASE_URL_ENV = {
+    'err': 'ERR_BASE_URL',
+    'wiki': 'WIKIPEDIA_BASE_URL',
+    'kultuurikava': 'KULTUURIKAVA_BASE_URL',
+    'piletilevi': 'PILETILEVI_BASE_URL',
+}
+
+
+def options_from_env(environ=None):
+    """Scraper constructor options taken from BASE_URL_ENV variables"""
+    environ = os.environ if environ is None else environ
+    options = {}
+    for name, variable in BASE_URL_ENV.items():
+        if environ.get(variable):
+            options[name] = {'base_url': environ[variable]}
+    return options
+
+
+class ScraperRegistry:
+    """Creates each scraper on first access and reuses it afterwards"""
+
+    def __init__(self, options=None, cache=None):
+        # Optional constructor keyword arguments per scraper name
+        self.options = options or {}
+        # Optional scrapers.cache.SharedCache for results of CACHED_SCRAPERS
+        self.cache = cache
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        scraper = self._instances.get(name)
+        if scraper is not None:
+            return scraper
+
+        if name not in SCRAPERS:
+            raise KeyError(f"Unknown scraper: {name}")
+
+        with self._lock:
+            scraper = self._instances.get(name)
+            if scraper is None:
+                module_name, class_name = SCRAPERS[name]
+                scraper_class = getattr(importlib.import_module(module_name), class_name)
+                options = self.options.get(name, {})
+                scraper = scraper_class(**options)
+                if self.cache is not None and name in CACHED_SCRAPERS:
+                    from scrapers.cache import CachedScraper
+
+                    # Options are part of the key, so a stub upstream never fills the real cache
+                    options_hash = format(zlib.crc32(json.dumps(options, sort_keys=True).encode('utf-8')), '08x')
+                    scraper = CachedScraper(f'{name}.{options_hash}', scraper, self.cache)
+                self._instances[name] = scraper
+        return scraper
+
+    def loaded(self):
+        """Names of scrapers that have been constructed so far"""
+        return list(self._instances)
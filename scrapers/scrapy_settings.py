@@ -42,3 +42,13 @@ AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
 HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 3600
 HTTPCACHE_DIR = 'httpcache'
+# One compressed SQLite file instead of several plain files per response
+HTTPCACHE_STORAGE = 'scrapers.httpcache.SQLiteCacheStorage'
+HTTPCACHE_COMPRESSION = 'zstd'  # zlib is used when zstandard is not installed
+HTTPCACHE_MAX_SIZE = 256 * 1024 * 1024
+# News listings change more often than event calendars
+HTTPCACHE_DOMAIN_EXPIRATION_SECS = {
+    'err.ee': 900,
+    'kultuurikava.ee': 3600,
+    'piletilevi.ee': 3600,
+}
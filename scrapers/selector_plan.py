@@ -0,0 +1,123 @@
+"""
+Adaptive selector plans
+Every listing page is scraped through a cascade of container selectors
+and, per field, a list of candidate tags and classes. A SelectorPlan
+remembers which container selector and which tag/class of every field
+actually produced valid items for its source, tries those first on the
+next scrape, and falls back to probing the full cascade only after the
+yield drops, printing a warning since that usually means a layout change
+"""
+
+import threading
+from collections import Counter
+
+# A run yielding less than this share of the learned baseline re-probes the cascade
+MIN_YIELD_RATIO = 0.5
+# A field found in at least this share of items is expected to keep being found
+FIELD_EXPECTED_RATIO = 0.5
+
+
+class PlanRun:
+    """Selector choices and hits of a single scrape"""
+
+    def __init__(self, selectors, fields):
+        self.selectors = selectors
+        self._fields = fields
+        self.items = 0
+        self.container_hits = Counter()
+        self.field_hits = {}
+        self.field_misses = Counter()
+
+    def hit(self, number):
+        """Record that the element matched by selectors[number] gave a valid item"""
+        self.items += 1
+        self.container_hits[self.selectors[number]] += 1
+
+    def find(self, element, field, tags, classes=None):
+        """
+        element.find(tags, class_=classes), trying the tag/class pair that
+        matched this field last time first
+        """
+        remembered = self._fields.get(field)
+        if remembered is not None:
+            tag, class_name = remembered
+            found = element.find(tag, class_=class_name) if class_name else element.find(tag)
+            if found is not None:
+                self._record(field, remembered)
+                return found
+
+        found = element.find(list(tags), class_=list(classes)) if classes else element.find(list(tags))
+        if found is None:
+            self.field_misses[field] += 1
+            return None
+        class_name = None
+        if classes:
+            class_name = next((name for name in found.get('class', []) if name in classes), None)
+        self._record(field, (found.name, class_name))
+        return found
+
+    def _record(self, field, choice):
+        self.field_hits.setdefault(field, Counter())[choice] += 1
+
+
+class SelectorPlan:
+    """Learned selector choices for one source, shared by all threads of a worker"""
+
+    def __init__(self, source, selectors):
+        self.source = source
+        self.default_selectors = [tuple(map(tuple, selector)) for selector in selectors]
+        self.container = None
+        self.fields = {}
+        # Most valid items seen in one scrape
+        self.baseline = None
+        self.field_rates = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Begin a scrape: container selectors with the remembered one first"""
+        with self._lock:
+            selectors = list(self.default_selectors)
+            if self.container is not None:
+                selectors.remove(self.container)
+                selectors.insert(0, self.container)
+            return PlanRun(selectors, dict(self.fields))
+
+    def finish(self, run, limit):
+        """Learn from a finished scrape, or forget the plan when its yield dropped"""
+        with self._lock:
+            # Runs stop at `limit` items, so compare against what this limit allows
+            expected_items = min(self.baseline, limit) if self.baseline is not None else 0
+            if run.items < expected_items * MIN_YIELD_RATIO:
+                print(
+                    f"Selector plan for {self.source}: only {run.items} items "
+                    f"(expected {expected_items}), page layout may have changed; re-probing all selectors"
+                )
+                self.reset()
+                return
+            if not run.items:
+                return
+
+            self.container = run.container_hits.most_common(1)[0][0]
+            self.baseline = max(self.baseline or 0, run.items)
+
+            for field in set(run.field_hits) | set(run.field_misses):
+                hits = run.field_hits.get(field, Counter())
+                rate = sum(hits.values()) / (sum(hits.values()) + run.field_misses[field])
+                expected = self.field_rates.get(field)
+                if expected is not None and expected >= FIELD_EXPECTED_RATIO and rate < expected * MIN_YIELD_RATIO:
+                    print(
+                        f"Selector plan for {self.source}: field '{field}' found in {rate:.0%} of items "
+                        f"(was {expected:.0%}), page layout may have changed"
+                    )
+                    self.fields.pop(field, None)
+                    self.field_rates[field] = rate
+                    continue
+                if hits:
+                    self.fields[field] = hits.most_common(1)[0][0]
+                self.field_rates[field] = rate
+
+    def reset(self):
+        self.container = None
+        self.fields = {}
+        self.baseline = None
+        self.field_rates = {}
@@ -0,0 +1,99 @@
+"""
+Incremental listing page parsing
+The response body is read in chunks into lxml's pull parser and every
+listing element is handed out as soon as its end tag has been parsed, so
+a caller that only needs the first few items can stop the download early
+
+Selectors are lists of (tags, classes) pairs in priority order: elements of
+the first pair are yielded while streaming, later pairs are fallbacks that
+are only used when no element matched the ones before them. Elements are
+yielded as (selector number, tag) pairs
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+from scrapers.ratelimit import limited_stream
+
+CHUNK_SIZE = 16 * 1024
+
+_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def _matching_selector(element, selectors):
+    """Index of the first selector that matches an lxml element, or None"""
+    if not isinstance(element.tag, str):
+        return None
+    classes = set(element.get('class', '').split())
+    for number, (tags, selector_classes) in enumerate(selectors):
+        if element.tag in tags and classes.intersection(selector_classes):
+            return number
+    return None
+
+
+def _to_tag(element):
+    """BeautifulSoup tag for an lxml element, so the scrapers' field extraction is unchanged"""
+    from lxml import etree
+
+    html = etree.tostring(element, encoding='unicode', method='html', with_tail=False)
+    return BeautifulSoup(html, 'html.parser').find(True)
+
+
+def _response_encoding(response):
+    match = _CHARSET.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else 'utf-8'
+
+
+def stream_elements(url, selectors, chunk_size=CHUNK_SIZE, **kwargs):
+    """
+    Yield (selector number, BeautifulSoup tag) for the listing elements at url
+    while downloading
+    Closing the generator stops the download and releases the connection
+    """
+    from lxml import etree
+
+    fallbacks = [[] for _ in selectors[1:]]
+    primary_found = False
+    with limited_stream(url, **kwargs) as response:
+        response.raise_for_status()
+        parser = etree.HTMLPullParser(events=('end',), encoding=_response_encoding(response))
+        chunks = response.iter_content(chunk_size)
+        while True:
+            chunk = next(chunks, None)
+            if chunk is None:
+                parser.close()
+            else:
+                parser.feed(chunk)
+            for _, element in parser.read_events():
+                number = _matching_selector(element, selectors)
+                if number is None:
+                    continue
+                if number == 0:
+                    primary_found = True
+                    yield 0, _to_tag(element)
+                    # Matched subtrees are done with, free them as we go
+                    element.clear(keep_tail=True)
+                elif not primary_found:
+                    fallbacks[number - 1].append(
+                        etree.tostring(element, encoding='unicode', method='html', with_tail=False)
+                    )
+            if chunk is None:
+                break
+
+    if primary_found:
+        return
+    for number, fragments in enumerate(fallbacks, 1):
+        if fragments:
+            for html in fragments:
+                yield number, BeautifulSoup(html, 'html.parser').find(True)
+            return
+
+
+def find_elements(html, selectors):
+    """Same selection as stream_elements on an already downloaded page"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for number, (tags, classes) in enumerate(selectors):
+        elements = soup.find_all(list(tags), class_=list(classes))
+        if elements:
+            return [(number, element) for element in elements]
+    return []
@@ -0,0 +1,96 @@
+"""
+On-disk cache of Wikipedia intro extracts
+Entries are keyed by page ID and remember the revision they were
+fetched at, so an extract is downloaded again only after the page changes
+The file is tagged with the API URL it was filled from; extracts of
+another URL (e.g. a stub upstream) are ignored like in FeedState
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'wikipedia_extracts.json'
+)
+
+
+class WikipediaExtractCache:
+    """JSON file with the API URL and {page_id: {title, extract, url, lastrevid, touched}}"""
+
+    def __init__(self, api_url, path=None):
+        self.api_url = api_url
+        self.path = path or os.environ.get('WIKIPEDIA_CACHE_PATH') or DEFAULT_CACHE_PATH
+        self._pages = None
+        self._mtime = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # Re-read when another process has replaced the file
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._pages is not None and (self._dirty or mtime == self._mtime):
+            return
+
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+            self._pages = data.get('pages', {}) if data.get('api_url') == self.api_url else {}
+        except FileNotFoundError:
+            self._pages = {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable Wikipedia cache {self.path}: {e}")
+            self._pages = {}
+
+    def get(self, page_id):
+        with self._lock:
+            self._load()
+            return self._pages.get(str(page_id))
+
+    def find_title(self, title):
+        """Look up an entry by page title, used when the revision check fails"""
+        with self._lock:
+            self._load()
+            for entry in self._pages.values():
+                if entry.get('title') == title:
+                    return entry
+        return None
+
+    def is_current(self, page_id, lastrevid, touched):
+        """True when the cached extract was fetched at this revision"""
+        entry = self.get(page_id)
+        return (
+            entry is not None
+            and entry.get('lastrevid') == lastrevid
+            and entry.get('touched') == touched
+        )
+
+    def put(self, page_id, entry):
+        with self._lock:
+            self._load()
+            self._pages[str(page_id)] = entry
+            self._dirty = True
+
+    def save(self):
+        """Write the cache atomically so readers never see a partial file"""
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.wikipedia-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                    json.dump({'api_url': self.api_url, 'pages': self._pages}, tmp_file, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._mtime = os.stat(self.path).st_mtime_ns
+                self._dirty = False
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
@@ -3,128 +3,208 @@ Wikipedia Estonian Culture Scraper
 Collects information about Estonian culture from Wikipedia
 """
 
-import requests
 from bs4 import BeautifulSoup
+from scrapers.ratelimit import limited_get
+from scrapers.items import CultureTopic, FallbackItems
+from scrapers.wikipedia_cache import WikipediaExtractCache
 
 class WikipediaScraper:
     """Scraper for Wikipedia articles about Estonian culture"""
     
-    def __init__(self):
-        self.base_url = "https://et.wikipedia.org"
-        self.api_url = "https://et.wikipedia.org/w/api.php"
+    def __init__(self, base_url=None, cache_path=None):
+        self.base_url = base_url or "https://et.wikipedia.org"
+        self.api_url = f"{self.base_url}/w/api.php"
+        self.cache = WikipediaExtractCache(self.api_url, cache_path)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
     
+    # List of Estonian culture-related Wikipedia pages
+    TOPICS = [
+        'Eesti_kultuur',
+        'Eesti_kirjandus',
+        'Eesti_muusika',
+        'Eesti_teater',
+        'Eesti_kunst',
+        'Laulupidu',
+        'Koidulauliku_vaim',
+        'Eesti_rahvatants',
+        'Eesti_rahvariided'
+    ]
+    
+    # TextExtracts returns at most 20 intro extracts per request
+    EXTRACTS_PER_REQUEST = 20
+    
     def get_culture_info(self):
         """
         Fetch information about Estonian culture from Wikipedia
         Returns a list of culture topics with title, summary, link
+        
+        One bulk prop=info request checks the current revision of every
+        topic; extracts are downloaded only for pages edited since they
+        were cached
         """
         culture_topics = []
         
-        # List of Estonian culture-related Wikipedia pages
-        topics = [
-            'Eesti_kultuur',
-            'Eesti_kirjandus',
-            'Eesti_muusika',
-            'Eesti_teater',
-            'Eesti_kunst',
-            'Laulupidu',
-            'Koidulauliku_vaim',
-            'Eesti_rahvatants',
-            'Eesti_rahvariided'
-        ]
+        try:
+            pages = self._get_page_info(self.TOPICS)
+        except Exception as e:
+            print(f"Error checking Wikipedia revisions: {e}")
+            pages = None
         
-        for topic in topics:
-            try:
-                # Use Wikipedia API to get page summary
-                params = {
-                    'action': 'query',
-                    'format': 'json',
-                    'prop': 'extracts|info',
-                    'exintro': True,
-                    'explaintext': True,
-                    'titles': topic.replace('_', ' '),
-                    'inprop': 'url'
-                }
-                
-                response = requests.get(self.api_url, params=params, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                pages = data.get('query', {}).get('pages', {})
-                
-                for page_id, page_data in pages.items():
-                    if page_id != '-1':  # Page exists
-                        title = page_data.get('title', topic.replace('_', ' '))
-                        extract = page_data.get('extract', '')
-                        url = page_data.get('fullurl', f"{self.base_url}/wiki/{topic}")
-                        
-                        # Limit extract length
-                        if len(extract) > 500:
-                            extract = extract[:500] + '...'
-                        
-                        culture_topics.append({
-                            'title': title,
-                            'content': extract,
-                            'link': url,
-                            'source': 'Wikipedia'
-                        })
-                        break
-                    
-            except Exception as e:
-                print(f"Error fetching Wikipedia topic {topic}: {e}")
-                # Add fallback data for this topic
+        if pages is not None:
+            changed = [
+                page for page in pages.values()
+                if page and not self.cache.is_current(page['pageid'], page.get('lastrevid'), page.get('touched'))
+            ]
+            if changed:
+                self._refresh_extracts(changed)
+        
+        missing = 0
+        for topic in self.TOPICS:
+            title = topic.replace('_', ' ')
+            if pages is None:
+                entry = self.cache.find_title(title)
+            elif pages.get(topic) is None:
+                continue  # Page does not exist
+            else:
+                entry = self.cache.get(pages[topic]['pageid'])
+            
+            if entry is None:
                 culture_topics.append(self._get_fallback_topic(topic))
+                missing += 1
+                continue
+            
+            extract = entry.get('extract', '')
+            # Limit extract length
+            if len(extract) > 500:
+                extract = extract[:500] + '...'
+            
+            culture_topics.append(CultureTopic(
+                title=entry.get('title', title),
+                content=extract,
+                link=entry.get('url', f"{self.base_url}/wiki/{topic}"),
+                source='Wikipedia'
+            ))
         
         # If nothing was fetched, return sample data
         if not culture_topics:
             culture_topics = self._get_sample_culture_info()
+        elif missing:
+            # Placeholder topics are replaced once Wikipedia answers again
+            culture_topics = FallbackItems(culture_topics)
         
         return culture_topics
     
+    def _get_page_info(self, topics):
+        """
+        Fetch page ID, lastrevid, touched and URL of all topics in one request
+        Returns {topic: page info or None when the page does not exist}
+        """
+        params = {
+            'action': 'query',
+            'format': 'json',
+            'prop': 'info',
+            'titles': '|'.join(topic.replace('_', ' ') for topic in topics),
+            'inprop': 'url'
+        }
+        response = limited_get(self.api_url, params=params, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        query = response.json().get('query', {})
+        
+        normalized = {item['from']: item['to'] for item in query.get('normalized', [])}
+        by_title = {
+            page.get('title'): page
+            for page_id, page in query.get('pages', {}).items()
+            if not page_id.startswith('-') and 'missing' not in page
+        }
+        
+        pages = {}
+        for topic in topics:
+            title = topic.replace('_', ' ')
+            pages[topic] = by_title.get(normalized.get(title, title))
+        return pages
+    
+    def _refresh_extracts(self, pages):
+        """Download intro extracts for the given pages and store them in the cache"""
+        for start in range(0, len(pages), self.EXTRACTS_PER_REQUEST):
+            chunk = pages[start:start + self.EXTRACTS_PER_REQUEST]
+            params = {
+                'action': 'query',
+                'format': 'json',
+                'prop': 'extracts',
+                'exintro': True,
+                'explaintext': True,
+                'exlimit': 'max',
+                'pageids': '|'.join(str(page['pageid']) for page in chunk)
+            }
+            try:
+                response = limited_get(self.api_url, params=params, headers=self.headers, timeout=10)
+                response.raise_for_status()
+                extracts = response.json().get('query', {}).get('pages', {})
+            except Exception as e:
+                # Previously cached extracts, if any, are still served
+                print(f"Error fetching Wikipedia extracts: {e}")
+                continue
+            
+            for page in chunk:
+                extract = extracts.get(str(page['pageid']), {}).get('extract')
+                if extract is None:
+                    continue
+                self.cache.put(page['pageid'], {
+                    'title': page.get('title'),
+                    'extract': extract,
+                    'url': page.get('fullurl'),
+                    'lastrevid': page.get('lastrevid'),
+                    'touched': page.get('touched')
+                })
+        
+        try:
+            self.cache.save()
+        except OSError as e:
+            print(f"Error saving Wikipedia cache: {e}")
+    
     def _get_fallback_topic(self, topic):
         """Get fallback information for a topic"""
         topic_name = topic.replace('_', ' ')
-        return {
-            'title': topic_name,
-            'content': f'Informatsioon teema "{topic_name}" kohta. Külastage Wikipediat täpsema info saamiseks.',
-            'link': f"{self.base_url}/wiki/{topic}",
-            'source': 'Wikipedia'
-        }
+        return CultureTopic(
+            title=topic_name,
+            content=f'Informatsioon teema "{topic_name}" kohta. Külastage Wikipediat täpsema info saamiseks.',
+            link=f"{self.base_url}/wiki/{topic}",
+            source='Wikipedia'
+        )
     
     def _get_sample_culture_info(self):
         """Return sample culture information when scraping fails"""
-        return [
-            {
-                'title': 'Eesti kultuur',
-                'content': 'Eesti kultuur on välja kujunenud põhiliselt eestlaste endi tegevuse tulemusena, kuid seda on mõjutanud ka teiste rahvaste, eelkõige saksakeelse kultuuri mõjud. Eesti kultuuriloo olulisimad perioodid on olnud rahvusliku ärkamisaja kultuur 19. sajandil ja Eesti iseseisvumisaegne kultuur 20. sajandil.',
-                'link': 'https://et.wikipedia.org/wiki/Eesti_kultuur',
-                'source': 'Wikipedia'
-            },
-            {
-                'title': 'Laulupidu',
-                'content': 'Laulupidu on Eestis regulaarselt toimuv üldlaulupidu, kus laulavad koorid kogu Eestist. Esimene üldlaulupidu toimus 1869. aastal Tartus. Laulupidu on Eesti kultuuri üks olulisemaid sümboleid ja UNESCO immateriaalse kultuuripärandi nimistus.',
-                'link': 'https://et.wikipedia.org/wiki/Laulupidu',
-                'source': 'Wikipedia'
-            },
-            {
-                'title': 'Eesti kirjandus',
-                'content': 'Eesti kirjandus on eestikeelne ilukirjandus. Eesti kirjanduse alguseks loetakse sageli 17. sajandi algust, kui ilmusid esimesed eestikeelsed trükised. Eesti rahvusliku kirjanduse rajajaks peetakse Fr. R. Kreutzwaldi, kes kogus ja avaldas "Kalevipoega".',
-                'link': 'https://et.wikipedia.org/wiki/Eesti_kirjandus',
-                'source': 'Wikipedia'
-            },
-            {
-                'title': 'Eesti muusika',
-                'content': 'Eesti muusikaelu on rikkalik ja mitmekesine. Eestis on tugev koorilaulutraditsioon, mis tipneb iga viie aasta tagant toimuva laulupeo ja tantsupiduga. Eestis on tuntud heliloojaid nagu Arvo Pärt, Veljo Tormis ja Erkki-Sven Tüür.',
-                'link': 'https://et.wikipedia.org/wiki/Eesti_muusika',
-                'source': 'Wikipedia'
-            },
-            {
-                'title': 'Eesti rahvatants',
-                'content': 'Eesti rahvatants on oluline osa Eesti kultuurist. Rahvatantsu harrastatakse kogu Eestis ja igal aastal toimub üldtantsupidu, kus osalevad tuhanded tantsijad. Rahvatantsu traditsioonid pärinevad sajandite tagustest aegadest.',
-                'link': 'https://et.wikipedia.org/wiki/Eesti_rahvatants',
-                'source': 'Wikipedia'
-            }
-        ]
+        return FallbackItems([
+            CultureTopic(
+                title='Eesti kultuur',
+                content='Eesti kultuur on välja kujunenud põhiliselt eestlaste endi tegevuse tulemusena, kuid seda on mõjutanud ka teiste rahvaste, eelkõige saksakeelse kultuuri mõjud. Eesti kultuuriloo olulisimad perioodid on olnud rahvusliku ärkamisaja kultuur 19. sajandil ja Eesti iseseisvumisaegne kultuur 20. sajandil.',
+                link='https://et.wikipedia.org/wiki/Eesti_kultuur',
+                source='Wikipedia'
+            ),
+            CultureTopic(
+                title='Laulupidu',
+                content='Laulupidu on Eestis regulaarselt toimuv üldlaulupidu, kus laulavad koorid kogu Eestist. Esimene üldlaulupidu toimus 1869. aastal Tartus. Laulupidu on Eesti kultuuri üks olulisemaid sümboleid ja UNESCO immateriaalse kultuuripärandi nimistus.',
+                link='https://et.wikipedia.org/wiki/Laulupidu',
+                source='Wikipedia'
+            ),
+            CultureTopic(
+                title='Eesti kirjandus',
+                content='Eesti kirjandus on eestikeelne ilukirjandus. Eesti kirjanduse alguseks loetakse sageli 17. sajandi algust, kui ilmusid esimesed eestikeelsed trükised. Eesti rahvusliku kirjanduse rajajaks peetakse Fr. R. Kreutzwaldi, kes kogus ja avaldas "Kalevipoega".',
+                link='https://et.wikipedia.org/wiki/Eesti_kirjandus',
+                source='Wikipedia'
+            ),
+            CultureTopic(
+                title='Eesti muusika',
+                content='Eesti muusikaelu on rikkalik ja mitmekesine. Eestis on tugev koorilaulutraditsioon, mis tipneb iga viie aasta tagant toimuva laulupeo ja tantsupiduga. Eestis on tuntud heliloojaid nagu Arvo Pärt, Veljo Tormis ja Erkki-Sven Tüür.',
+                link='https://et.wikipedia.org/wiki/Eesti_muusika',
+                source='Wikipedia'
+            ),
+            CultureTopic(
+                title='Eesti rahvatants',
+                content='Eesti rahvatants on oluline osa Eesti kultuurist. Rahvatantsu harrastatakse kogu Eestis ja igal aastal toimub üldtantsupidu, kus osalevad tuhanded tantsijad. Rahvatantsu traditsioonid pärinevad sajandite tagustest aegadest.',
+                link='https://et.wikipedia.org/wiki/Eesti_rahvatants',
+                source='Wikipedia'
+            )
+        ])
@@ -0,0 +1,282 @@
+"""
+On-disk search index read through mmap
+One file holds a sorted term dictionary, posting lists of document ids and
+a document store of ready-to-serve search results. Every worker process
+maps the same file, so the operating system keeps a single page-cached copy
+and opening it costs almost nothing. The indexer writes a new file next to
+the old one and renames it into place, readers pick it up on their next query
+
+File layout (little-endian, sections 4-byte aligned):
+    magic b'KLSI', u32 header length, JSON header with counts and offsets
+    term offsets     u32 * (terms + 1)   into the term blob
+    term blob        utf-8 terms, sorted
+    posting offsets  u32 * (terms + 1)   into the postings array
+    postings         u32 document ids, ascending per term
+    categories       u8 per document, index into header['categories']
+    doc offsets      u32 * (docs + 1)    into the document blob
+    doc blob         compact JSON per document
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
+from suggest import normalize
+
+MAGIC = b'KLSI'
+VERSION = 1
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'cache', 'search-index.bin'
+)
+
+# One-letter prefixes can expand to many terms, later ones are ignored
+MAX_PREFIX_TERMS = 2000
+# An index older than this many seconds is not served, searches fall back to live data
+DEFAULT_MAX_AGE = 3600
+
+_WORD = re.compile(r'\w+')
+_U32 = struct.Struct('<I')
+_U32_PAIR = struct.Struct('<II')
+
+
+def tokenize(text):
+    return _WORD.findall(normalize(text))
+
+
+def _u32_array(values):
+    data = array('I', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % 4)
+
+
+def build_index(hits, path=None):
+    """
+    Write the index for `hits` (SearchHit objects, in result order) to path
+    The file is replaced atomically. Returns the number of documents
+    """
+    path = path or os.environ.get('SEARCH_INDEX_PATH') or DEFAULT_INDEX_PATH
+    postings = {}
+    categories = []
+    category_ids = []
+    documents = []
+
+    for doc_id, hit in enumerate(hits):
+        item = hit.item
+        text = ' '.join(
+            str(item.get(field) or '') for field in ('title', 'description', 'content')
+        )
+        for term in set(tokenize(text)):
+            postings.setdefault(term, []).append(doc_id)
+        if hit.category not in categories:
+            categories.append(hit.category)
+        category_ids.append(categories.index(hit.category))
+        documents.append(json.dumps(hit.to_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    terms = sorted(postings)
+    encoded_terms = [term.encode('utf-8') for term in terms]
+    term_offsets = [0]
+    for term in encoded_terms:
+        term_offsets.append(term_offsets[-1] + len(term))
+    posting_offsets = [0]
+    for term in terms:
+        posting_offsets.append(posting_offsets[-1] + len(postings[term]))
+    doc_offsets = [0]
+    for document in documents:
+        doc_offsets.append(doc_offsets[-1] + len(document))
+
+    sections = [
+        ('term_offsets', _u32_array(term_offsets)),
+        ('terms', _pad(b''.join(encoded_terms))),
+        ('posting_offsets', _u32_array(posting_offsets)),
+        ('postings', _u32_array(doc_id for term in terms for doc_id in postings[term])),
+        ('categories', _pad(bytes(category_ids))),
+        ('doc_offsets', _u32_array(doc_offsets)),
+        ('docs', b''.join(documents)),
+    ]
+
+    # Offsets depend on the header length, which depends on the offsets
+    header = {'version': VERSION, 'docs': len(documents), 'terms': len(terms),
+              'categories': categories, 'built_at': time.time(), 'sections': {}}
+    header_size = 0
+    while True:
+        offset = 8 + header_size
+        offset += -offset % 4
+        for name, data in sections:
+            header['sections'][name] = offset
+            offset += len(data)
+        encoded_header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(encoded_header) == header_size:
+            break
+        header_size = len(encoded_header)
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.search-index-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as index_file:
+            index_file.write(MAGIC + _U32.pack(header_size) + encoded_header)
+            index_file.write(b'\0' * (-index_file.tell() % 4))
+            for _, data in sections:
+                index_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(documents)
+
+
+class _MappedIndex:
+    """One mapped index file, immutable once opened"""
+
+    def __init__(self, index_file):
+        self.map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:4] != MAGIC:
+            raise ValueError('not a search index file')
+        header_size, = _U32.unpack_from(self.map, 4)
+        header = json.loads(self.map[8:8 + header_size].decode('utf-8'))
+        if header['version'] != VERSION:
+            raise ValueError(f"unsupported search index version {header['version']}")
+        self.docs = header['docs']
+        self.terms = header['terms']
+        self.categories = header['categories']
+        self.built_at = header['built_at']
+        self.sections = header['sections']
+
+    def _term(self, number):
+        start, end = _U32_PAIR.unpack_from(self.map, self.sections['term_offsets'] + 4 * number)
+        base = self.sections['terms']
+        return self.map[base + start:base + end].decode('utf-8')
+
+    def _lower_bound(self, prefix):
+        low, high = 0, self.terms
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _postings(self, number):
+        start, end = _U32_PAIR.unpack_from(self.map, self.sections['posting_offsets'] + 4 * number)
+        base = self.sections['postings']
+        doc_ids = array('I')
+        doc_ids.frombytes(self.map[base + 4 * start:base + 4 * end])
+        if sys.byteorder == 'big':
+            doc_ids.byteswap()
+        return doc_ids
+
+    def prefix_docs(self, prefix):
+        """Ids of documents containing a term that starts with prefix"""
+        doc_ids = set()
+        number = self._lower_bound(prefix)
+        for number in range(number, min(number + MAX_PREFIX_TERMS, self.terms)):
+            if not self._term(number).startswith(prefix):
+                break
+            doc_ids.update(self._postings(number))
+        return doc_ids
+
+    def category(self, doc_id):
+        return self.categories[self.map[self.sections['categories'] + doc_id]]
+
+    def document(self, doc_id):
+        start, end = _U32_PAIR.unpack_from(self.map, self.sections['doc_offsets'] + 4 * doc_id)
+        base = self.sections['docs']
+        return json.loads(self.map[base + start:base + end].decode('utf-8'))
+
+
+class SearchIndexReader:
+    """
+    Shared reader of the index file at path
+    The file is re-checked at most every check_interval seconds and
+    remapped when the indexer has replaced it. An index built more than
+    max_age seconds ago counts as unavailable (None or 0 = no limit)
+    """
+
+    def __init__(self, path=None, check_interval=1.0, max_age=DEFAULT_MAX_AGE):
+        self.path = path or os.environ.get('SEARCH_INDEX_PATH') or DEFAULT_INDEX_PATH
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._stale_reported = None
+        self._index = None
+        self._identity = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                self._index, self._identity = None, None
+                return None
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if identity != self._identity:
+                try:
+                    with open(self.path, 'rb') as index_file:
+                        # Readers still holding the old map keep it alive until they finish
+                        self._index = _MappedIndex(index_file)
+                except (OSError, ValueError) as e:
+                    print(f"Error opening search index {self.path}: {e}")
+                    self._index = None
+                self._identity = identity
+            return self._index
+
+    def _fresh(self):
+        """The current index unless it is older than max_age"""
+        index = self._current()
+        if index is None or not self.max_age or time.time() - index.built_at <= self.max_age:
+            return index
+        if self._stale_reported is not index:
+            print(f"Search index {self.path} is older than {self.max_age} s, searching live data")
+            self._stale_reported = index
+        return None
+
+    def available(self):
+        return self._fresh() is not None
+
+    def search(self, query, categories=None, limit=20):
+        """
+        Result dicts for documents matching every word of query as a prefix,
+        in index order. An empty query matches all documents
+        Returns None when no index file is available or it is too old
+        """
+        index = self._fresh()
+        if index is None:
+            return None
+
+        doc_ids = None
+        for word in sorted(set(tokenize(query)), key=len, reverse=True):
+            matches = index.prefix_docs(word)
+            doc_ids = matches if doc_ids is None else doc_ids & matches
+            if not doc_ids:
+                return []
+        candidates = sorted(doc_ids) if doc_ids is not None else range(index.docs)
+
+        results = []
+        for doc_id in candidates:
+            if categories is not None and index.category(doc_id) not in categories:
+                continue
+            results.append(index.document(doc_id))
+            if len(results) >= limit:
+                break
+        return results
@@ -1,6 +1,90 @@
 // Koidulauliku E-laulik - Main JavaScript
 
 // Search functionality
+const SUGGEST_DEBOUNCE_MS = 80;
+// Responses kept for repeated queries, least recently used ones are dropped
+const RESPONSE_CACHE_SIZE = 100;
+const responseCache = new Map();
+const inFlight = {};
+
+function cacheGet(url) {
+    if (!responseCache.has(url)) {
+        return undefined;
+    }
+    // Map keeps insertion order, re-inserting marks the entry as recently used
+    const data = responseCache.get(url);
+    responseCache.delete(url);
+    responseCache.set(url, data);
+    return data;
+}
+
+function cachePut(url, data) {
+    responseCache.delete(url);
+    responseCache.set(url, data);
+    while (responseCache.size > RESPONSE_CACHE_SIZE) {
+        responseCache.delete(responseCache.keys().next().value);
+    }
+}
+
+// Abort the pending request of a kind, its late response must not be shown
+function cancelRequest(kind) {
+    if (inFlight[kind]) {
+        inFlight[kind].abort();
+        inFlight[kind] = null;
+    }
+}
+
+// Fetch JSON once per URL, aborting the previous request of the same kind
+function fetchCached(kind, url) {
+    const cached = cacheGet(url);
+    if (cached !== undefined) {
+        return Promise.resolve(cached);
+    }
+    cancelRequest(kind);
+    const controller = new AbortController();
+    inFlight[kind] = controller;
+
+    return fetch(url, { signal: controller.signal })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            cachePut(url, data);
+            if (inFlight[kind] === controller) {
+                inFlight[kind] = null;
+            }
+            return data;
+        });
+}
+
+// Static exports (flask freeze) have no API, search the prebuilt index instead
+let staticIndex = null;
+
+function staticSearch(query) {
+    if (!staticIndex) {
+        staticIndex = fetch('/search-index.json').then(response => {
+            if (!response.ok) {
+                staticIndex = null;
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        });
+    }
+    const needle = query.toLowerCase();
+    return staticIndex.then(items => items.filter(item =>
+        [item.title, item.description, item.content].some(text => (text || '').toLowerCase().includes(needle))
+    ).slice(0, 20));
+}
+
+function showSearchError() {
+    const searchResults = document.getElementById('search-results');
+    searchResults.innerHTML = '<div style="padding: 1rem; text-align: center; color: #dc3545;">Otsingu viga</div>';
+    searchResults.classList.add('show');
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     const searchInput = document.getElementById('search-input');
     const searchResults = document.getElementById('search-results');
@@ -15,15 +99,33 @@ document.addEventListener('DOMContentLoaded', function() {
             clearTimeout(searchTimeout);
             
             if (query.length < 2) {
+                cancelRequest('suggest');
                 searchResults.classList.remove('show');
                 searchResults.innerHTML = '';
                 return;
             }
             
-            // Debounce search
+            // Debounce suggestions, cached prefixes are shown immediately
+            const cached = cacheGet(`/api/suggest?q=${encodeURIComponent(query)}`);
+            if (cached !== undefined) {
+                cancelRequest('suggest');
+                displaySuggestions(cached);
+                return;
+            }
             searchTimeout = setTimeout(() => {
-                performSearch(query);
-            }, 500);
+                performSuggest(query);
+            }, SUGGEST_DEBOUNCE_MS);
+        });
+
+        // Enter runs the full search
+        searchInput.addEventListener('keydown', function(e) {
+            if (e.key === 'Enter') {
+                clearTimeout(searchTimeout);
+                const query = this.value.trim();
+                if (query.length >= 2) {
+                    performSearch(query);
+                }
+            }
         });
         
         // Close search results when clicking outside
@@ -35,27 +137,88 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+function performSuggest(query) {
+    fetchCached('suggest', `/api/suggest?q=${encodeURIComponent(query)}`)
+        .then(data => {
+            displaySuggestions(data);
+        })
+        .catch(error => {
+            if (error.name === 'AbortError') {
+                return;
+            }
+            console.error('Suggest error:', error);
+            staticSearch(query)
+                .then(displaySearchResults)
+                .catch(showSearchError);
+        });
+}
+
+function displaySuggestions(suggestions) {
+    const searchResults = document.getElementById('search-results');
+    const searchInput = document.getElementById('search-input');
+
+    if (suggestions.length === 0) {
+        searchResults.innerHTML = '<div style="padding: 1rem; text-align: center;">Tulemusi ei leitud</div>';
+        searchResults.classList.add('show');
+        return;
+    }
+
+    searchResults.innerHTML = '';
+    suggestions.forEach(suggestion => {
+        const row = document.createElement('div');
+        row.className = 'search-result-item';
+
+        const category = document.createElement('div');
+        category.style.cssText = 'font-size: 0.85rem; color: #00A3E0; font-weight: 600; margin-bottom: 0.25rem;';
+        category.textContent = suggestion.category || 'Info';
+
+        const text = document.createElement('div');
+        text.style.fontWeight = '500';
+        text.textContent = suggestion.text;
+
+        row.appendChild(category);
+        row.appendChild(text);
+        row.addEventListener('click', () => {
+            if (suggestion.link) {
+                window.open(suggestion.link, '_blank');
+            } else {
+                searchInput.value = suggestion.text;
+                performSearch(suggestion.text);
+            }
+        });
+        searchResults.appendChild(row);
+    });
+    searchResults.classList.add('show');
+}
+
 function performSearch(query) {
     const searchResults = document.getElementById('search-results');
+    // A pending suggestion list would replace the results when it arrives
+    cancelRequest('suggest');
     
     // Show loading
     searchResults.innerHTML = '<div style="padding: 1rem; text-align: center;">Otsin...</div>';
     searchResults.classList.add('show');
     
     // Make API call
-    fetch(`/api/search?q=${encodeURIComponent(query)}`)
-        .then(response => response.json())
+    fetchCached('search', `/api/search?q=${encodeURIComponent(query)}`)
         .then(data => {
             displaySearchResults(data);
         })
         .catch(error => {
+            if (error.name === 'AbortError') {
+                return;
+            }
             console.error('Search error:', error);
-            searchResults.innerHTML = '<div style="padding: 1rem; text-align: center; color: #dc3545;">Otsingu viga</div>';
+            staticSearch(query)
+                .then(displaySearchResults)
+                .catch(showSearchError);
         });
 }
 
 function displaySearchResults(results) {
     const searchResults = document.getElementById('search-results');
+    searchResults.classList.add('show');
     
     if (results.length === 0) {
         searchResults.innerHTML = '<div style="padding: 1rem; text-align: center;">Tulemusi ei leitud</div>';
@@ -85,6 +248,174 @@ function displaySearchResults(results) {
     searchResults.innerHTML = html;
 }
 
+// Live updates: /api/stream pushes new and changed items of the open page
+function element(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) {
+        node.className = className;
+    }
+    if (text) {
+        node.textContent = text;
+    }
+    return node;
+}
+
+function safeUrl(url) {
+    return /^https?:\/\//i.test(url || '') ? url : '#';
+}
+
+function externalLink(item, className, text) {
+    const link = element('a', className, text);
+    link.href = safeUrl(item.link);
+    link.target = '_blank';
+    link.rel = 'noopener noreferrer';
+    return link;
+}
+
+function imageBlock(item, className) {
+    const block = element('div', className);
+    const img = document.createElement('img');
+    img.src = safeUrl(item.image);
+    img.alt = item.title || '';
+    img.addEventListener('error', () => { img.style.display = 'none'; });
+    block.appendChild(img);
+    return block;
+}
+
+// Same markup as templates/uudised.html
+function renderNewsItem(item) {
+    const card = element('article', 'news-item');
+    if (item.image) {
+        card.appendChild(imageBlock(item, 'news-image'));
+    }
+    const content = element('div', 'news-content');
+    const meta = element('div', 'news-meta');
+    meta.appendChild(element('span', 'news-source', item.source));
+    meta.appendChild(element('span', 'news-date', item.date));
+    const title = element('h2', 'news-title');
+    title.appendChild(externalLink(item, '', item.title));
+    content.appendChild(meta);
+    content.appendChild(title);
+    if (item.description) {
+        content.appendChild(element('p', 'news-description', item.description));
+    }
+    content.appendChild(externalLink(item, 'read-more', 'Loe edasi →'));
+    card.appendChild(content);
+    return card;
+}
+
+// Same markup as templates/syndmused.html
+function renderEventCard(item) {
+    const card = element('article', 'event-card');
+    if (item.image) {
+        card.appendChild(imageBlock(item, 'event-image'));
+    }
+    const content = element('div', 'event-content');
+    const title = element('h2', 'event-title');
+    title.appendChild(externalLink(item, '', item.title));
+    const meta = element('div', 'event-meta');
+    meta.appendChild(element('div', 'event-date', `📅 ${item.date || ''}`));
+    meta.appendChild(element('div', 'event-location', `📍 ${item.location || ''}`));
+    if (item.source) {
+        meta.appendChild(element('div', 'event-source', `🔖 ${item.source}`));
+    }
+    content.appendChild(title);
+    content.appendChild(meta);
+    if (item.description) {
+        content.appendChild(element('p', 'event-description', item.description));
+    }
+    content.appendChild(externalLink(item, 'event-link', 'Vaata lähemalt →'));
+    card.appendChild(content);
+    return card;
+}
+
+const STREAM_SECTIONS = {
+    uudised: { api: '/api/news', render: renderNewsItem },
+    syndmused: { api: '/api/events', render: renderEventCard },
+};
+
+// Replace the card of an already shown item, or put a new one first
+function mergeItem(container, section, item) {
+    if (!item.link) {
+        return;
+    }
+    const card = section.render(item);
+    card.dataset.link = item.link;
+    const existing = Array.from(container.querySelectorAll('[data-link]'))
+        .find(node => node.dataset.link === item.link);
+    if (existing) {
+        // Related items are not part of the stream, keep the rendered ones
+        const related = existing.querySelector('.related-items');
+        if (related) {
+            card.lastElementChild.appendChild(related);
+        }
+        existing.replaceWith(card);
+        return;
+    }
+    const empty = container.querySelector('.no-content');
+    if (empty) {
+        empty.remove();
+    }
+    card.classList.add('stream-new');
+    container.prepend(card);
+}
+
+function removeItem(container, link) {
+    Array.from(container.querySelectorAll('[data-link]'))
+        .filter(node => node.dataset.link === link)
+        .forEach(node => node.remove());
+}
+
+function resyncSection(container, section) {
+    fetch(section.api)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(items => {
+            // The section is reloaded in full, cards missing from it are gone
+            const links = new Set(items.map(item => item.link));
+            Array.from(container.querySelectorAll('[data-link]'))
+                .filter(node => !links.has(node.dataset.link))
+                .forEach(node => node.remove());
+            items.slice().reverse().forEach(item => mergeItem(container, section, item));
+        })
+        .catch(error => console.error('Stream resync error:', error));
+}
+
+function connectStream(container) {
+    const name = container.dataset.stream;
+    const section = STREAM_SECTIONS[name];
+    if (!section || !window.EventSource) {
+        return;
+    }
+    // Start after the changes already rendered into the page, the browser
+    // sends Last-Event-ID itself when it reconnects
+    let url = '/api/stream';
+    if (container.dataset.streamId) {
+        url += `?lastEventId=${encodeURIComponent(container.dataset.streamId)}`;
+    }
+    const source = new EventSource(url);
+    source.addEventListener('item', event => {
+        const change = JSON.parse(event.data);
+        if (change.section !== name) {
+            return;
+        }
+        if (change.change === 'removed') {
+            removeItem(container, change.item.link);
+        } else {
+            mergeItem(container, section, change.item);
+        }
+    });
+    source.addEventListener('resync', () => resyncSection(container, section));
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-stream]').forEach(connectStream);
+});
+
 // Smooth scroll for anchor links
 document.querySelectorAll('a[href^="#"]').forEach(anchor => {
     anchor.addEventListener('click', function (e) {
@@ -0,0 +1,116 @@
+"""
+Typeahead suggestions for the search box
+Sorted-array prefix index over normalized titles, venues and topic names
+"""
+
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+# Placeholder venue used by the event scrapers, not worth suggesting
+_IGNORED_VENUES = {'asukoht täpsustamisel'}
+
+# Upper bound for a prefix range, keeps one-letter prefixes cheap
+_MAX_SCAN = 5000
+
+
+def normalize(text):
+    """Lowercase text and strip diacritics so 'näi' also matches 'nai'"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text).casefold())
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.split())
+
+
+class SuggestIndex:
+    """Immutable prefix index built from scraped items"""
+
+    def __init__(self, keys, refs, suggestions):
+        self._keys = keys
+        self._refs = refs
+        self._suggestions = suggestions
+
+    def __len__(self):
+        return len(self._suggestions)
+
+    @classmethod
+    def build(cls, news=(), events=(), culture=()):
+        """
+        Build an index from news, event and culture items
+        Every word start of a suggestion is indexed, so 'teater' finds
+        'Vanemuise teater: Romeo ja Julia'
+        """
+        suggestions = []
+        by_text = {}
+
+        def add(text, kind, category, link=None):
+            text = ' '.join(str(text or '').split())
+            key = normalize(text)
+            if len(key) < 2:
+                return
+            existing = by_text.get((key, kind))
+            if existing is not None:
+                existing['popularity'] += 1
+                return
+            suggestion = {
+                'text': text,
+                'type': kind,
+                'category': category,
+                'link': link,
+                'popularity': 1
+            }
+            by_text[(key, kind)] = suggestion
+            suggestions.append(suggestion)
+
+        for item in news:
+            add(item.get('title'), 'pealkiri', 'Uudised', item.get('link'))
+        for item in events:
+            add(item.get('title'), 'pealkiri', 'Sündmused', item.get('link'))
+            venue = item.get('location')
+            if venue and normalize(venue) not in _IGNORED_VENUES:
+                add(venue, 'toimumiskoht', 'Sündmused')
+        for item in culture:
+            add(item.get('title'), 'teema', 'Kultuur', item.get('link'))
+
+        entries = []
+        for ref, suggestion in enumerate(suggestions):
+            words = normalize(suggestion['text']).split(' ')
+            for position in range(len(words)):
+                entries.append((' '.join(words[position:]), position, ref))
+        entries.sort()
+
+        keys = [entry[0] for entry in entries]
+        refs = [(entry[1], entry[2]) for entry in entries]
+        return cls(keys, refs, suggestions)
+
+    def suggest(self, prefix, limit=8):
+        """Return up to `limit` completions for `prefix`, most popular first"""
+        key = normalize(prefix)
+        if not key or limit <= 0:
+            return []
+
+        start = bisect_left(self._keys, key)
+        end = bisect_left(self._keys, key + '\uffff', start)
+        end = min(end, start + _MAX_SCAN)
+
+        # Keep the best word position per suggestion, title starts win
+        best = {}
+        for position, ref in self._refs[start:end]:
+            if ref not in best or position < best[ref]:
+                best[ref] = position
+
+        def rank(ref):
+            suggestion = self._suggestions[ref]
+            return (suggestion['popularity'], best[ref] == 0, -len(suggestion['text']))
+
+        top = heapq.nlargest(limit, best, key=rank)
+        return [
+            {
+                'text': self._suggestions[ref]['text'],
+                'type': self._suggestions[ref]['type'],
+                'category': self._suggestions[ref]['category'],
+                'link': self._suggestions[ref]['link']
+            }
+            for ref in top
+        ]
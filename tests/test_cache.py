@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from scrapers.cache import FALLBACK_TTL, SharedCache, SQLiteCache, decode, encode
+from scrapers.items import FallbackItems, NewsItem, is_fallback
+
+
+def _news(title, source='ERR'):
+    return NewsItem(title=title, link=f'https://example.org/{title}', source=source)
+
+
+def _cache(tmp_path, **kwargs):
+    return SharedCache(SQLiteCache(str(tmp_path / 'cache.sqlite3')), **kwargs)
+
+
+def test_fallback_mark_survives_encoding():
+    assert is_fallback(decode(encode(FallbackItems([_news('sample')]))))
+    assert not is_fallback(decode(encode([_news('live')])))
+
+
+def test_fallback_does_not_replace_stale_result(tmp_path):
+    cache = _cache(tmp_path, ttl=0)
+    key = cache.key('err', 'get_news')
+    assert cache.get_or_load(key, lambda: [_news('live')])[0].title == 'live'
+
+    # Entry is stale (ttl 0), the source fails and the scraper returns sample data
+    value = cache.get_or_load(key, lambda: FallbackItems([_news('sample', 'ERR Kultuur')]))
+    assert value[0].title == 'live'
+    assert not is_fallback(value)
+
+
+def test_fallback_is_cached_briefly(tmp_path):
+    cache = _cache(tmp_path, ttl=300, stale_ttl=3600)
+    key = cache.key('err', 'get_news')
+    cache.get_or_load(key, lambda: FallbackItems([_news('sample', 'ERR Kultuur')]))
+    fresh_until, value = cache._read(key)
+    assert is_fallback(value)
+    assert fresh_until <= time.time() + FALLBACK_TTL
+
+    # Once it is no longer fresh, the recovered source replaces the sample data
+    with sqlite3.connect(cache.backend.path) as connection:
+        connection.execute('UPDATE cache SET value = ? WHERE key = ?',
+                           ((0).to_bytes(8, 'big') + encode(value), key))
+    assert cache.get_or_load(key, lambda: [_news('live')])[0].title == 'live'
+
+
+def test_sqlite_purges_expired_rows(tmp_path):
+    backend = SQLiteCache(str(tmp_path / 'cache.sqlite3'), purge_interval=0)
+    backend.set('old', b'1', -1)
+    backend.set('new', b'2', 60)
+    with sqlite3.connect(backend.path) as connection:
+        keys = [row[0] for row in connection.execute('SELECT key FROM cache')]
+    assert keys == ['new']
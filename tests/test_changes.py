@@ -0,0 +1,34 @@
+from changes import ChangeFeed
+from scrapers.items import NewsItem
+
+
+def _news(*titles, source='ERR'):
+    return [NewsItem(title=title, link=f'https://example.org/{title}', source=source) for title in titles]
+
+
+def _changes(feed, position=0):
+    return [(change['change'], change['item']['link']) for _, change in feed.wait(position, timeout=0)]
+
+
+def test_removed_items_are_published():
+    feed = ChangeFeed()
+    feed.publish('uudised', _news('a', 'b'))
+    assert feed.publish('uudised', _news('b', 'c')) == 2
+    assert sorted(_changes(feed)) == [('new', 'https://example.org/c'), ('removed', 'https://example.org/a')]
+
+
+def test_fallback_load_is_not_published():
+    feed = ChangeFeed()
+    feed.publish('uudised', _news('a'))
+    assert feed.publish('uudised', _news('sample', source='ERR Kultuur'), fallback=True) == 0
+    # The live baseline is kept, the recovered source changes nothing
+    assert feed.publish('uudised', _news('a')) == 0
+    assert feed.last == 0
+
+
+def test_sample_cards_are_replaced_after_recovery():
+    feed = ChangeFeed()
+    # The page was first rendered from sample data
+    feed.publish('uudised', _news('sample', source='ERR Kultuur'), fallback=True)
+    feed.publish('uudised', _news('a'))
+    assert sorted(_changes(feed)) == [('new', 'https://example.org/a'), ('removed', 'https://example.org/sample')]
@@ -0,0 +1,33 @@
+import pytest
+
+from app import create_app
+from scrapers.items import CultureTopic, NewsItem
+
+
+class FakeScraper:
+    def get_news(self, limit=10):
+        return [NewsItem(title='Uudis', link='https://example.org/uudis', source='ERR', content='Täistekst')][:limit]
+
+    def get_culture_info(self):
+        return [CultureTopic(title='Laulupidu', content='Laulupidu on...', link='https://example.org/lp', source='Wikipedia')]
+
+
+@pytest.fixture
+def client():
+    app = create_app({'SCRAPER_CACHE_URL': 'none', 'ENRICH_DETAILS': False})
+    scrapers = app.extensions['scrapers']
+    scrapers._instances['err'] = scrapers._instances['wiki'] = FakeScraper()
+    return app.test_client()
+
+
+def test_culture_includes_content_by_default(client):
+    topic = client.get('/api/culture').get_json()[0]
+    assert topic['content'] == 'Laulupidu on...'
+
+
+def test_news_content_only_when_asked_for(client):
+    assert 'content' not in client.get('/api/news').get_json()[0]
+    assert client.get('/api/news?fields=title,content').get_json()[0]['content'] == 'Täistekst'
+    bundle = client.get('/api/bundle?sections=news,culture').get_json()
+    assert 'content' not in bundle['news'][0]
+    assert bundle['culture'][0]['content'] == 'Laulupidu on...'
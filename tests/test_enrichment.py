@@ -0,0 +1,71 @@
+import requests
+
+from scrapers import enrichment
+from scrapers.enrichment import DetailEnricher
+from scrapers.items import FallbackItems, NewsItem
+from scrapers.ratelimit import RateLimitExceeded
+
+PAGE = '<html><body><article><p>Laulupeo täistekst, mis on piisavalt pikk, et see arvesse läheks.</p></article></body></html>'
+
+
+class Response:
+    def __init__(self, status_code, text=PAGE, url=None):
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error', response=self)
+
+
+def _news(path):
+    return NewsItem(title=path, link=f'https://example.org/{path}', content='')
+
+
+def _enricher(tmp_path, monkeypatch, responses):
+    fetched = []
+
+    def fake_get(url, **kwargs):
+        fetched.append(url)
+        response = responses[url.rsplit('/', 1)[-1]]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(enrichment, 'limited_get', fake_get)
+    return DetailEnricher(cache_path=str(tmp_path / 'details.sqlite3'), max_workers=1), fetched
+
+
+def test_sample_data_is_not_fetched(tmp_path, monkeypatch):
+    enricher, fetched = _enricher(tmp_path, monkeypatch, {'sample': Response(200)})
+    items = FallbackItems([_news('sample')])
+    assert enricher.enrich(items, block=True) is items
+    assert fetched == []
+    assert enricher.cache.get_many(['https://example.org/sample']) == {}
+
+
+def test_only_definitive_failures_are_cached(tmp_path, monkeypatch):
+    responses = {
+        'ok': Response(200),
+        'gone': Response(404),
+        'busy': Response(429),
+        'down': Response(503),
+        'slow': requests.Timeout('timed out'),
+        'limited': RateLimitExceeded('wait too long'),
+    }
+    enricher, fetched = _enricher(tmp_path, monkeypatch, responses)
+    items = [_news(path) for path in responses]
+    enricher.enrich(items, block=True)
+    assert items[0]['content'].startswith('Laulupeo')
+
+    cached = enricher.cache.get_many(item['link'] for item in items)
+    assert {url.rsplit('/', 1)[-1]: entry[1] for url, entry in cached.items()} == {'ok': True, 'gone': False}
+
+    # Transient failures back off briefly instead of for a day
+    fetched.clear()
+    enricher.enrich(items, block=True)
+    assert fetched == []
+    enricher.retry_transient_after = -1
+    enricher.enrich(items, block=True)
+    assert sorted(url.rsplit('/', 1)[-1] for url in fetched) == ['busy', 'down', 'limited', 'slow']
@@ -0,0 +1,112 @@
+import pytest
+
+from benchmarks.loadtest import STUB_RATE_LIMITS
+from benchmarks.stub_upstream import StubConfig, StubUpstream
+from scrapers import feeds
+from scrapers.err_scraper import ERRNewsScraper
+from scrapers.feeds import FeedState, read_feed
+from scrapers.items import is_fallback
+from scrapers.ratelimit import HostRateLimiter, get_limiter, set_limiter
+
+
+@pytest.fixture
+def stub(tmp_path):
+    previous = get_limiter()
+    set_limiter(HostRateLimiter(
+        state_dir=str(tmp_path / 'ratelimit'), host_limits={}, default_limits=STUB_RATE_LIMITS['*']
+    ))
+    with StubUpstream(StubConfig(latency_ms=0, jitter_ms=0, items=3)) as upstream:
+        yield upstream
+    set_limiter(previous)
+
+
+def _scraper(stub, tmp_path, feed='rss', **kwargs):
+    return ERRNewsScraper(
+        base_url=f'{stub.url}/err', feed_url=f'{stub.url}/err/{feed}',
+        feed_state_path=str(tmp_path / f'{feed}-state.json'), **kwargs
+    )
+
+
+def test_rss_and_atom_give_the_same_items(stub, tmp_path):
+    rss = _scraper(stub, tmp_path, 'rss').get_news(limit=10)
+    atom = _scraper(stub, tmp_path, 'atom').get_news(limit=10)
+    assert [item.to_dict() for item in rss] == [item.to_dict() for item in atom]
+    assert [item['link'] for item in rss] == [f'{stub.url}/err/{1609000000 + number}/uudis-{number}' for number in (2, 1, 0)]
+    assert rss[0]['date_iso'] == '2026-10-01T10:00:00+00:00'
+    assert rss[0]['image'] == f'{stub.url}/images/2.jpg'
+    assert '<' not in rss[0]['description']
+
+
+def test_reading_stops_at_the_first_known_guid(stub, monkeypatch):
+    url = f'{stub.url}/err/rss'
+    guids = [entry['guid'] for entry in read_feed(url)['entries']]
+    assert len(guids) == 3
+
+    stub.server.config.items = 5
+    parsed = []
+
+    def counting_parse(element):
+        parsed.append(element.tag)
+        return parse_entry(element)
+
+    parse_entry = feeds.parse_entry
+    monkeypatch.setattr(feeds, 'parse_entry', counting_parse)
+    result = read_feed(url, known=guids)
+    assert [entry['link'].rsplit('-', 1)[-1] for entry in result['entries']] == ['4', '3']
+    # The two new entries and the first known one, the rest is never parsed
+    assert len(parsed) == 3
+
+
+def test_unchanged_feed_answers_304(stub):
+    url = f'{stub.url}/err/atom'
+    first = read_feed(url)
+    assert first['changed'] and first['etag']
+
+    second = read_feed(url, known=[entry['guid'] for entry in first['entries']], etag=first['etag'])
+    assert second == {'changed': False, 'entries': [], 'etag': first['etag'], 'modified': None}
+
+
+def test_scraper_keeps_entries_across_304(stub, tmp_path):
+    scraper = _scraper(stub, tmp_path)
+    first = scraper.get_news(limit=10)
+    etag = scraper.feed_state.etag
+    assert etag
+
+    # A second worker process starts from the saved state and gets a 304
+    again = _scraper(stub, tmp_path).get_news(limit=10)
+    assert [item['link'] for item in again] == [item['link'] for item in first]
+
+
+def test_only_new_entries_are_added(stub, tmp_path):
+    scraper = _scraper(stub, tmp_path)
+    scraper.get_news(limit=10)
+    stub.server.config.items = 5
+
+    updated = scraper.get_news(limit=10)
+    assert [item['link'].rsplit('-', 1)[-1] for item in updated] == ['4', '3', '2', '1', '0']
+    assert scraper.feed_state.etag == '"feed-1-5"'
+
+
+def test_feed_state_of_another_url_is_ignored(stub, tmp_path):
+    path = str(tmp_path / 'state.json')
+    ERRNewsScraper(
+        base_url=f'{stub.url}/err', feed_url=f'{stub.url}/err/rss', feed_state_path=path
+    ).get_news(limit=10)
+
+    other = FeedState('https://kultuur.err.ee/rss', path)
+    other.load()
+    assert other.entries == [] and other.etag is None
+
+    same = FeedState(f'{stub.url}/err/rss', path)
+    same.load()
+    assert len(same.entries) == 3
+
+
+def test_html_page_is_scraped_when_the_feed_fails(stub, tmp_path):
+    scraper = ERRNewsScraper(
+        base_url=f'{stub.url}/err', feed_url=f'{stub.url}/missing/rss',
+        feed_state_path=str(tmp_path / 'state.json'), streaming=False
+    )
+    news = scraper.get_news(limit=2)
+    assert not is_fallback(news)
+    assert [item['link'] for item in news] == [f'{stub.url}/err/1609000000/uudis-0', f'{stub.url}/err/1609000001/uudis-1']
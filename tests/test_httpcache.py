@@ -0,0 +1,120 @@
+import itertools
+import random
+import time
+
+import pytest
+
+pytest.importorskip('scrapy')
+
+from scrapy import Spider
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from scrapers import httpcache
+
+
+@pytest.fixture
+def make_middleware(tmp_path):
+    opened = []
+
+    def make(**settings):
+        crawler = get_crawler(Spider, {
+            'HTTPCACHE_ENABLED': True,
+            'HTTPCACHE_DIR': str(tmp_path / 'httpcache'),
+            'HTTPCACHE_STORAGE': 'scrapers.httpcache.SQLiteCacheStorage',
+            'HTTPCACHE_COMPRESSION': 'zlib',
+            'REQUEST_FINGERPRINTER_IMPLEMENTATION': '2.7',
+            **settings,
+        })
+        spider = crawler._create_spider('cache-test')
+        middleware = HttpCacheMiddleware.from_crawler(crawler)
+        middleware.spider_opened(spider)
+        opened.append((middleware, spider))
+        return middleware, spider
+
+    yield make
+    for middleware, spider in opened:
+        if middleware.storage.db is not None:
+            middleware.spider_closed(spider)
+
+
+def _response(request, body=b'<html><body><h1>Laulupidu</h1></body></html>'):
+    return HtmlResponse(
+        request.url, status=200, body=body, headers={'Content-Type': 'text/html; charset=utf-8'}, request=request
+    )
+
+
+def test_miss_store_hit(make_middleware):
+    middleware, spider = make_middleware()
+    request = Request('https://kultuur.err.ee/uudised')
+
+    assert middleware.process_request(request, spider) is None
+    stored = middleware.process_response(request, _response(request), spider)
+    assert 'cached' not in stored.flags
+
+    cached = middleware.process_request(Request('https://kultuur.err.ee/uudised'), spider)
+    assert cached is not None
+    assert 'cached' in cached.flags
+    assert isinstance(cached, HtmlResponse)
+    assert cached.status == 200
+    assert cached.body == stored.body
+    assert cached.headers['Content-Type'] == b'text/html; charset=utf-8'
+    assert cached.css('h1::text').get() == 'Laulupidu'
+
+
+def test_hit_survives_reopening(make_middleware):
+    middleware, spider = make_middleware()
+    request = Request('https://www.piletilevi.ee/')
+    middleware.process_response(request, _response(request), spider)
+    middleware.spider_closed(spider)
+
+    middleware, spider = make_middleware()
+    assert middleware.process_request(Request('https://www.piletilevi.ee/'), spider) is not None
+
+
+def test_expired_response_is_a_miss(make_middleware, monkeypatch):
+    middleware, spider = make_middleware(
+        HTTPCACHE_EXPIRATION_SECS=3600, HTTPCACHE_DOMAIN_EXPIRATION_SECS={'err.ee': 60}
+    )
+    news = Request('https://kultuur.err.ee/uudised')
+    events = Request('https://www.kultuurikava.ee/events/')
+    middleware.process_response(news, _response(news), spider)
+    middleware.process_response(events, _response(events), spider)
+
+    now = time.time()
+    monkeypatch.setattr(httpcache.time, 'time', lambda: now + 120)
+    # err.ee entries expire after 60 s, other domains after the default hour
+    assert middleware.process_request(Request('https://kultuur.err.ee/uudised'), spider) is None
+    assert middleware.process_request(Request('https://www.kultuurikava.ee/events/'), spider) is not None
+
+    monkeypatch.setattr(httpcache.time, 'time', lambda: now + 7200)
+    assert middleware.process_request(Request('https://www.kultuurikava.ee/events/'), spider) is None
+
+
+def test_least_recently_used_responses_are_evicted(make_middleware, monkeypatch):
+    clock = itertools.count(time.time())
+    monkeypatch.setattr(httpcache.time, 'time', lambda: next(clock))
+    middleware, spider = make_middleware()
+    storage = middleware.storage
+
+    def store(number, size=1000):
+        request = Request(f'https://www.kultuurikava.ee/event/{number}')
+        # Random bytes do not compress, so every entry takes about `size` bytes
+        middleware.process_response(request, _response(request, body=random.randbytes(size)), spider)
+
+    def cached(number):
+        return middleware.process_request(Request(f'https://www.kultuurikava.ee/event/{number}'), spider) is not None
+
+    for number in range(4):
+        store(number)
+    entry_size = storage._total_size / 4
+    storage.max_size = int(entry_size * 4.5)
+
+    # Read the two oldest entries, the two stored after them are now the least recently used
+    assert cached(0) and cached(1)
+    store(4, size=2000)
+
+    assert not cached(2) and not cached(3)
+    assert cached(0) and cached(1) and cached(4)
+    assert storage._total_size <= storage.max_size * httpcache.EVICTION_TARGET
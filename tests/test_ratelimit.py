@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from scrapers.ratelimit import HostRateLimiter, RateLimitExceeded
+
+LIMITS = {'rate': 100.0, 'burst': 2, 'concurrency': 1}
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    return HostRateLimiter(state_dir=str(tmp_path), host_limits={}, default_limits=LIMITS)
+
+
+def test_long_retry_after_fails_fast(limiter):
+    limiter.record_response('example.org', 429, 600)
+    started = time.monotonic()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire_token('example.org')
+    assert time.monotonic() - started < 1
+
+
+def test_token_wait_is_bounded(tmp_path):
+    limiter = HostRateLimiter(
+        state_dir=str(tmp_path), host_limits={}, default_limits={'rate': 0.01, 'burst': 1, 'concurrency': 1}
+    )
+    limiter.acquire_token('example.org')
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire_token('example.org', max_wait=0.5)
+
+
+def test_short_retry_after_is_waited_out(limiter):
+    limiter.record_response('example.org', 429, 0.3)
+    started = time.monotonic()
+    limiter.acquire_token('example.org')
+    assert time.monotonic() - started >= 0.25
+
+
+def test_blocked_host_does_not_hold_slot(limiter):
+    limiter.record_response('blocked.example.org', 429, 600)
+    with pytest.raises(RateLimitExceeded):
+        with limiter.limited('http://blocked.example.org/'):
+            pass
+
+    # The failed attempt never took the host's only slot
+    acquired = threading.Event()
+
+    def use_slot():
+        with limiter.slot('blocked.example.org'):
+            acquired.set()
+
+    thread = threading.Thread(target=use_slot)
+    thread.start()
+    thread.join(timeout=2)
+    assert acquired.is_set()
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import app as app_module
+import search_index
+from scrapers.items import NewsItem, SearchHit
+from search_index import SearchIndexReader, build_index
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = str(tmp_path / 'search-index.bin')
+    build_index([SearchHit(NewsItem(title='Laulupidu indeksis', link='https://example.org/1'), 'Uudised')], path)
+    return path
+
+
+def _age(monkeypatch, seconds):
+    now = time.time()
+    monkeypatch.setattr(search_index.time, 'time', lambda: now + seconds)
+
+
+def test_fresh_index_is_served(index_path):
+    reader = SearchIndexReader(index_path, check_interval=0, max_age=60)
+    assert [hit['title'] for hit in reader.search('laulu')] == ['Laulupidu indeksis']
+
+
+def test_stale_index_is_not_served(index_path, monkeypatch):
+    reader = SearchIndexReader(index_path, check_interval=0, max_age=60)
+    assert reader.available()
+    _age(monkeypatch, 120)
+    assert not reader.available()
+    assert reader.search('laulu') is None
+
+
+def test_stale_index_is_not_served_between_file_checks(index_path, monkeypatch):
+    reader = SearchIndexReader(index_path, check_interval=3600, max_age=60)
+    assert reader.available()
+    _age(monkeypatch, 120)
+    assert reader.search('laulu') is None
+
+
+def test_max_age_zero_serves_any_age(index_path, monkeypatch):
+    reader = SearchIndexReader(index_path, check_interval=0, max_age=0)
+    _age(monkeypatch, 10 ** 6)
+    assert reader.search('laulu')
+
+
+def test_search_route_falls_back_to_live_data(index_path, monkeypatch):
+    live = [SearchHit(NewsItem(title='Laulupidu otse', link='https://example.org/2'), 'Uudised')]
+    monkeypatch.setattr(app_module, '_search_hits', lambda query, category='all', wait_for_details=False: live)
+    client = app_module.create_app({
+        'SEARCH_INDEX_PATH': index_path, 'SEARCH_INDEX_MAX_AGE': 60, 'SCRAPER_CACHE_URL': 'none'
+    }).test_client()
+
+    assert [hit['title'] for hit in client.get('/api/search?q=laulu').get_json()] == ['Laulupidu indeksis']
+    _age(monkeypatch, 120)
+    assert [hit['title'] for hit in client.get('/api/search?q=laulu').get_json()] == ['Laulupidu otse']
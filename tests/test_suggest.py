@@ -0,0 +1,54 @@
+import threading
+import time
+
+from app import create_app
+from scrapers.items import NewsItem
+
+
+class FakeNews:
+    def __init__(self):
+        self.titles = ['Laulupidu Tallinnas']
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_news(self, limit=10):
+        self.release.wait(5)
+        return [NewsItem(title=title, link=f'https://example.org/{number}', source='ERR')
+                for number, title in enumerate(self.titles)]
+
+
+class NoItems:
+    def get_events(self, limit=10):
+        return []
+
+    get_cultural_events = get_events
+
+    def get_culture_info(self):
+        return []
+
+
+def _titles(client, query):
+    return [suggestion['text'] for suggestion in client.get(f'/api/suggest?q={query}').get_json()]
+
+
+def test_first_call_builds_later_rebuilds_run_in_background():
+    app = create_app({'SCRAPER_CACHE_URL': 'none', 'ENRICH_DETAILS': False, 'SUGGEST_INDEX_TTL': 0})
+    news = FakeNews()
+    instances = app.extensions['scrapers']._instances
+    instances['err'] = news
+    instances['kultuurikava'] = instances['piletilevi'] = instances['wiki'] = NoItems()
+    client = app.test_client()
+
+    # A cold worker has nothing to serve, the first call waits for the build
+    assert _titles(client, 'laul') == ['Laulupidu Tallinnas']
+
+    # The stale index is served while the rebuild is held up
+    news.titles = ['Laulupidu Tartus']
+    news.release.clear()
+    assert _titles(client, 'laul') == ['Laulupidu Tallinnas']
+    news.release.set()
+
+    deadline = time.monotonic() + 5
+    while app.extensions['suggest']['lock'].locked() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert app.extensions['suggest']['index'].suggest('laul')[0]['text'] == 'Laulupidu Tartus'
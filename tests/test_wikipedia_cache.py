@@ -0,0 +1,21 @@
+from scrapers.wikipedia_cache import WikipediaExtractCache
+
+ENTRY = {'title': 'Laulupidu', 'extract': 'Laulupidu on...', 'url': 'x', 'lastrevid': 1, 'touched': 't'}
+
+
+def test_entries_of_another_api_url_are_ignored(tmp_path):
+    path = str(tmp_path / 'extracts.json')
+    stub = WikipediaExtractCache('http://127.0.0.1:8001/wiki/w/api.php', path)
+    stub.put(1, ENTRY)
+    stub.save()
+
+    real = WikipediaExtractCache('https://et.wikipedia.org/w/api.php', path)
+    assert real.get(1) is None
+    assert real.find_title('Laulupidu') is None
+    assert WikipediaExtractCache('http://127.0.0.1:8001/wiki/w/api.php', path).find_title('Laulupidu') == ENTRY
+
+
+def test_untagged_file_is_ignored(tmp_path):
+    path = tmp_path / 'extracts.json'
+    path.write_text('{"pages": {"1": {"title": "Laulupidu"}}}', encoding='utf-8')
+    assert WikipediaExtractCache('https://et.wikipedia.org/w/api.php', str(path)).find_title('Laulupidu') is None